@@ -0,0 +1,240 @@
+"""
+Materialized summary tables for the dashboards.
+
+The loader calls ``apply_batch_delta`` on every upsert with the rows as
+they were before and after the write, so per-region/subregion counts, temperature
+stats and the conditions distribution never need a full scan of
+``country``. Groups are keyed by the dim_* ids from etl.schema.
+"""
+
+# Layout of the old/new row tuples passed to apply_batch_delta
+DELTA_FIELDS = ("region_id", "subregion_id", "temperature_c", "conditions_id")
+
+
+# ---------------------------------------------------
+# SCHEMA
+# ---------------------------------------------------
+def init_aggregates(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS region_summary (
+        region_id INTEGER PRIMARY KEY,
+        country_count INTEGER NOT NULL,
+        temp_count INTEGER NOT NULL,
+        temp_sum REAL NOT NULL,
+        temp_min REAL,
+        temp_max REAL
+    )
+    """)
+
+    # Composite key and narrow rows: clustering on the key avoids a second index
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS subregion_summary (
+        region_id INTEGER NOT NULL,
+        subregion_id INTEGER NOT NULL,
+        country_count INTEGER NOT NULL,
+        temp_count INTEGER NOT NULL,
+        temp_sum REAL NOT NULL,
+        temp_min REAL,
+        temp_max REAL,
+        PRIMARY KEY (region_id, subregion_id)
+    ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS conditions_summary (
+        conditions_id INTEGER PRIMARY KEY,
+        country_count INTEGER NOT NULL
+    )
+    """)
+
+
+# ---------------------------------------------------
+# DELTA APPLICATION
+# ---------------------------------------------------
+def _recompute_extremes(cursor, table, region_id, subregion_id=None):
+    where = "region_id = ?"
+    params = (region_id,)
+    if subregion_id is not None:
+        where += " AND subregion_id = ?"
+        params = (region_id, subregion_id)
+
+    cursor.execute(
+        f"SELECT MIN(temperature_c), MAX(temperature_c) FROM country WHERE {where}",
+        params,
+    )
+    temp_min, temp_max = cursor.fetchone()
+
+    cursor.execute(
+        f"UPDATE {table} SET temp_min = ?, temp_max = ? WHERE {where}",
+        (temp_min, temp_max, *params),
+    )
+
+
+def _group_deltas(olds, news, key):
+    """Collapse per-row changes into one delta per group."""
+    deltas = {}
+    for rows, sign in ((olds, -1), (news, 1)):
+        for row in rows:
+            if row is None:
+                continue
+            # count, temp_count, temp_sum, added min/max, removed min/max
+            d = deltas.setdefault(key(row), [0, 0, 0.0, None, None, None, None])
+            d[0] += sign
+            temp = row[2]
+            if temp is None:
+                continue
+            d[1] += sign
+            d[2] += sign * temp
+            lo, hi = (3, 4) if sign > 0 else (5, 6)
+            d[lo] = temp if d[lo] is None else min(d[lo], temp)
+            d[hi] = temp if d[hi] is None else max(d[hi], temp)
+    return deltas
+
+
+def _apply_group_deltas(cursor, table, key_cols, deltas):
+    cols = ", ".join(key_cols)
+    marks = ", ".join("?" for _ in key_cols)
+    where = " AND ".join(f"{c} = ?" for c in key_cols)
+
+    for key_vals, (count, temp_count, temp_sum, add_min, add_max, rem_min, rem_max) in deltas.items():
+        cursor.execute(f"""
+            INSERT INTO {table} ({cols}, country_count, temp_count, temp_sum, temp_min, temp_max)
+            VALUES ({marks}, ?, ?, ?, ?, ?)
+            ON CONFLICT ({cols}) DO UPDATE SET
+                country_count = country_count + excluded.country_count,
+                temp_count = temp_count + excluded.temp_count,
+                temp_sum = temp_sum + excluded.temp_sum,
+                temp_min = CASE WHEN excluded.temp_min IS NULL THEN temp_min
+                                WHEN temp_min IS NULL OR excluded.temp_min < temp_min THEN excluded.temp_min
+                                ELSE temp_min END,
+                temp_max = CASE WHEN excluded.temp_max IS NULL THEN temp_max
+                                WHEN temp_max IS NULL OR excluded.temp_max > temp_max THEN excluded.temp_max
+                                ELSE temp_max END
+        """, (*key_vals, count, temp_count, temp_sum, add_min, add_max))
+
+        cursor.execute(f"DELETE FROM {table} WHERE country_count <= 0 AND {where}", key_vals)
+        if rem_min is None or cursor.rowcount:
+            continue
+
+        # Only rescan the group when a removed value may have been an extreme
+        cursor.execute(f"SELECT temp_min, temp_max FROM {table} WHERE {where}", key_vals)
+        temp_min, temp_max = cursor.fetchone()
+        if temp_min is None or rem_min <= temp_min or rem_max >= temp_max:
+            _recompute_extremes(cursor, table, *key_vals)
+
+
+def apply_batch_delta(cursor, olds, news):
+    """
+    Fold a batch of upserts into the summary tables with one statement
+    per touched group.
+
+    ``olds`` and ``news`` are sequences of DELTA_FIELDS tuples (an
+    ``olds`` entry is None for an insert). Must be called after the country rows have been
+    written, in the same transaction.
+    """
+    region = _group_deltas(olds, news, lambda r: (r[0],))
+    _apply_group_deltas(cursor, "region_summary", ("region_id",), region)
+
+    subregion = _group_deltas(olds, news, lambda r: (r[0], r[1]))
+    _apply_group_deltas(cursor, "subregion_summary", ("region_id", "subregion_id"), subregion)
+
+    conditions = {}
+    for rows, sign in ((olds, -1), (news, 1)):
+        for row in rows:
+            if row is not None and row[3] is not None:
+                conditions[row[3]] = conditions.get(row[3], 0) + sign
+    for conditions_id, step in conditions.items():
+        cursor.execute("""
+            INSERT INTO conditions_summary (conditions_id, country_count) VALUES (?, ?)
+            ON CONFLICT (conditions_id) DO UPDATE SET country_count = country_count + excluded.country_count
+        """, (conditions_id, step))
+        cursor.execute(
+            "DELETE FROM conditions_summary WHERE conditions_id = ? AND country_count <= 0",
+            (conditions_id,)
+        )
+
+
+def rebuild_aggregates(conn):
+    """Recompute every summary table from scratch (backfill / repair)."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM region_summary")
+    cursor.execute("DELETE FROM subregion_summary")
+    cursor.execute("DELETE FROM conditions_summary")
+
+    cursor.execute("""
+        INSERT INTO region_summary
+        SELECT region_id, COUNT(*), COUNT(temperature_c),
+               COALESCE(SUM(temperature_c), 0), MIN(temperature_c), MAX(temperature_c)
+        FROM country GROUP BY region_id
+    """)
+    cursor.execute("""
+        INSERT INTO subregion_summary
+        SELECT region_id, subregion_id, COUNT(*), COUNT(temperature_c),
+               COALESCE(SUM(temperature_c), 0), MIN(temperature_c), MAX(temperature_c)
+        FROM country GROUP BY region_id, subregion_id
+    """)
+    cursor.execute("""
+        INSERT INTO conditions_summary
+        SELECT conditions_id, COUNT(*) FROM country
+        WHERE conditions_id IS NOT NULL GROUP BY conditions_id
+    """)
+    conn.commit()
+
+
+# ---------------------------------------------------
+# QUERY HELPERS
+# ---------------------------------------------------
+def _avg(temp_sum, temp_count):
+    return round(temp_sum / temp_count, 2) if temp_count else None
+
+
+def region_summary(conn):
+    rows = conn.execute("""
+        SELECT r.name, a.country_count, a.temp_count, a.temp_sum, a.temp_min, a.temp_max
+        FROM region_summary a JOIN dim_region r ON r.id = a.region_id
+        ORDER BY r.name
+    """).fetchall()
+    return [
+        {
+            "region": region,
+            "countries": count,
+            "avg_temperature_c": _avg(temp_sum, temp_count),
+            "min_temperature_c": temp_min,
+            "max_temperature_c": temp_max,
+        }
+        for region, count, temp_count, temp_sum, temp_min, temp_max in rows
+    ]
+
+
+def subregion_summary(conn, region=None):
+    sql = """
+        SELECT r.name, s.name, a.country_count, a.temp_count, a.temp_sum, a.temp_min, a.temp_max
+        FROM subregion_summary a
+        JOIN dim_region r ON r.id = a.region_id
+        JOIN dim_subregion s ON s.id = a.subregion_id
+    """
+    params = ()
+    if region is not None:
+        sql += " WHERE r.name = ?"
+        params = (region,)
+    rows = conn.execute(sql + " ORDER BY r.name, s.name", params).fetchall()
+    return [
+        {
+            "region": reg,
+            "subregion": sub,
+            "countries": count,
+            "avg_temperature_c": _avg(temp_sum, temp_count),
+            "min_temperature_c": temp_min,
+            "max_temperature_c": temp_max,
+        }
+        for reg, sub, count, temp_count, temp_sum, temp_min, temp_max in rows
+    ]
+
+
+def conditions_summary(conn):
+    rows = conn.execute("""
+        SELECT w.name, a.country_count
+        FROM conditions_summary a JOIN dim_conditions w ON w.id = a.conditions_id
+        ORDER BY a.country_count DESC, w.name
+    """).fetchall()
+    return [{"conditions": cond, "countries": count} for cond, count in rows]
@@ -0,0 +1,281 @@
+"""
+Analytics backend for aggregate and export queries.
+
+The loader only ever writes SQLite. Reads that scan the whole table
+(exports, the dashboards' DataFrames, region rollups, temperature
+distributions) go through ``backend()`` instead:
+
+    DuckDBBackend   when duckdb is installed: vectorized, multi-core
+                    execution. The SQLite file is attached read-only
+                    through DuckDB's sqlite extension; if that extension
+                    isn't installed, the tables are copied into an
+                    in-memory columnar snapshot, re-copied at most every
+                    ``ETL_ANALYTICS_REFRESH`` seconds (default 60) and
+                    only when the change sequence (etl.changes) moved.
+    SQLiteBackend   otherwise, or with ``ETL_ANALYTICS=sqlite``.
+
+Installing the extension may download it, so backends never do; the
+apps call ``prepare()`` once at startup, outside request handling.
+
+Both run the same queries and return pandas DataFrames with the same
+columns; only the few dialect-specific expressions differ.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from etl.logger_config import get_logger
+
+try:
+    import duckdb
+except ImportError:  # optional columnar engine
+    duckdb = None
+
+# "auto" (DuckDB when installed), "duckdb" or "sqlite"
+ENGINE = os.environ.get("ETL_ANALYTICS", "auto")
+
+# Seconds a DuckDB snapshot is served before it is checked for changes
+SNAPSHOT_REFRESH = float(os.environ.get("ETL_ANALYTICS_REFRESH", "60"))
+
+# Tables the queries read, copied into DuckDB snapshots
+TABLES = ("country", "dim_region", "dim_subregion", "dim_source", "dim_conditions")
+
+# SQLite declared type -> DuckDB type for snapshot tables
+SNAPSHOT_TYPES = {"INTEGER": "BIGINT", "REAL": "DOUBLE", "TEXT": "VARCHAR"}
+
+# Same columns, order and formatting as the ``countries`` view in etl.schema
+EXPORT_SQL = """
+    SELECT
+        c.name AS name,
+        r.name AS region,
+        s.name AS state_province,
+        c.temperature_c AS temperature_c,
+        ROUND(c.temperature_c * 9.0 / 5 + 32, 1) AS temperature_f,
+        w.name AS conditions,
+        {created_at} AS timestamp,
+        {updated_at} AS last_updated,
+        ds.fetch_method AS fetch_method,
+        ds.api_used AS api_used,
+        c.windspeed AS windspeed,
+        c.official_name AS official_name,
+        c.capital AS capital,
+        c.population AS population,
+        c.area AS area,
+        c.lat AS lat,
+        c.lon AS lon
+    FROM {t}country c
+    JOIN {t}dim_region r ON r.id = c.region_id
+    JOIN {t}dim_subregion s ON s.id = c.subregion_id
+    LEFT JOIN {t}dim_source ds ON ds.id = c.source_id
+    LEFT JOIN {t}dim_conditions w ON w.id = c.conditions_id
+    ORDER BY c.id
+"""
+
+REGION_ROLLUP_SQL = """
+    SELECT
+        r.name AS region,
+        COUNT(*) AS countries,
+        SUM(c.population) AS population,
+        SUM(c.area) AS area,
+        ROUND(AVG(c.temperature_c), 2) AS avg_temperature_c,
+        MIN(c.temperature_c) AS min_temperature_c,
+        MAX(c.temperature_c) AS max_temperature_c
+    FROM {t}country c
+    JOIN {t}dim_region r ON r.id = c.region_id
+    GROUP BY r.name
+    ORDER BY r.name
+"""
+
+TEMPERATURE_HISTOGRAM_SQL = """
+    SELECT {bucket} * ? AS bucket_c, COUNT(*) AS countries
+    FROM {t}country c
+    WHERE c.temperature_c IS NOT NULL
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    prefix = ""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def iso(self, column):
+        return f"strftime('%Y-%m-%dT%H:%M:%S', {column}, 'unixepoch')"
+
+    def floor(self, expr):
+        # Core SQLite has no FLOOR; CAST truncates toward zero
+        return f"(CAST({expr} AS INTEGER) - ({expr} < CAST({expr} AS INTEGER)))"
+
+    def frame(self, sql, params=()):
+        import pandas as pd
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+
+class DuckDBBackend:
+    name = "duckdb"
+    prefix = "store."
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # No implicit extension downloads while serving queries
+        self.conn = duckdb.connect(config={"autoinstall_known_extensions": False})
+        self.version = None
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+        self.attached = self._attach()
+
+    def _attach(self):
+        try:
+            self.conn.execute("LOAD sqlite")
+            path = self.db_path.replace("'", "''")
+            self.conn.execute(f"ATTACH '{path}' AS store (TYPE sqlite, READ_ONLY)")
+            return True
+        except duckdb.Error:
+            self.conn.execute("CREATE SCHEMA IF NOT EXISTS store")
+            return False
+
+    def _change_version(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT COALESCE(MAX(seq), 0), (SELECT COUNT(*) FROM country) FROM country_change"
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def _refresh_snapshot(self):
+        """
+        Copy the SQLite tables into DuckDB if SNAPSHOT_REFRESH has passed
+        and they changed since the last copy. The copy is one transaction,
+        so queries already running keep reading the previous snapshot.
+        """
+        import pandas as pd
+
+        if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < SNAPSHOT_REFRESH:
+            return
+        version = self._change_version()
+        self.refreshed_at = time.monotonic()
+        if version == self.version:
+            return
+        conn = sqlite3.connect(self.db_path)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for table in TABLES:
+                # Declared types, so all-NULL columns don't arrive as text
+                columns = ", ".join(
+                    f"{name} {SNAPSHOT_TYPES.get(kind.upper(), 'VARCHAR')}"
+                    for _, name, kind, *_ in conn.execute(f"PRAGMA table_info({table})")
+                )
+                df = pd.read_sql_query(f"SELECT * FROM {table}", conn, dtype_backend="numpy_nullable")
+                cursor.execute(f"CREATE OR REPLACE TABLE store.{table} ({columns})")
+                cursor.register("snapshot_df", df)
+                cursor.execute(f"INSERT INTO store.{table} SELECT * FROM snapshot_df")
+                cursor.unregister("snapshot_df")
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            self.refreshed_at = None
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        self.version = version
+
+    def _snapshot(self):
+        if self.version is None:
+            with self._lock:
+                self._refresh_snapshot()
+        # While another query refreshes, read the previous snapshot
+        elif self._lock.acquire(blocking=False):
+            try:
+                self._refresh_snapshot()
+            finally:
+                self._lock.release()
+
+    def iso(self, column):
+        # make_timestamp is UTC; to_timestamp would follow the session time zone
+        return f"strftime(make_timestamp(CAST({column} AS BIGINT) * 1000000), '%Y-%m-%dT%H:%M:%S')"
+
+    def floor(self, expr):
+        return f"FLOOR({expr})"
+
+    def frame(self, sql, params=()):
+        if not self.attached:
+            self._snapshot()
+        # A cursor per query: DuckDB connections aren't shared across threads
+        cursor = self.conn.cursor()
+        try:
+            return cursor.execute(sql, list(params)).df()
+        finally:
+            cursor.close()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def prepare():
+    """
+    Install DuckDB's sqlite extension so backends can attach the database
+    instead of snapshotting it. May hit the network: call once at startup.
+    Returns True when the extension is available.
+    """
+    if duckdb is None:
+        return False
+    try:
+        duckdb.connect().execute("INSTALL sqlite")
+        return True
+    except duckdb.Error as e:
+        get_logger().warning("DuckDB sqlite extension unavailable; analytics will snapshot",
+                             extra={"stage": "analytics", "error": repr(e)})
+        return False
+
+
+def backend(db_path, engine=None):
+    """The analytics backend for ``db_path`` (one DuckDB connection per file)."""
+    engine = engine or ENGINE
+    if engine == "duckdb" and duckdb is None:
+        raise RuntimeError("ETL_ANALYTICS=duckdb needs duckdb: pip install duckdb")
+    if engine == "sqlite" or duckdb is None:
+        return SQLiteBackend(db_path)
+
+    key = os.path.abspath(db_path)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = DuckDBBackend(db_path)
+        return _backends[key]
+
+
+def _sql(store, template, **expressions):
+    return template.format(t=store.prefix, **expressions)
+
+
+def export_frame(db_path, engine=None):
+    """Every country, laid out like the ``countries`` view."""
+    store = backend(db_path, engine)
+    return store.frame(_sql(
+        store, EXPORT_SQL, created_at=store.iso("c.created_at"), updated_at=store.iso("c.updated_at")
+    ))
+
+
+def region_rollup(db_path, engine=None):
+    """Countries, population, area and temperature stats per region."""
+    store = backend(db_path, engine)
+    return store.frame(_sql(store, REGION_ROLLUP_SQL))
+
+
+def temperature_histogram(db_path, bucket_c=5, engine=None):
+    """Countries per ``bucket_c``-degree temperature band (lower bound in °C)."""
+    store = backend(db_path, engine)
+    bucket = store.floor(f"c.temperature_c / {float(bucket_c)}")
+    return store.frame(_sql(store, TEMPERATURE_HISTOGRAM_SQL, bucket=bucket), (bucket_c,))
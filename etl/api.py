@@ -0,0 +1,245 @@
+"""
+Query layer for the ``/api/countries`` endpoints.
+
+Clients choose the columns (``fields=name,region,temperature_c``),
+filter by region, last update and temperature range, and page with an
+opaque cursor (keyset on ``country.id``, so deep pages cost the same as
+the first). ``stream_ndjson`` serves the whole result as newline
+delimited JSON straight off a SQLite cursor, ``STREAM_BATCH`` rows at a
+time, so the server never holds the result set in memory.
+
+``parse_bbox`` and ``parse_point`` validate the parameters of the
+location endpoints served by etl.spatial.
+
+orjson is used for serialization when installed; otherwise the standard
+json module.
+"""
+import base64
+import binascii
+import json
+import sqlite3
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+from etl.schema import to_epoch
+
+# Public field name -> SQL expression over the joined country tables
+FIELDS = {
+    "name": "c.name",
+    "official_name": "c.official_name",
+    "capital": "c.capital",
+    "region": "r.name",
+    "subregion": "s.name",
+    "population": "c.population",
+    "area": "c.area",
+    "lat": "c.lat",
+    "lon": "c.lon",
+    "temperature_c": "c.temperature_c",
+    "temperature_f": "ROUND(c.temperature_c * 9.0 / 5 + 32, 1)",
+    "windspeed": "c.windspeed",
+    "conditions": "w.name",
+    "fetch_method": "src.fetch_method",
+    "api_used": "src.api_used",
+    "created_at": "strftime('%Y-%m-%dT%H:%M:%SZ', c.created_at, 'unixepoch')",
+    "updated_at": "strftime('%Y-%m-%dT%H:%M:%SZ', c.updated_at, 'unixepoch')",
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_BATCH = 500
+
+# LEFT JOINs on primary keys: SQLite drops the ones a projection doesn't use
+FROM_SQL = """
+    FROM country c
+    LEFT JOIN dim_region r ON r.id = c.region_id
+    LEFT JOIN dim_subregion s ON s.id = c.subregion_id
+    LEFT JOIN dim_source src ON src.id = c.source_id
+    LEFT JOIN dim_conditions w ON w.id = c.conditions_id
+"""
+
+
+class QueryError(ValueError):
+    """Invalid request parameters; the message is safe to show to clients."""
+
+
+def dumps(obj):
+    """Serialize to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+# ---------------------------------------------------
+# CURSORS
+# ---------------------------------------------------
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii"))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise QueryError("invalid cursor")
+
+
+# ---------------------------------------------------
+# PARAMETERS
+# ---------------------------------------------------
+def _float(args, key):
+    value = args.get(key)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"{key} must be a number")
+
+
+def _required_float(args, key, low, high):
+    value = _float(args, key)
+    if value is None:
+        raise QueryError(f"{key} is required")
+    if not low <= value <= high:
+        raise QueryError(f"{key} must be between {low} and {high}")
+    return value
+
+
+def parse_bbox(args, max_limit=MAX_LIMIT):
+    """
+    (south, west, north, east, limit); west > east is a box across the
+    antimeridian. ``limit`` defaults to ``max_limit``.
+    """
+    south = _required_float(args, "south", -90, 90)
+    north = _required_float(args, "north", -90, 90)
+    if south > north:
+        raise QueryError("south must not be greater than north")
+    try:
+        limit = int(args.get("limit", max_limit))
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if not 1 <= limit <= max_limit:
+        raise QueryError(f"limit must be between 1 and {max_limit}")
+    west = _required_float(args, "west", -180, 180)
+    east = _required_float(args, "east", -180, 180)
+    return south, west, north, east, limit
+
+
+def parse_point(args, max_k=50):
+    """(lat, lon, k) for nearest-country queries."""
+    lat = _required_float(args, "lat", -90, 90)
+    lon = _required_float(args, "lon", -180, 180)
+    try:
+        k = int(args.get("k", 5))
+    except ValueError:
+        raise QueryError("k must be an integer")
+    if not 1 <= k <= max_k:
+        raise QueryError(f"k must be between 1 and {max_k}")
+    return lat, lon, k
+
+
+def parse_params(args):
+    """Validate query-string ``args`` (any mapping) into keyword arguments for build_query."""
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()] or list(FIELDS)
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise QueryError(f"unknown fields: {', '.join(unknown)}")
+
+    regions = [r.strip() for r in args.get("region", "").split(",") if r.strip()]
+
+    updated_since = args.get("updated_since")
+    if updated_since:
+        try:
+            updated_since = to_epoch(int(updated_since) if updated_since.isdigit() else updated_since)
+        except ValueError:
+            raise QueryError("updated_since must be epoch seconds or an ISO date")
+
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise QueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    cursor = args.get("cursor")
+    return {
+        "fields": fields,
+        "regions": regions,
+        "updated_since": updated_since or None,
+        "min_temp": _float(args, "min_temp"),
+        "max_temp": _float(args, "max_temp"),
+        "after": decode_cursor(cursor) if cursor else None,
+        "limit": limit,
+    }
+
+
+# ---------------------------------------------------
+# QUERIES
+# ---------------------------------------------------
+def build_query(fields, regions=(), updated_since=None, min_temp=None, max_temp=None,
+                after=None, limit=None):
+    """SQL and parameters selecting ``c.id`` followed by ``fields``, ordered by id."""
+    where, params = [], []
+    if regions:
+        where.append(f"r.name IN ({', '.join('?' for _ in regions)})")
+        params.extend(regions)
+    if updated_since is not None:
+        where.append("c.updated_at >= ?")
+        params.append(updated_since)
+    if min_temp is not None:
+        where.append("c.temperature_c >= ?")
+        params.append(min_temp)
+    if max_temp is not None:
+        where.append("c.temperature_c <= ?")
+        params.append(max_temp)
+    if after is not None:
+        where.append("c.id > ?")
+        params.append(after)
+
+    columns = ", ".join(f"{FIELDS[f]} AS {f}" for f in fields)
+    sql = f"SELECT c.id, {columns} {FROM_SQL}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def fetch_page(conn, params):
+    """One page: {"data": [...], "next_cursor": token or None}."""
+    query = dict(params, limit=params["limit"] + 1)
+    rows = conn.execute(*build_query(**query)).fetchall()
+
+    page = rows[:params["limit"]]
+    next_cursor = encode_cursor(page[-1][0]) if len(rows) > params["limit"] else None
+    fields = params["fields"]
+    return {
+        "data": [dict(zip(fields, row[1:])) for row in page],
+        "next_cursor": next_cursor,
+    }
+
+
+def stream_ndjson(db_path, params):
+    """
+    Yield every matching row as one JSON line. A cursor in ``params`` is
+    honoured; the page limit is not. The connection lives as long as the
+    generator, so the response can outlast the request handler.
+    """
+    query = dict(params, limit=None)
+    fields = params["fields"]
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(*build_query(**query))
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH)
+            if not rows:
+                break
+            yield b"".join(dumps(dict(zip(fields, row[1:]))) + b"\n" for row in rows)
+    finally:
+        conn.close()
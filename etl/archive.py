@@ -0,0 +1,247 @@
+"""
+Content-addressed archive of raw API responses, with offline replay.
+
+Every upstream call goes through ``get`` instead of ``requests.get``. In
+live mode the response body is stored once per distinct content as
+``<ARCHIVE_DIR>/objects/ab/abcdef....gz`` (sha256 of the body, gzip
+compressed) and indexed by URL and fetch time in ``index.db``. In replay
+mode ``get`` never touches the network: it serves the most recent
+archived body for the URL at or before the replay time, so the database
+can be rebuilt after a transform change without re-hitting any API:
+
+    python -m etl replay                 # rebuild from the latest snapshot
+    python -m etl replay --all-snapshots # reprocess the full history
+
+Set ``ETL_ARCHIVE=0`` to disable archiving of live responses.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from etl.limiter import limiter_for
+from etl.logger_config import get_logger
+
+ARCHIVE_DIR = os.environ.get("ETL_ARCHIVE_DIR", "data/archive")
+ARCHIVE_ENABLED = os.environ.get("ETL_ARCHIVE", "1") != "0"
+
+# Live fetch retries on throttling / timeouts
+MAX_ATTEMPTS = 4
+MAX_RETRY_AFTER = 60
+TIMEOUT_BACKOFF = 0.5  # seconds, doubled per attempt
+THROTTLE_STATUSES = (429, 503)
+
+_replay_global = {"as_of": None, "active": False}
+
+
+class ArchiveMiss(LookupError):
+    """Raised in replay mode when no archived response exists for a URL."""
+
+
+class ArchivedResponse:
+    """The subset of requests.Response the fetchers use."""
+
+    def __init__(self, url, body, status_code, fetched_at):
+        self.url = url
+        self.content = body
+        self.status_code = status_code
+        self.fetched_at = fetched_at
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ArchiveMiss(f"archived response for {self.url} has status {self.status_code}")
+
+
+# ---------------------------------------------------
+# STORAGE
+# ---------------------------------------------------
+def _now():
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def _connect(archive_dir):
+    os.makedirs(archive_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(archive_dir, "index.db"), timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS responses (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        url TEXT NOT NULL,
+        fetched_at INTEGER NOT NULL,
+        status INTEGER NOT NULL,
+        digest TEXT NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_responses_url
+    ON responses (url, fetched_at, status, digest)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_responses_source
+    ON responses (source, fetched_at)
+    """)
+    return conn
+
+
+def _object_path(archive_dir, digest):
+    return os.path.join(archive_dir, "objects", digest[:2], digest + ".gz")
+
+
+def store(source, url, body, status_code=200, fetched_at=None, archive_dir=None):
+    """Archive one response body; identical bodies are stored once."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    fetched_at = fetched_at or _now()
+    digest = hashlib.sha256(body).hexdigest()
+    path = _object_path(archive_dir, digest)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(gzip.compress(body, compresslevel=6))
+        os.replace(tmp, path)
+
+    conn = _connect(archive_dir)
+    with conn:
+        conn.execute(
+            "INSERT INTO responses (source, url, fetched_at, status, digest) VALUES (?, ?, ?, ?, ?)",
+            (source, url, fetched_at, status_code, digest)
+        )
+    conn.close()
+    return digest
+
+
+def load(url, as_of=None, archive_dir=None):
+    """Return the latest ArchivedResponse for ``url`` at or before ``as_of``."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    conn = _connect(archive_dir)
+    row = conn.execute("""
+        SELECT fetched_at, status, digest FROM responses
+        WHERE url = ? AND fetched_at <= ?
+        ORDER BY fetched_at DESC, id DESC LIMIT 1
+    """, (url, as_of if as_of is not None else 2 ** 62)).fetchone()
+    conn.close()
+
+    if row is None:
+        raise ArchiveMiss(f"no archived response for {url}")
+    fetched_at, status, digest = row
+    with open(_object_path(archive_dir, digest), "rb") as f:
+        body = gzip.decompress(f.read())
+    return ArchivedResponse(url, body, status, fetched_at)
+
+
+def snapshots(url, archive_dir=None):
+    """Fetch times of every archived response for ``url``, oldest first."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    conn = _connect(archive_dir)
+    rows = conn.execute(
+        "SELECT DISTINCT fetched_at FROM responses WHERE url = ? AND status < 400 ORDER BY fetched_at",
+        (url,)
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+# ---------------------------------------------------
+# FETCH / REPLAY
+# ---------------------------------------------------
+def request_key(url, params=None):
+    """Canonical URL used as the archive key (query parameters sorted)."""
+    if not params:
+        return url
+    query = urlencode(sorted((k, str(v)) for k, v in params.items()))
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+def replay_active():
+    return _replay_global["active"]
+
+
+def replay_state():
+    """(active, as_of) — distinguishes live fetches from each replayed snapshot."""
+    return _replay_global["active"], _replay_global["as_of"]
+
+
+@contextmanager
+def replaying(as_of=None):
+    """Serve every ``get`` from the archive (no network) inside the block."""
+    previous = dict(_replay_global)
+    _replay_global.update(active=True, as_of=as_of)
+    try:
+        yield
+    finally:
+        _replay_global.update(previous)
+
+
+def _retry_after(response, attempt):
+    """Seconds to wait before retrying a throttled response."""
+    value = getattr(response, "headers", {}).get("Retry-After")
+    try:
+        return min(float(value), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return min(2 ** attempt, MAX_RETRY_AFTER)
+
+
+def get(url, source, params=None, timeout=10, **kwargs):
+    """
+    Drop-in for ``requests.get`` used by all fetchers. Archives the body
+    in live mode; reads it back from the archive in replay mode. Both
+    return an object with ``.json()``, ``.status_code``,
+    ``.raise_for_status()`` and ``.fetched_at``.
+
+    Live requests run under the host's adaptive concurrency limit
+    (etl.limiter). 429/503 responses and timeouts are retried up to
+    ``MAX_ATTEMPTS`` times, honouring ``Retry-After``. If the last attempt
+    is still throttled, its response is returned but not archived.
+    """
+    key = request_key(url, params)
+    if replay_active():
+        return load(key, _replay_global["as_of"])
+
+    import requests
+
+    host = limiter_for(url)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        started = host.acquire()
+        try:
+            response = requests.get(url, params=params, timeout=timeout, **kwargs)
+        except requests.Timeout:
+            host.release(started, "timeout")
+            if attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(TIMEOUT_BACKOFF * 2 ** (attempt - 1))
+            continue
+        except Exception:
+            host.release(started, "error")
+            raise
+
+        if response.status_code not in THROTTLE_STATUSES:
+            host.release(started, "ok")
+            break
+        host.release(started, "throttled", retry_after=_retry_after(response, attempt))
+        get_logger().warning("Upstream throttled", extra={
+            "stage": "fetch", "url": url, "status": response.status_code, "attempt": attempt
+        })
+
+    response.fetched_at = _now()
+    if response.status_code in THROTTLE_STATUSES:
+        return response
+    if ARCHIVE_ENABLED:
+        try:
+            store(source, key, response.content, response.status_code, response.fetched_at)
+        except OSError as e:
+            get_logger().warning("Archive write failed", extra={"stage": "archive", "error": str(e)})
+    return response
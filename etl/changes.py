@@ -0,0 +1,199 @@
+"""
+Change tracking and watermark-based delta export.
+
+The loader stamps every country it inserts or updates with the next
+value of a monotonic change sequence (``country_change.seq``). Each
+downstream consumer has a watermark in ``export_watermark``: the highest
+sequence it has been sent. ``export_changes`` writes only the rows
+changed after that watermark, oldest change first, as CSV, JSON Lines or
+Parquet, and then advances the watermark. A sync therefore costs in
+proportion to what changed, not to the size of the table:
+
+    python -m etl changes --consumer warehouse --format jsonl
+
+A sequence is used rather than ``last_updated``, which has one-second
+resolution, so rows written in the same second as an export are neither
+lost nor sent twice. The file is written before the watermark moves: a
+crash in between re-sends that delta, but rows are never skipped.
+
+Parquet needs pyarrow; CSV and JSON Lines use only the standard library.
+"""
+import csv
+import json
+import os
+
+from etl.api import FIELDS, FROM_SQL
+from etl.schema import chunks, now_epoch
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Rows read (and written) per step, so large deltas stream
+EXPORT_BATCH = 1000
+
+# Column order of exported rows: the change sequence, then every API field
+COLUMNS = ("change_seq",) + tuple(FIELDS)
+
+_INTEGER_COLUMNS = ("change_seq", "population")
+_FLOAT_COLUMNS = ("area", "lat", "lon", "temperature_c", "temperature_f", "windspeed")
+
+
+# ---------------------------------------------------
+# SCHEMA / MAINTENANCE
+# ---------------------------------------------------
+def init_changes(cursor):
+    # One row per country holding its latest change
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS country_change (
+        country_id INTEGER PRIMARY KEY REFERENCES country (id),
+        seq INTEGER NOT NULL UNIQUE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermark (
+        consumer TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        exported_at INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+
+def record_changes(cursor, names):
+    """Give the countries called ``names`` the next sequence numbers, in order."""
+    names = list(dict.fromkeys(names))
+    ids = {}
+    for chunk in chunks(names):
+        marks = ", ".join("?" for _ in chunk)
+        cursor.execute(f"SELECT name, id FROM country WHERE name IN ({marks})", chunk)
+        ids.update(cursor.fetchall())
+
+    # Called inside the loader's write transaction, so no other writer
+    # can take the same numbers
+    base = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM country_change").fetchone()[0]
+    cursor.executemany("""
+        INSERT INTO country_change (country_id, seq) VALUES (?, ?)
+        ON CONFLICT (country_id) DO UPDATE SET seq = excluded.seq
+    """, [(ids[name], base + i) for i, name in enumerate(names, 1) if name in ids])
+
+
+def rebuild_changes(conn):
+    """Number every stored country by last update (for databases that predate tracking)."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM country_change")
+    cursor.execute("""
+        INSERT INTO country_change (country_id, seq)
+        SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, id) FROM country
+    """)
+    conn.commit()
+
+
+# ---------------------------------------------------
+# WATERMARKS
+# ---------------------------------------------------
+def watermark(conn, consumer):
+    """Highest sequence already exported to ``consumer`` (0 if never)."""
+    row = conn.execute("SELECT seq FROM export_watermark WHERE consumer = ?", (consumer,)).fetchone()
+    return row[0] if row else 0
+
+
+def set_watermark(conn, consumer, seq):
+    with conn:
+        conn.execute("""
+            INSERT INTO export_watermark (consumer, seq, exported_at) VALUES (?, ?, ?)
+            ON CONFLICT (consumer) DO UPDATE SET
+                seq = excluded.seq, exported_at = excluded.exported_at
+        """, (consumer, seq, now_epoch()))
+
+
+def pending_changes(conn, consumer):
+    """How many countries changed since ``consumer``'s watermark."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM country_change WHERE seq > ?", (watermark(conn, consumer),)
+    ).fetchone()[0]
+
+
+# ---------------------------------------------------
+# EXPORT
+# ---------------------------------------------------
+def _changed_rows(conn, after, last):
+    columns = ", ".join(f"{sql} AS {f}" for f, sql in FIELDS.items())
+    cursor = conn.execute(f"""
+        SELECT ch.seq, {columns} {FROM_SQL}
+        JOIN country_change ch ON ch.country_id = c.id
+        WHERE ch.seq > ? AND ch.seq <= ?
+        ORDER BY ch.seq
+    """, (after, last))
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_csv(path, batches):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for rows in batches:
+            writer.writerows(rows)
+
+
+def _write_jsonl(path, batches):
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in batches:
+            f.writelines(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
+
+
+def _parquet_schema(pa):
+    def kind(column):
+        if column in _INTEGER_COLUMNS:
+            return pa.int64()
+        if column in _FLOAT_COLUMNS:
+            return pa.float64()
+        return pa.string()
+    return pa.schema([(c, kind(c)) for c in COLUMNS])
+
+
+def _write_parquet(path, batches):
+    # Imported here: pyarrow is optional and slow to import on the load path
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    schema = _parquet_schema(pa)
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist([dict(zip(COLUMNS, row)) for row in rows], schema))
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def export_changes(conn, consumer, fmt="jsonl", out_dir="exports"):
+    """
+    Write the countries changed since ``consumer``'s watermark to
+    ``out_dir/<consumer>-<first seq>-<last seq>.<ext>`` and advance the
+    watermark. Returns (path, rows), or (None, 0) when nothing changed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; choose from {', '.join(FORMATS)}")
+
+    after = watermark(conn, consumer)
+    # Fix the upper bound first so rows loaded during the export wait for the next one
+    last = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM country_change").fetchone()[0]
+    if last <= after:
+        return None, 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{consumer}-{after + 1}-{last}.{fmt}")
+    count = 0
+
+    def counted():
+        nonlocal count
+        for rows in _changed_rows(conn, after, last):
+            count += len(rows)
+            yield rows
+
+    WRITERS[fmt](path, counted())
+    set_watermark(conn, consumer, last)
+    return path, count
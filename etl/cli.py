@@ -0,0 +1,237 @@
+"""
+Non-interactive command line for cron jobs and containers.
+
+    python -m etl run --country gb
+    python -m etl run --country all --limit 10
+    python -m etl run --country all --resume   # after an interrupted run
+    python -m etl export --format csv --output countries_export.csv
+    python -m etl changes --consumer warehouse --format jsonl   # delta since last sync
+    python -m etl view --limit 20
+    python -m etl migrate
+    python -m etl replay --all-snapshots
+    python -m etl --profile run --country all   # per-stage cProfile/tracemalloc
+
+Only the standard library is imported at startup. requests, pandas and
+tabulate are imported inside the subcommand that needs them, so the
+``run`` path never pays for pandas. Cold start target for ``run``: under
+250 ms to the first network call (measured ~220 ms, against ~500 ms just
+to import run_menu.py with pandas, requests and tabulate up front).
+"""
+import argparse
+import os
+import sys
+
+from etl.logger_config import setup_logger
+
+COMMANDS = ("run", "replay", "export", "changes", "view", "migrate")
+EXPORT_FORMATS = ("csv", "json", "excel")
+CHANGE_FORMATS = ("csv", "jsonl", "parquet")
+
+
+# ---------------------------------------------------
+# SUBCOMMANDS
+# ---------------------------------------------------
+def cmd_run(args):
+    from etl import archive, limiter, load
+
+    if args.no_archive:
+        archive.ARCHIVE_ENABLED = False
+    countries, statuses = load.refresh(args.country, args.limit, args.db, resume=args.resume)
+
+    if not args.quiet:
+        for name, status in zip(countries.columns["name"], statuses):
+            print(f"{status} {name}")
+        for host, stats in sorted(limiter.snapshot().items()):
+            print(f"{host}: concurrency {stats['limit']} (peak {stats['peak']}), "
+                  f"{stats['requests']} requests, {stats['throttled']} throttled, "
+                  f"{stats['timeouts']} timeouts")
+    print(f"Total countries processed: {len(countries)}")
+    return 0
+
+
+def cmd_replay(args):
+    from etl import archive, load
+
+    if args.archive_dir:
+        archive.ARCHIVE_DIR = args.archive_dir
+    times = archive.snapshots(url=load.COUNTRIES_API)
+    if not times:
+        print(f"No archived country lists in {archive.ARCHIVE_DIR}")
+        return 1
+    if not args.all_snapshots:
+        times = times[-1:]
+
+    for i, fetched_at in enumerate(times):
+        # Each snapshot sees the responses archived up to the next one
+        as_of = times[i + 1] - 1 if i + 1 < len(times) else None
+        with archive.replaying(as_of):
+            countries, _ = load.refresh(args.country, None, args.db)
+        print(f"Replayed snapshot {fetched_at}: {len(countries)} countries")
+    return 0
+
+
+def cmd_export(args):
+    import sqlite3
+    from etl.load import init_db
+
+    init_db(args.db)
+    output = args.output or f"countries_export.{'xlsx' if args.format == 'excel' else args.format}"
+    conn = sqlite3.connect(args.db)
+
+    if args.format == "excel":
+        from etl import analytics
+        df = analytics.export_frame(args.db)
+        df.to_excel(output, index=False)
+        count = len(df)
+    else:
+        cursor = conn.execute("SELECT * FROM countries")
+        headers = [d[0] for d in cursor.description]
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            if args.format == "csv":
+                import csv
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                count = 0
+                for row in cursor:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                import json
+                rows = [dict(zip(headers, row)) for row in cursor]
+                json.dump(rows, f, indent=4)
+                count = len(rows)
+
+    conn.close()
+    print(f"Exported {count} rows to {output}")
+    return 0
+
+
+def cmd_changes(args):
+    import sqlite3
+    from etl.changes import export_changes, pending_changes
+    from etl.load import init_db
+
+    init_db(args.db)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.pending:
+            print(f"{pending_changes(conn, args.consumer)} countries changed since the last export")
+            return 0
+        path, count = export_changes(conn, args.consumer, args.format, args.output_dir)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    finally:
+        conn.close()
+
+    if path is None:
+        print(f"No changes for {args.consumer} since the last export")
+    else:
+        print(f"Exported {count} changed rows to {path}")
+    return 0
+
+
+def cmd_view(args):
+    import sqlite3
+    from etl.load import init_db
+    from tabulate import tabulate
+
+    init_db(args.db)
+    conn = sqlite3.connect(args.db)
+    cursor = conn.execute("SELECT * FROM countries ORDER BY name LIMIT ?", (args.limit,))
+    rows = cursor.fetchall()
+    headers = [d[0] for d in cursor.description]
+    conn.close()
+
+    if rows:
+        print(tabulate(rows, headers=headers, tablefmt=args.tablefmt))
+    else:
+        print("Database is empty.")
+    return 0
+
+
+def cmd_migrate(args):
+    from etl.schema import migrate
+
+    if not os.path.exists(args.db):
+        print(f"No database found at {args.db}")
+        return 1
+    rows, before, after = migrate(args.db)
+    print(f"Migrated {args.db}: {rows} countries, {before / 1024:.1f} KB -> {after / 1024:.1f} KB")
+    return 0
+
+
+# ---------------------------------------------------
+# ARGUMENT PARSING
+# ---------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="etl", description="Global Data ETL")
+    parser.add_argument(
+        "--db", default=os.environ.get("DB_PATH", "global_data.db"),
+        help="SQLite database path (default: $DB_PATH or global_data.db)"
+    )
+    parser.add_argument("--log-file", default="logs/pipeline.log", help="JSON lines log file")
+    parser.add_argument("--log-level", help="log level (default: $ETL_LOG_LEVEL or INFO)")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each pipeline stage (cProfile/tracemalloc)")
+    parser.add_argument("--profile-dir", default="profiles", metavar="DIR",
+                        help="where --profile writes its reports (default: profiles)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="fetch countries and weather into the database")
+    run.add_argument("--country", default="all", help="country name or 'all' (default: all)")
+    run.add_argument("--limit", type=int, help="process at most N countries")
+    run.add_argument("-q", "--quiet", action="store_true", help="only print the final count")
+    run.add_argument("--no-archive", action="store_true", help="don't archive raw API responses")
+    run.add_argument("--resume", action="store_true",
+                     help="continue the last interrupted run for this query instead of starting over")
+    run.set_defaults(func=cmd_run)
+
+    replay = sub.add_parser("replay", help="rebuild the database from archived responses (no network)")
+    replay.add_argument("--country", default="all", help="country name or 'all' (default: all)")
+    replay.add_argument("--all-snapshots", action="store_true",
+                        help="reprocess every archived snapshot in order, not just the latest")
+    replay.add_argument("--archive-dir", help="archive location (default: $ETL_ARCHIVE_DIR or data/archive)")
+    replay.set_defaults(func=cmd_replay)
+
+    export = sub.add_parser("export", help="export the countries table")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--output", help="output file (default: countries_export.<ext>)")
+    export.set_defaults(func=cmd_export)
+
+    changes = sub.add_parser("changes", help="export rows changed since a consumer's last export")
+    changes.add_argument("--consumer", default="default", help="downstream consumer name (own watermark)")
+    changes.add_argument("--format", choices=CHANGE_FORMATS, default="jsonl")
+    changes.add_argument("--output-dir", default="exports", help="directory for delta files (default: exports)")
+    changes.add_argument("--pending", action="store_true",
+                         help="only report how many rows changed; don't export or move the watermark")
+    changes.set_defaults(func=cmd_changes)
+
+    view = sub.add_parser("view", help="print database contents")
+    view.add_argument("--limit", type=int, default=50)
+    view.add_argument("--tablefmt", default="simple", help="tabulate table format")
+    view.set_defaults(func=cmd_view)
+
+    migrate = sub.add_parser("migrate", help="convert an old database to the current schema")
+    migrate.set_defaults(func=cmd_migrate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logger(args.log_file, args.log_level)
+    if not args.profile:
+        return args.func(args)
+
+    from etl import profiling
+
+    profiling.enable(args.profile_dir)
+    try:
+        return args.func(args)
+    finally:
+        profiling.disable()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Source connectors.
+
+Each upstream API is a ``Connector`` registered by name. A connector
+declares how it wants to be called:
+
+    provides     CountryBatch columns it fills
+    batch_size   countries per ``fetch_batch`` call
+    concurrency  calls in flight at once, across all callers (the
+                 host's adaptive limit in etl.limiter applies below it)
+    cache_ttl    seconds a result is shared through etl.singleflight
+    fallback_for connector whose empty results this one fills in
+    health_url   small request etl.health uses to probe the upstream
+
+``enrich`` runs the independent connectors at the same time, merges
+their results by country name and then asks fallbacks for whatever is
+still missing, so a new source costs its own latency in parallel with
+the others rather than after them. Adding one is a subclass with
+``@register``; list its name in the ``sources`` passed to ``enrich``.
+
+Built-ins: "restcountries" (country list), "open-meteo" (current
+weather, geocoding when a record has no coordinates) and "wttr.in"
+(weather fallback).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from etl import archive, singleflight
+from etl.logger_config import get_logger, timed
+from etl.schema import to_epoch
+
+COUNTRIES_API = "https://restcountries.com/v3.1/all"
+COUNTRY_BY_NAME_API = "https://restcountries.com/v3.1/name/"
+GEOCODING_API = "https://geocoding-api.open-meteo.com/v1/search"
+WEATHER_API = "https://api.open-meteo.com/v1/forecast"
+WTTR_API = "https://wttr.in/"
+
+# Upper bound on threads per fetch_all; etl.limiter adapts below it per host
+ENRICH_WORKERS = int(os.environ.get("ETL_ENRICH_WORKERS", "16"))
+
+# Default sources for weather enrichment, in merge priority order
+WEATHER_SOURCES = ("open-meteo", "wttr.in")
+
+# Columns the loader takes from them; its rows keep the snapshot time as timestamp
+WEATHER_COLUMNS = ("temperature_c", "windspeed", "conditions")
+
+WEATHER_CODES = {
+    0: "Clear sky",
+    1: "Mainly clear",
+    2: "Partly cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Depositing rime fog",
+    51: "Light drizzle",
+    53: "Moderate drizzle",
+    55: "Dense drizzle",
+    61: "Slight rain",
+    63: "Moderate rain",
+    65: "Heavy rain",
+    71: "Slight snow",
+    73: "Moderate snow",
+    75: "Heavy snow",
+    95: "Thunderstorm",
+    96: "Thunderstorm with hail",
+    99: "Severe thunderstorm with hail"
+}
+
+_registry = {}
+
+
+def decode_weathercode(code):
+    return WEATHER_CODES.get(code, "Unknown")
+
+
+def _get(url, source, params=None, timeout=5):
+    response = archive.get(url, source, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+def _get_json(url, source, params=None, timeout=5):
+    return _get(url, source, params, timeout).json()
+
+
+# ---------------------------------------------------
+# BASE CLASS / REGISTRY
+# ---------------------------------------------------
+class Connector:
+    name = None
+    provides = ()
+    batch_size = 1
+    concurrency = 4
+    cache_ttl = singleflight.WEATHER_TTL
+    fallback_for = None
+    health_url = None
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+
+    def cached(self, kind, key, fn, *args):
+        """Coalesced ``fn(*args)``, kept for this connector's ``cache_ttl``."""
+        return singleflight.lookup(kind, key, fn, *args, ttl=self.cache_ttl)
+
+    def fetch_batch(self, records):
+        """One dict of column values per record ({} when nothing was found)."""
+        return [self.fetch_one(record) for record in records]
+
+    def fetch_one(self, record):
+        raise NotImplementedError
+
+
+def register(cls):
+    """Class decorator: instantiate and register a connector under ``cls.name``."""
+    _registry[cls.name] = cls()
+    return cls
+
+
+def get(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"no connector named {name!r}; registered: {', '.join(_registry)}")
+
+
+def registered():
+    return list(_registry.values())
+
+
+# ---------------------------------------------------
+# BUILT-IN CONNECTORS
+# ---------------------------------------------------
+@register
+class RestCountries(Connector):
+    """Country facts. Feeds the batch rather than enriching it."""
+
+    name = "restcountries"
+    concurrency = 2
+    cache_ttl = 0  # the archive already keeps every list
+    health_url = "https://restcountries.com/v3.1/alpha/gb?fields=name"
+
+    def fetch_all(self):
+        """(countries, fetched_at); under replay fetched_at is the snapshot time."""
+        response = _get(COUNTRIES_API, self.name, timeout=10)
+        return response.json(), response.fetched_at
+
+    def fetch_name(self, country_name):
+        """(countries matching ``country_name``, fetched_at)."""
+        response = _get(f"{COUNTRY_BY_NAME_API}{country_name}", self.name, timeout=10)
+        data = response.json()
+        return (data if isinstance(data, list) else [data]), response.fetched_at
+
+
+@register
+class OpenMeteo(Connector):
+    name = "open-meteo"
+    provides = ("temperature_c", "windspeed", "conditions", "timestamp")
+    concurrency = 8
+    health_url = f"{WEATHER_API}?latitude=51.5&longitude=-0.1&current_weather=true"
+
+    def geocode(self, place):
+        """(lat, lon) for a place name, or None."""
+        return self.cached("geocode", place.strip().casefold(), self._geocode, place)
+
+    def current(self, lat, lon):
+        """Open-Meteo ``current_weather`` dict; nearby points share one request."""
+        cell = singleflight.grid_cell(lat, lon)
+        return self.cached("forecast", cell, self._current, *singleflight.cell_centre(cell))
+
+    def fetch_one(self, record):
+        if record.lat is not None and record.lon is not None:
+            location = (record.lat, record.lon)
+        else:
+            location = self.geocode(record.name)
+        if location is None:
+            return {}
+
+        current = self.current(*location)
+        if not current:
+            return {}
+        return {
+            "temperature_c": current.get("temperature"),
+            "windspeed": current.get("windspeed"),
+            "conditions": decode_weathercode(current.get("weathercode")),
+            "timestamp": to_epoch(current.get("time")),  # observation time
+        }
+
+    def _geocode(self, place):
+        g = _get_json(GEOCODING_API, self.name, params={"name": place, "count": 1})
+        if g.get("results"):
+            return g["results"][0]["latitude"], g["results"][0]["longitude"]
+        return None
+
+    def _current(self, lat, lon):
+        params = {"latitude": lat, "longitude": lon, "current_weather": True}
+        return _get_json(WEATHER_API, self.name, params=params).get("current_weather")
+
+
+@register
+class Wttr(Connector):
+    name = "wttr.in"
+    provides = ("temperature_c", "conditions")
+    concurrency = 2  # throttles hard
+    fallback_for = "open-meteo"
+    health_url = f"{WTTR_API}London?format=%t"
+
+    def fetch_one(self, record):
+        current = self.cached("wttr.in", record.name.strip().casefold(), self._current, record.name)
+        return {
+            "temperature_c": float(current["temp_C"]),
+            "conditions": current["weatherDesc"][0]["value"],
+        }
+
+    def _current(self, place):
+        return _get_json(f"{WTTR_API}{place}", self.name, params={"format": "j1"})["current_condition"][0]
+
+
+# ---------------------------------------------------
+# PARALLEL FETCH / MERGE
+# ---------------------------------------------------
+def _fetch_chunk(connector, chunk):
+    with connector.slots:
+        try:
+            with timed(connector.name, level=logging.DEBUG, countries=len(chunk)):
+                return connector.fetch_batch(chunk)
+        except Exception as e:
+            get_logger().warning(f"{connector.name} lookup failed", extra={
+                "stage": "enrich", "source": connector.name,
+                "country": ", ".join(r.name for r in chunk), "error": repr(e)
+            })
+            return [{} for _ in chunk]
+
+
+def fetch_all(work):
+    """
+    Run ``{connector: [records]}`` concurrently. Returns
+    ``{connector name: {country name: values}}``.
+    """
+    calls = [
+        (connector, records[i:i + connector.batch_size])
+        for connector, records in work.items()
+        for i in range(0, len(records), connector.batch_size)
+    ]
+    results = {connector.name: {} for connector in work}
+    if not calls:
+        return results
+
+    workers = sum(min(c.concurrency, len(records)) for c, records in work.items() if records)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, ENRICH_WORKERS))) as pool:
+        futures = [(connector, chunk, pool.submit(_fetch_chunk, connector, chunk))
+                   for connector, chunk in calls]
+        for connector, chunk, future in futures:
+            for record, values in zip(chunk, future.result()):
+                results[connector.name][record.name] = values
+    return results
+
+
+def enrich(batch, sources=WEATHER_SOURCES, columns=None):
+    """
+    Fill ``batch`` from the named connectors and return it. Each country
+    name is fetched once; a column keeps its current value when no
+    source has one. ``columns`` limits which provided columns are
+    written (default: all of them).
+    """
+    selected = [get(name) for name in sources]
+    # A fallback whose primary isn't selected runs as a primary
+    fallbacks = [c for c in selected if c.fallback_for in sources]
+    primaries = [c for c in selected if c not in fallbacks]
+
+    records = {}
+    for record in batch:
+        records.setdefault(record.name, record)
+    merged = {key: {} for key in records}
+
+    def merge(results):
+        for connector_results in results.values():
+            for key, values in connector_results.items():
+                for field, value in values.items():
+                    if value is not None:
+                        merged[key].setdefault(field, value)
+
+    primary_results = fetch_all({c: list(records.values()) for c in primaries})
+    merge(primary_results)
+
+    missing = {
+        c: [r for key, r in records.items()
+            if not any(primary_results[c.fallback_for].get(key, {}).get(f) is not None for f in c.provides)]
+        for c in fallbacks
+    }
+    merge(fetch_all(missing))
+
+    names = batch.columns["name"]
+    for field in dict.fromkeys(f for c in selected for f in c.provides):
+        if columns is not None and field not in columns:
+            continue
+        current = batch.values(field)
+        batch.set_column(field, [merged[n].get(field, v) for n, v in zip(names, current)])
+    return batch
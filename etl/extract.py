@@ -1,25 +1,19 @@
-import requests
+from etl import connectors
+from etl.logger_config import get_logger
 
-MAIN_API = "https://restcountries.com/v3.1/all"
-FALLBACK_API = "https://restcountries.com/v3.1/name/"
+logger = get_logger()
 
 def fetch_countries():
     try:
-        response = requests.get(MAIN_API, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return connectors.get("restcountries").fetch_all()[0]
     except Exception as e:
-        print(f"Main API failed: {e}")
+        logger.warning("Main API failed", extra={"stage": "extract", "error": str(e)})
         return []
 
 def fetch_country(country_name):
     try:
-        response = requests.get(f"{FALLBACK_API}{country_name}", timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if isinstance(data, list):
-            return data
-        return [data]
+        return connectors.get("restcountries").fetch_name(country_name)[0]
     except Exception as e:
-        print(f"Fallback API failed: {e}")
+        logger.warning("Fallback API failed",
+                       extra={"stage": "extract", "country": country_name, "error": str(e)})
         return []
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Background health prober for the upstream APIs.
+
+A daemon thread sends each registered connector's ``health_url`` (a
+request of a few hundred bytes) every ``ETL_HEALTH_INTERVAL`` seconds
+(default 30), all upstreams in parallel, and keeps the last
+``HISTORY`` results per upstream: status, HTTP code and latency.
+Database size and disk usage are refreshed on the same tick. ``report``
+returns the cached state without doing any I/O, so the Flask /health
+route and the Streamlit page answer instantly however often a load
+balancer polls them.
+
+An upstream is "up" when it answers 2xx within ``SLOW_SECONDS``,
+"degraded" when it is slow or throttling (429/503), and "down"
+otherwise. Probes go straight to ``requests``, not through the archive
+or the per-host limiters, so they neither pollute replay data nor wait
+behind a running refresh.
+"""
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from etl import connectors
+from etl.logger_config import get_logger
+
+INTERVAL = float(os.environ.get("ETL_HEALTH_INTERVAL", "30"))
+TIMEOUT = 5
+SLOW_SECONDS = 2.0
+HISTORY = 20
+
+_THROTTLED = (429, 503)
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def probe(url, timeout=TIMEOUT):
+    """One check: {"status", "http_status", "latency_ms", "checked_at", "error"}."""
+    import requests
+
+    started = time.perf_counter()
+    result = {"http_status": None, "error": None, "checked_at": _iso(time.time())}
+    try:
+        response = requests.get(url, timeout=timeout)
+        result["http_status"] = response.status_code
+    except requests.RequestException as e:
+        result["error"] = repr(e)
+    latency = time.perf_counter() - started
+    result["latency_ms"] = round(latency * 1000, 1)
+
+    code = result["http_status"]
+    if code is not None and 200 <= code < 300:
+        result["status"] = "up" if latency <= SLOW_SECONDS else "degraded"
+    elif code in _THROTTLED:
+        result["status"] = "degraded"
+    else:
+        result["status"] = "down"
+    return result
+
+
+def local_stats(db_path):
+    """Database size and disk usage for the working directory."""
+    stats = {}
+    if os.path.exists(db_path):
+        stats["Database Size"] = f"{round(os.path.getsize(db_path) / (1024 * 1024), 3)} MB"
+    else:
+        stats["Database Size"] = "No database found"
+    total, used, free = shutil.disk_usage(os.getcwd())
+    stats["Disk Total"] = f"{round(total / (1024**3), 2)} GB"
+    stats["Disk Used"] = f"{round(used / (1024**3), 2)} GB"
+    stats["Disk Free"] = f"{round(free / (1024**3), 2)} GB"
+    return stats
+
+
+class HealthProber:
+    def __init__(self, db_path, interval=INTERVAL, history=HISTORY, targets=None):
+        self.db_path = db_path
+        self.interval = interval
+        # {name: url}; defaults to every connector that declares a health_url
+        self.targets = targets or {c.name: c.health_url for c in connectors.registered() if c.health_url}
+        self.history = {name: deque(maxlen=history) for name in self.targets}
+        self.local = local_stats(db_path)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe_once(self):
+        """Check every target in parallel and refresh the local stats."""
+        with ThreadPoolExecutor(max_workers=max(1, len(self.targets))) as pool:
+            results = dict(zip(self.targets, pool.map(probe, self.targets.values())))
+        local = local_stats(self.db_path)
+        with self._lock:
+            for name, result in results.items():
+                self.history[name].append(result)
+            self.local = local
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe_once()
+            except Exception as e:
+                get_logger().warning("Health probe failed", extra={"stage": "health", "error": repr(e)})
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self):
+        """Cached results; upstreams not probed yet report status "pending"."""
+        with self._lock:
+            upstreams = {}
+            for name, results in self.history.items():
+                if not results:
+                    upstreams[name] = {"status": "pending"}
+                    continue
+                latencies = sorted(r["latency_ms"] for r in results)
+                upstreams[name] = {
+                    **results[-1],
+                    "uptime": round(sum(r["status"] != "down" for r in results) / len(results), 3),
+                    "median_latency_ms": latencies[len(latencies) // 2],
+                    "history": [{k: r[k] for k in ("checked_at", "status", "latency_ms")} for r in results],
+                }
+            local = dict(self.local)
+
+        countries = upstreams.get("restcountries", {}).get("status", "pending")
+        if countries == "pending":
+            availability = "PENDING"
+        else:
+            availability = "PASS" if countries in ("up", "degraded") else "FAIL"
+        return {
+            # Kept from the old live check for existing dashboards
+            "API Availability": availability,
+            **local,
+            "upstreams": upstreams,
+        }
+
+
+_prober = None
+_prober_lock = threading.Lock()
+
+
+def start(db_path, interval=INTERVAL):
+    """Start the process-wide prober once; later calls return the running one."""
+    global _prober
+    with _prober_lock:
+        if _prober is None:
+            _prober = HealthProber(db_path, interval).start()
+        return _prober
+
+
+def report(db_path):
+    """Cached health for the process, starting the prober on first use."""
+    return start(db_path).report()
@@ -0,0 +1,135 @@
+"""
+Run journal: durable per-country progress for long refreshes.
+
+Every refresh opens a ``run_journal`` row and records each country in
+``run_progress`` as it moves through extracted -> enriched -> loaded,
+together with the record as it stood at that step (so the country list
+and any weather already fetched survive a crash). A run started with
+``resume=True`` picks up the newest unfinished run for the same query
+and only does the remaining work, logging under the original run id
+(etl.logger_config) so both attempts read as one run. Finished runs
+drop their progress rows.
+
+The journal lives in the pipeline database, next to the data it
+describes.
+"""
+import json
+
+from etl import logger_config
+from etl.records import CountryRecord
+from etl.schema import now_epoch
+
+STAGES = ("extracted", "enriched", "loaded")
+
+
+def init_journal(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS run_journal (
+        id INTEGER PRIMARY KEY,
+        query TEXT NOT NULL,
+        started_at INTEGER NOT NULL,
+        finished_at INTEGER,
+        status TEXT NOT NULL,
+        log_run_id TEXT
+    )
+    """)
+    # Journals created before runs kept their log id
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(run_journal)")]
+    if "log_run_id" not in columns:
+        cursor.execute("ALTER TABLE run_journal ADD COLUMN log_run_id TEXT")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS run_progress (
+        run_id INTEGER NOT NULL REFERENCES run_journal (id),
+        seq INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        record TEXT NOT NULL,
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (run_id, seq)
+    ) WITHOUT ROWID
+    """)
+
+
+def unfinished_run(conn, query):
+    """Id of the newest unfinished run for ``query``, or None."""
+    row = conn.execute("""
+        SELECT id FROM run_journal
+        WHERE query = ? AND finished_at IS NULL
+        ORDER BY id DESC LIMIT 1
+    """, (query,)).fetchone()
+    return row[0] if row else None
+
+
+class RunJournal:
+    def __init__(self, conn, run_id, resumed=False):
+        self.conn = conn
+        self.run_id = run_id
+        self.resumed = resumed
+
+    @classmethod
+    def open(cls, conn, query, resume=False):
+        """
+        Continue the newest unfinished run for ``query`` when ``resume``
+        is set and one exists; otherwise abandon any unfinished runs for
+        the query and start a new one.
+        """
+        if resume:
+            run_id = unfinished_run(conn, query)
+            if run_id is not None:
+                log_run_id = conn.execute(
+                    "SELECT log_run_id FROM run_journal WHERE id = ?", (run_id,)
+                ).fetchone()[0]
+                if log_run_id:
+                    logger_config.set_run_id(log_run_id)
+                return cls(conn, run_id, resumed=True)
+
+        now = now_epoch()
+        with conn:
+            stale = [r[0] for r in conn.execute(
+                "SELECT id FROM run_journal WHERE query = ? AND finished_at IS NULL", (query,)
+            )]
+            for run_id in stale:
+                conn.execute("DELETE FROM run_progress WHERE run_id = ?", (run_id,))
+            conn.execute(
+                "UPDATE run_journal SET finished_at = ?, status = 'abandoned' "
+                "WHERE query = ? AND finished_at IS NULL",
+                (now, query)
+            )
+            cursor = conn.execute(
+                "INSERT INTO run_journal (query, started_at, status, log_run_id) VALUES (?, ?, 'running', ?)",
+                (query, now, logger_config.RUN_ID)
+            )
+        return cls(conn, cursor.lastrowid)
+
+    def checkpoint(self, seqs, records, stage):
+        """Durably record that the countries at positions ``seqs`` reached ``stage``."""
+        now = now_epoch()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO run_progress (run_id, seq, name, stage, record, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id, seq) DO UPDATE SET
+                    stage = excluded.stage,
+                    record = excluded.record,
+                    updated_at = excluded.updated_at
+            """, [
+                (self.run_id, seq, r.name, stage, json.dumps(r.to_dict()), now)
+                for seq, r in zip(seqs, records)
+            ])
+
+    def restore(self):
+        """(records, stages) saved so far, in extraction order; empty for a new run."""
+        rows = self.conn.execute(
+            "SELECT stage, record FROM run_progress WHERE run_id = ? ORDER BY seq",
+            (self.run_id,)
+        ).fetchall()
+        records = [CountryRecord.from_dict(json.loads(record)) for _, record in rows]
+        return records, [stage for stage, _ in rows]
+
+    def finish(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM run_progress WHERE run_id = ?", (self.run_id,))
+            self.conn.execute(
+                "UPDATE run_journal SET finished_at = ?, status = 'finished' WHERE id = ?",
+                (now_epoch(), self.run_id)
+            )
@@ -0,0 +1,114 @@
+"""
+Adaptive (AIMD) concurrency limits per upstream host.
+
+Every request made through ``etl.archive.get`` takes a slot from its
+host's ``AdaptiveLimiter``. While responses come back quickly the limit
+grows by about one slot per round trip (additive increase); a 429/503
+or a timeout halves it and slow responses trim it by 10%
+(multiplicative decrease), at most once per round trip so a burst of
+failures from one window counts once. ``Retry-After`` pauses the whole
+host. The limit a run settled on is available from ``snapshot()``.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+INITIAL_LIMIT = 2
+MAX_LIMIT = int(os.environ.get("ETL_MAX_CONCURRENCY", "16"))
+
+# Latency counts as healthy up to this many seconds, or twice the best
+# latency seen for the host if that is larger
+TARGET_LATENCY = 1.0
+
+_limiters = {}
+_registry_lock = threading.Lock()
+
+
+class AdaptiveLimiter:
+    def __init__(self, host, initial=INITIAL_LIMIT, minimum=1, maximum=MAX_LIMIT,
+                 target_latency=TARGET_LATENCY):
+        self.host = host
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.best_latency = None
+        self.stats = {"requests": 0, "throttled": 0, "timeouts": 0, "errors": 0, "peak": initial}
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot is free and the host isn't paused; returns the start time."""
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+            self.stats["requests"] += 1
+            return time.monotonic()
+
+    def release(self, started, outcome="ok", retry_after=None):
+        """
+        Return a slot. ``outcome`` is "ok", "throttled", "timeout" or
+        "error"; ``retry_after`` (seconds) pauses the host.
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "ok":
+                self._on_success(latency, started)
+            elif outcome in ("throttled", "timeout"):
+                self.stats["throttled" if outcome == "throttled" else "timeouts"] += 1
+                self._decrease(0.5, started)
+            else:
+                self.stats["errors"] += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self._cond.notify_all()
+
+    def _on_success(self, latency, started):
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        if latency <= max(self.target_latency, 2 * self.best_latency):
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.stats["peak"] = max(self.stats["peak"], int(self.limit))
+        else:
+            self._decrease(0.9, started)
+
+    def _decrease(self, factor, started):
+        # Requests sent before the last cut saw the old limit: don't cut again
+        if started < self.last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * factor)
+        self.last_decrease = time.monotonic()
+
+    def snapshot(self):
+        with self._cond:
+            return {"limit": int(self.limit), **self.stats}
+
+
+def limiter_for(url):
+    host = urlparse(url).hostname or url
+    with _registry_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = AdaptiveLimiter(host)
+        return limiter
+
+
+def snapshot():
+    """{host: {"limit", "peak", "requests", "throttled", "timeouts", "errors"}}"""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {l.host: l.snapshot() for l in limiters}
+
+
+def reset():
+    with _registry_lock:
+        _limiters.clear()
@@ -1,7 +1,19 @@
 import os
 import sqlite3
-import requests
-from datetime import datetime
+import threading
+from itertools import repeat
+
+from etl import connectors, limiter, profiling
+from etl.connectors import COUNTRIES_API
+from etl.logger_config import get_logger, timed
+from etl.aggregates import init_aggregates, apply_batch_delta, rebuild_aggregates
+from etl.changes import init_changes, record_changes, rebuild_changes
+from etl.journal import RunJournal, init_journal
+from etl.search import init_search, index_countries, rebuild_search
+from etl.spatial import init_spatial, index_locations, rebuild_spatial
+from etl.validate import init_quarantine, split
+from etl.records import CountryBatch, CountryRecord, as_record
+from etl.schema import create_schema, migrate_legacy, encode_column, encode_sources, now_epoch, chunks
 
 DB_PATH = os.environ.get("DB_PATH", "global_data.db")
 
@@ -9,194 +21,317 @@ DB_PATH = os.environ.get("DB_PATH", "global_data.db")
 # ---------------------------------------------------
 # DATABASE INITIALIZATION
 # ---------------------------------------------------
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
+def init_db(db_path=None):
+    conn = sqlite3.connect(db_path or DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS countries (
-        name TEXT PRIMARY KEY,
-        region TEXT,
-        state_province TEXT,
-        temperature_c REAL,
-        temperature_f REAL,
-        conditions TEXT,
-        timestamp TEXT,
-        last_updated TEXT,
-        fetch_method TEXT,
-        api_used TEXT
-    )
-    """)
+    # Databases written before the normalized schema are upgraded in place
+    migrated = migrate_legacy(conn)
+    create_schema(cursor)
+    init_aggregates(cursor)
+    init_search(cursor)
+    init_spatial(cursor)
+    init_journal(cursor)
+    init_quarantine(cursor)
+    init_changes(cursor)
+
+    # Backfill summaries and indexes for databases created before they existed
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM region_summary)")
+    has_summary = cursor.fetchone()[0]
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM country_fts)")
+    has_index = cursor.fetchone()[0]
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM country_rtree)")
+    has_locations = cursor.fetchone()[0]
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM country_change)")
+    has_changes = cursor.fetchone()[0]
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM country)")
+    has_rows = cursor.fetchone()[0]
+    # Migrated rows bypass the loader, so they aren't in any index yet
+    if has_rows and (migrated or not has_summary):
+        rebuild_aggregates(conn)
+    if has_rows and (migrated or not has_index):
+        rebuild_search(conn)
+    if has_rows and (migrated or not has_locations):
+        rebuild_spatial(conn)
+    if has_rows and not has_changes:
+        rebuild_changes(conn)
 
     conn.commit()
     conn.close()
 
 
-# ---------------------------------------------------
-# WEATHER LOOKUP (NO LAT/LON REQUIRED)
-# ---------------------------------------------------
+_initialized = set()
+_init_lock = threading.Lock()
 
-def decode_weathercode(code):
-    mapping = {
-        0: "Clear sky",
-        1: "Mainly clear",
-        2: "Partly cloudy",
-        3: "Overcast",
-        45: "Fog",
-        48: "Depositing rime fog",
-        51: "Light drizzle",
-        53: "Moderate drizzle",
-        55: "Dense drizzle",
-        61: "Slight rain",
-        63: "Moderate rain",
-        65: "Heavy rain",
-        71: "Slight snow",
-        73: "Moderate snow",
-        75: "Heavy snow",
-        95: "Thunderstorm",
-        96: "Thunderstorm with hail",
-        99: "Severe thunderstorm with hail"
-    }
-    return mapping.get(code, "Unknown")
 
+def ensure_db(db_path=None):
+    """``init_db`` once per database per process, for request handlers."""
+    path = os.path.abspath(db_path or DB_PATH)
+    if path in _initialized:
+        return
+    with _init_lock:
+        if path not in _initialized:
+            init_db(path)
+            _initialized.add(path)
 
+
+# ---------------------------------------------------
+# WEATHER LOOKUP (NO LAT/LON REQUIRED)
+# ---------------------------------------------------
 def fetch_weather(city_name):
     """
-    Weather is fetched by city/country name instead of lat/lon.
-    Open-Meteo supports geocoding by name.
+    Current weather for a city/country name through the weather
+    connectors: Open-Meteo geocodes the name, wttr.in fills in when it
+    has nothing. A lookup that fails is logged and yields empty readings.
     """
-
-    # 1. Geocode name → lat/lon
-    try:
-        geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city_name}&count=1"
-        g = requests.get(geo_url, timeout=5).json()
-
-        if "results" in g and len(g["results"]) > 0:
-            lat = g["results"][0]["latitude"]
-            lon = g["results"][0]["longitude"]
-        else:
-            return {"temperature_c": None, "temperature_f": None, "conditions": None}
-    except Exception:
-        return {"temperature_c": None, "temperature_f": None, "conditions": None}
-
-    # 2. Fetch weather
-    try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast?"
-            f"latitude={lat}&longitude={lon}&current_weather=true"
-        )
-        r = requests.get(url, timeout=5).json()
-
-        if "current_weather" in r:
-            temp_c = r["current_weather"]["temperature"]
-            temp_f = round((temp_c * 9/5) + 32, 1)
-            cond = decode_weathercode(r["current_weather"]["weathercode"])
-
-            return {
-                "temperature_c": temp_c,
-                "temperature_f": temp_f,
-                "conditions": cond
-            }
-    except Exception:
-        pass
-
-    # 3. Fallback: wttr.in
-    try:
-        url = f"https://wttr.in/{city_name}?format=j1"
-        r = requests.get(url, timeout=5).json()
-
-        current = r["current_condition"][0]
-        temp_c = float(current["temp_C"])
-        temp_f = round((temp_c * 9/5) + 32, 1)
-        cond = current["weatherDesc"][0]["value"]
-
-        return {
-            "temperature_c": temp_c,
-            "temperature_f": temp_f,
-            "conditions": cond
-        }
-    except Exception:
-        return {"temperature_c": None, "temperature_f": None, "conditions": None}
+    batch = CountryBatch.from_records([CountryRecord(name=city_name)])
+    record = connectors.enrich(batch, columns=connectors.WEATHER_COLUMNS)[0]
+    return {
+        "temperature_c": record.temperature_c,
+        "temperature_f": record.temperature_f,
+        "conditions": record.conditions
+    }
 
 
 # ---------------------------------------------------
 # FETCH COUNTRY DATA
 # ---------------------------------------------------
-def fetch_country_data(query):
-    url = "https://restcountries.com/v3.1/all"
-    data = requests.get(url, timeout=10).json()
+# Country code fields of a RestCountries record (ISO alpha-2/alpha-3, IOC)
+CODE_FIELDS = ("cca2", "cca3", "cioc")
 
-    results = []
 
-    for item in data:
-        if not isinstance(item, dict):
-            continue
+def _matches(data, query):
+    """Which records of ``data`` ``query`` names: "all", a country code, or part of a name."""
+    query = query.strip().lower()
+    if query == "all":
+        return [True] * len(data)
+    # An exact code wins: "in" is India, not every name containing "in"
+    codes = [any(str(item.get(f) or "").lower() == query for f in CODE_FIELDS) for item in data]
+    if any(codes):
+        return codes
+    return [query in item.get("name", {}).get("common", "").lower() for item in data]
 
-        name = item.get("name", {}).get("common", "")
-        region = item.get("region", "")
-        subregion = item.get("subregion", "")
 
-        if query.lower() == "all" or query.lower() in name.lower():
-            results.append({
-                "name": name,
-                "region": region,
-                "state_province": subregion,
-                "timestamp": datetime.utcnow().isoformat(),
-                "fetch_method": "latest",
-                "api_used": "restcountries.com v3.1"
-            })
+def fetch_country_data(query):
+    """
+    Countries matching ``query``: "all", an ISO/IOC code ("gb", "deu")
+    or part of the common name. Codes are matched within the full list,
+    which is what the archive replays.
+    """
+    data, now = connectors.get("restcountries").fetch_all()
+    data = [item for item in data if isinstance(item, dict)]
+
+    results = CountryBatch()
+
+    for item, matched in zip(data, _matches(data, query)):
+        if matched:
+            name = item.get("name", {}).get("common", "")
+            latlng = item.get("latlng") or [None, None]
+            results.append(CountryRecord(
+                name=name,
+                official_name=item.get("name", {}).get("official"),
+                region=item.get("region", ""),
+                subregion=item.get("subregion", ""),
+                capital=item.get("capital")[0] if item.get("capital") else None,
+                population=item.get("population"),
+                area=item.get("area"),
+                lat=latlng[0],
+                lon=latlng[1] if len(latlng) > 1 else None,
+                timestamp=now,
+                fetch_method="latest",
+                api_used="restcountries.com v3.1"
+            ))
 
     return results
 
 
+def enrich_weather(batch):
+    """
+    Fill the weather columns of a batch from the registered weather
+    connectors (etl.connectors), using each country's coordinates.
+    """
+    return connectors.enrich(batch, connectors.WEATHER_SOURCES, connectors.WEATHER_COLUMNS)
+
+
 # ---------------------------------------------------
 # INSERT OR UPDATE COUNTRY
 # ---------------------------------------------------
-def insert_country(conn, country):
+UPSERT_SQL = """
+    INSERT INTO country (
+        name, official_name, capital, region_id, subregion_id, source_id,
+        conditions_id, population, area, lat, lon, temperature_c, windspeed,
+        created_at, updated_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        official_name = COALESCE(excluded.official_name, official_name),
+        capital = COALESCE(excluded.capital, capital),
+        region_id = excluded.region_id,
+        subregion_id = excluded.subregion_id,
+        source_id = excluded.source_id,
+        conditions_id = excluded.conditions_id,
+        population = COALESCE(excluded.population, population),
+        area = COALESCE(excluded.area, area),
+        lat = COALESCE(excluded.lat, lat),
+        lon = COALESCE(excluded.lon, lon),
+        temperature_c = excluded.temperature_c,
+        windspeed = excluded.windspeed,
+        updated_at = excluded.updated_at
+"""
+
+
+def _existing_rows(cursor, names):
+    existing = {}
+    for chunk in chunks(set(names)):
+        marks = ", ".join("?" for _ in chunk)
+        cursor.execute(f"""
+            SELECT name, region_id, subregion_id, temperature_c, conditions_id
+            FROM country WHERE name IN ({marks})
+        """, chunk)
+        for name, *old in cursor.fetchall():
+            existing[name] = tuple(old)
+    return existing
+
+
+def load_batch(conn, batch):
+    """
+    Validate and upsert a CountryBatch that already carries its weather
+    columns, keeping the summary tables, search and location indexes and
+    the change sequence in step. Rows failing etl.validate go to the
+    quarantine table; the rest have their columns dictionary-encoded and
+    bound straight into executemany. Returns
+    "inserted"/"updated"/"quarantined" per row.
+    """
     cursor = conn.cursor()
+    valid, mask = split(cursor, batch, "load")
+    loaded = iter(_upsert_batch(cursor, valid))
+    conn.commit()
+    return [next(loaded) if keep else "quarantined" for keep in mask]
+
+
+def _upsert_batch(cursor, batch):
+    cols = batch.columns
+    names = cols["name"]
 
-    cursor.execute("SELECT name FROM countries WHERE name = ?", (country["name"],))
-    exists = cursor.fetchone()
-
-    weather = fetch_weather(country["name"])
-
-    if exists:
-        cursor.execute("""
-            UPDATE countries
-            SET region = ?, state_province = ?, temperature_c = ?, temperature_f = ?,
-                conditions = ?, last_updated = ?, fetch_method = ?, api_used = ?
-            WHERE name = ?
-        """, (
-            country["region"],
-            country["state_province"],
-            weather["temperature_c"],
-            weather["temperature_f"],
-            weather["conditions"],
-            datetime.utcnow().isoformat(),
-            country["fetch_method"],
-            country["api_used"],
-            country["name"]
-        ))
-        conn.commit()
-        return "updated"
-
-    cursor.execute("""
-        INSERT INTO countries (
-            name, region, state_province, temperature_c, temperature_f,
-            conditions, timestamp, last_updated, fetch_method, api_used
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        country["name"],
-        country["region"],
-        country["state_province"],
-        weather["temperature_c"],
-        weather["temperature_f"],
-        weather["conditions"],
-        country["timestamp"],
-        datetime.utcnow().isoformat(),
-        country["fetch_method"],
-        country["api_used"]
+    region_ids = encode_column(cursor, "dim_region", cols["region"])
+    subregion_ids = encode_column(cursor, "dim_subregion", cols["subregion"])
+    conditions_ids = encode_column(cursor, "dim_conditions", cols["conditions"])
+    source_ids = encode_sources(cursor, cols["fetch_method"], cols["api_used"])
+
+    # Snapshot rows before the write so the summaries get old -> new deltas
+    current = _existing_rows(cursor, names)
+    temps = batch.values("temperature_c")
+    olds, news, statuses = [], [], []
+    for name, new in zip(names, zip(region_ids, subregion_ids, temps, conditions_ids)):
+        old = current.get(name)
+        olds.append(old)
+        news.append(new)
+        statuses.append("updated" if old is not None else "inserted")
+        current[name] = new
+
+    now = now_epoch()
+    created = [now if t != t else t for t in cols["timestamp"]]
+    cursor.executemany(UPSERT_SQL, zip(
+        names, cols["official_name"], cols["capital"], region_ids, subregion_ids,
+        source_ids, conditions_ids, cols["population"], cols["area"], cols["lat"],
+        cols["lon"], cols["temperature_c"], cols["windspeed"], created, repeat(now)
     ))
-    conn.commit()
-    return "inserted"
+
+    apply_batch_delta(cursor, olds, news)
+    index_countries(cursor, names)
+    index_locations(cursor, names)
+    record_changes(cursor, names)
+    return statuses
+
+
+def store_country(conn, country):
+    """Upsert one record (CountryRecord or dict) that already has its weather fields."""
+    return load_batch(conn, CountryBatch.from_records([country]))[0]
+
+
+def insert_country(conn, country):
+    record = as_record(country)
+    weather = fetch_weather(record.name)
+    record.temperature_c = weather["temperature_c"]
+    record.conditions = weather["conditions"]
+    return store_country(conn, record)
+
+
+# ---------------------------------------------------
+# FULL REFRESH (CHECKPOINTED)
+# ---------------------------------------------------
+# Countries loaded per transaction; a crash repeats at most this many loads
+CHECKPOINT_EVERY = 25
+
+
+def run_checkpointed(conn, journal, extract, enrich, every=CHECKPOINT_EVERY):
+    """
+    Extract, enrich and load through ``journal``. ``extract()`` returns a
+    CountryBatch and ``enrich(batch)`` fills its weather columns in place.
+    Countries are enriched ``every`` at a time as one batch (the
+    connectors parallelize and batch within it), journaled, and loaded
+    in one transaction per ``every`` enriched countries. Work a resumed
+    journal already holds is skipped: the country list and fetched
+    weather are reused, and rows loaded earlier report "skipped".
+    Returns (batch, statuses).
+    """
+    records, stages = journal.restore()
+    if not records:
+        with timed("extract"), profiling.stage("extract"):
+            batch, _ = split(conn.cursor(), extract(), "extract", unique=True)
+            records = list(batch)
+        stages = ["extracted"] * len(records)
+        journal.checkpoint(range(len(records)), records, "extracted")
+
+    statuses = ["skipped" if stage == "loaded" else None for stage in stages]
+    ready = [i for i, stage in enumerate(stages) if stage == "enriched"]
+    todo = [i for i, stage in enumerate(stages) if stage == "extracted"]
+
+    def flush():
+        with timed("load", countries=len(ready)), profiling.stage("load"):
+            batch = CountryBatch.from_records([records[i] for i in ready])
+            for i, status in zip(ready, load_batch(conn, batch)):
+                statuses[i] = status
+            journal.checkpoint(ready, [records[i] for i in ready], "loaded")
+        ready.clear()
+
+    for start in range(0, len(todo), every):
+        chunk = todo[start:start + every]
+        # Closed before flush() so the enrich stage never counts load work
+        with timed("enrich", countries=len(chunk)), profiling.stage("enrich"):
+            enriched = enrich(CountryBatch.from_records([records[i] for i in chunk]))
+        for i, record in zip(chunk, enriched):
+            records[i] = record
+        journal.checkpoint(chunk, [records[i] for i in chunk], "enriched")
+        ready.extend(chunk)
+        if len(ready) >= every:
+            flush()
+    if ready:
+        flush()
+
+    journal.finish()
+    limits = limiter.snapshot()
+    if limits:
+        get_logger().info("Upstream concurrency", extra={"stage": "enrich", "limits": limits})
+    return CountryBatch.from_records(records), statuses
+
+
+def refresh(query="all", limit=None, db_path=None, resume=False):
+    """
+    Fetch, enrich and load countries matching ``query``. With ``resume``,
+    continue the last interrupted refresh of the same query instead of
+    starting over. Returns (batch, statuses).
+    """
+    db_path = db_path or DB_PATH
+    init_db(db_path)
+
+    def extract():
+        countries = fetch_country_data(query)
+        return countries if limit is None else countries[:limit]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        journal = RunJournal.open(conn, query, resume)
+        return run_checkpointed(conn, journal, extract, enrich_weather)
+    finally:
+        conn.close()
@@ -1,91 +1,70 @@
-import requests
+import sqlite3
 from difflib import get_close_matches
-from etl.load import init_db, insert_country, insert_weather
+from etl import connectors, load, profiling
+from etl.logger_config import get_logger
+from etl.journal import RunJournal
+from etl.load import init_db, run_checkpointed
 from etl.report import pretty_print_summary, save_summary_csv
+from etl.transform import transform_batch
 
-MAIN_API = "https://restcountries.com/v3.1/all"
-FALLBACK_API = "https://restcountries.com/v3.1/name/"
-
-WEATHER_API = "https://api.open-meteo.com/v1/forecast"
+logger = get_logger()
 
 def fetch_countries(input_name="all"):
+    source = connectors.get("restcountries")
     try:
         if input_name.lower() == "all":
-            resp = requests.get(MAIN_API)
-            resp.raise_for_status()
-            return resp.json()
+            return source.fetch_all()[0]
         else:
-            resp = requests.get(FALLBACK_API + input_name)
-            resp.raise_for_status()
-            return resp.json()
+            return source.fetch_name(input_name)[0]
     except Exception as e:
-        print(f"Main API failed: {e}")
+        logger.warning("Main API failed",
+                       extra={"stage": "extract", "country": input_name, "error": str(e)})
         # fallback exact/fuzzy search
-        resp = requests.get(FALLBACK_API + input_name)
-        resp.raise_for_status()
-        return resp.json()
+        return source.fetch_name(input_name)[0]
 
-def fetch_weather(lat, lon):
-    """Fetch live weather from Open-Meteo API"""
-    if lat is None or lon is None:
-        return None, None, None
-    try:
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "current_weather": True
-        }
-        resp = requests.get(WEATHER_API, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        weather = data.get("current_weather", {})
-        temperature = weather.get("temperature")  # °C
-        windspeed = weather.get("windspeed")      # km/h
-        timestamp = weather.get("time")
-        return temperature, windspeed, timestamp
-    except Exception:
-        return None, None, None
+def select_countries(raw_countries, input_name=None):
+    single = bool(input_name) and input_name.lower() != "all"
+    transformed = transform_batch(
+        raw_countries,
+        fetch_method="single" if single else "all",
+        api_used="restcountries.com v3.1 + open-meteo"
+    )
 
-def transform_country_data(raw_countries, input_name=None):
-    country_names = [c.get("name", {}).get("common","") for c in raw_countries]
-    transformed = []
-    for c in raw_countries:
-        name = c.get("name", {}).get("common")
-        # fuzzy match
-        if input_name and input_name.lower() != "all":
-            match = get_close_matches(input_name, [name], cutoff=0.5)
-            if not match:
-                continue
-            name = match[0]
+    # fuzzy match
+    if single:
+        matches = [get_close_matches(input_name, [name or ""], cutoff=0.5)
+                   for name in transformed.columns["name"]]
+        transformed = transformed.filter(matches)
+        transformed.set_column("name", [m[0] for m in matches if m])
+    return transformed
 
-        lat, lon = (c.get("latlng",[None,None])[:2])
-        temperature, windspeed, timestamp = fetch_weather(lat, lon)
+def enrich_weather(batch):
+    """Weather, wind and observation time from the weather connectors (wttr.in fills gaps)."""
+    return connectors.enrich(batch, connectors.WEATHER_SOURCES)
 
-        country_data = {
-            "name": name,
-            "region": c.get("region"),
-            "population": c.get("population"),
-            "area": c.get("area"),
-            "capital": c.get("capital",[None])[0] if c.get("capital") else None,
-            "lat": lat,
-            "lon": lon,
-            "temperature": temperature,
-            "windspeed": windspeed,
-            "timestamp": timestamp
-        }
-        transformed.append(country_data)
-    return transformed
+def transform_country_data(raw_countries, input_name=None):
+    return enrich_weather(select_countries(raw_countries, input_name))
 
-def run_pipeline():
-    conn = init_db()
-    input_name = input("Enter a country name (or 'all' for all countries): ")
-    raw = fetch_countries(input_name)
-    transformed = transform_country_data(raw, input_name=input_name)
+def run_pipeline(input_name=None, resume=False):
+    """
+    Fetch, enrich and load ``input_name`` with per-country checkpoints.
+    With ``resume``, continue the last interrupted run for the same name.
+    """
+    init_db()
+    if input_name is None:
+        input_name = input("Enter a country name (or 'all' for all countries): ")
 
-    for country in transformed:
-        insert_country(conn, country)
-        insert_weather(conn, country)
+    def extract():
+        return select_countries(fetch_countries(input_name), input_name)
+
+    conn = sqlite3.connect(load.DB_PATH)
+    try:
+        journal = RunJournal.open(conn, input_name, resume)
+        transformed, _ = run_checkpointed(conn, journal, extract, enrich_weather)
+    finally:
+        conn.close()
 
-    pretty_print_summary(transformed)
-    save_summary_csv(transformed)
-    print(f"\nTotal countries processed: {len(transformed)}")
\ No newline at end of file
+    with profiling.stage("report"):
+        pretty_print_summary(transformed)
+        save_summary_csv(transformed)
+    logger.info("Pipeline finished", extra={"stage": "pipeline", "countries": len(transformed)})
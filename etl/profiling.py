@@ -0,0 +1,196 @@
+"""
+Opt-in per-stage profiling for pipeline runs.
+
+    python main.py --profile run --country all
+    python run_pipeline.py all --profile --profile-dir profiles/nightly
+
+When enabled, every ``stage(name)`` block runs under its own cProfile
+profiler and is bracketed by tracemalloc snapshots. ``report`` writes,
+per stage, ``<stage>.prof`` (load with pstats or snakeviz),
+``<stage>.collapsed`` (folded stacks for flamegraph.pl / speedscope) and
+``<stage>.alloc.txt``, plus ``all.collapsed`` covering the whole run, and
+prints the hottest functions and top allocators. When profiling is off,
+``stage`` costs one attribute check.
+"""
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+_active = None
+
+# Stop descending into call paths that account for less than this (seconds)
+MIN_PATH_SECONDS = 1e-6
+
+# Keep the profiler's own bookkeeping out of the allocation report
+_SELF_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class Profiler:
+    def __init__(self, out_dir="profiles", top=15):
+        self.out_dir = out_dir
+        self.top = top
+        self.profiles = {}
+        self.allocations = defaultdict(lambda: [0, 0])  # (stage, file, line) -> [bytes, blocks]
+        self.order = []
+        self.active = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profile the block as ``name``. A stage entered inside another
+        pauses the outer one, so each function call is charged to the
+        innermost stage only.
+        """
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+            self.order.append(name)
+
+        before = tracemalloc.take_snapshot().filter_traces(_SELF_FILTERS)
+        if self.active:
+            self.active[-1].disable()
+        self.active.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.active.pop()
+            if self.active:
+                self.active[-1].enable()
+            after = tracemalloc.take_snapshot().filter_traces(_SELF_FILTERS)
+            for diff in after.compare_to(before, "lineno"):
+                frame = diff.traceback[0]
+                entry = self.allocations[(name, frame.filename, frame.lineno)]
+                entry[0] += diff.size_diff
+                entry[1] += diff.count_diff
+
+    def report(self, stream=None):
+        os.makedirs(self.out_dir, exist_ok=True)
+        combined = {}
+
+        for name in self.order:
+            profile = self.profiles[name]
+            profile.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+
+            stacks = collapsed_stacks(pstats.Stats(profile).stats)
+            _write_collapsed(os.path.join(self.out_dir, f"{name}.collapsed"), stacks)
+            for stack, seconds in stacks.items():
+                combined[f"{name};{stack}"] = seconds
+
+            allocations = self.top_allocations(name)
+            with open(os.path.join(self.out_dir, f"{name}.alloc.txt"), "w", encoding="utf-8") as f:
+                for filename, lineno, size, count in allocations:
+                    f.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {filename}:{lineno}\n")
+
+            buf = io.StringIO()
+            pstats.Stats(profile, stream=buf).sort_stats("tottime").print_stats(self.top)
+            print(f"\n=== Stage: {name} — hottest functions ===", file=stream)
+            print(buf.getvalue().strip(), file=stream)
+            print(f"\n=== Stage: {name} — top allocators ===", file=stream)
+            for filename, lineno, size, count in allocations[:self.top]:
+                print(f"{size / 1024:10.1f} KiB {count:8d} blocks  {filename}:{lineno}", file=stream)
+
+        _write_collapsed(os.path.join(self.out_dir, "all.collapsed"), combined)
+        print(f"\nProfiles written to {self.out_dir}/", file=stream)
+
+    def top_allocations(self, name):
+        rows = [
+            (filename, lineno, size, count)
+            for (stage_name, filename, lineno), (size, count) in self.allocations.items()
+            if stage_name == name and size > 0
+        ]
+        rows.sort(key=lambda r: r[2], reverse=True)
+        return rows
+
+
+# ---------------------------------------------------
+# COLLAPSED STACKS
+# ---------------------------------------------------
+def _label(func):
+    filename, lineno, funcname = func
+    label = funcname if filename == "~" else f"{os.path.basename(filename)}:{funcname}:{lineno}"
+    return label.replace(";", ",").replace(" ", "_")
+
+
+def collapsed_stacks(stats):
+    """
+    Rebuild folded stacks ("a;b;c seconds") from a pstats call graph.
+
+    cProfile only records caller -> callee edges, so a callee's own time
+    is split across the paths that reach it in proportion to the time
+    each caller spent in it (the usual approximation flameprof uses).
+    """
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    stacks = defaultdict(float)
+
+    def walk(func, path, on_path, share):
+        _, _, tottime, cumtime, _ = stats[func]
+        path = path + [_label(func)]
+        if tottime * share > 0:
+            stacks[";".join(path)] += tottime * share
+        for callee, edge_cumtime in callees[func].items():
+            callee_cumtime = stats[callee][3]
+            if callee in on_path or not callee_cumtime:
+                continue
+            callee_share = share * edge_cumtime / callee_cumtime
+            if callee_share * callee_cumtime < MIN_PATH_SECONDS:
+                continue
+            walk(callee, path, on_path | {callee}, min(callee_share, 1.0))
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, [], {func}, 1.0)
+    return dict(stacks)
+
+
+def _write_collapsed(path, stacks):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, seconds in sorted(stacks.items()):
+            micros = int(round(seconds * 1e6))
+            if micros > 0:
+                f.write(f"{stack} {micros}\n")
+
+
+# ---------------------------------------------------
+# MODULE-LEVEL SWITCH
+# ---------------------------------------------------
+def enable(out_dir="profiles", top=15):
+    global _active
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(1)
+    _active = Profiler(out_dir, top)
+    return _active
+
+
+def disable(stream=None):
+    """Write and print the report for the active profiler, then turn profiling off."""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.report(stream)
+        tracemalloc.stop()
+    return profiler
+
+
+@contextmanager
+def _noop():
+    yield
+
+
+def stage(name):
+    """Profile the enclosed block as ``name`` when profiling is enabled."""
+    if _active is None:
+        return _noop()
+    return _active.stage(name)
@@ -0,0 +1,220 @@
+"""
+Country record types shared by transform, load and report.
+
+``CountryRecord`` is a slotted dataclass for single rows; ``CountryBatch``
+holds many rows column by column (``array('d')`` for numbers, lists for
+text) so large runs avoid one dict per country and the loader can bind
+columns straight into ``executemany``.
+
+Missing numbers are stored as NaN inside a batch. SQLite binds NaN as
+NULL, and rows read back through ``CountryBatch`` get ``None``.
+"""
+import math
+from array import array
+from dataclasses import dataclass, fields
+
+from etl.schema import to_epoch
+
+TEXT_FIELDS = (
+    "name", "official_name", "region", "subregion", "capital",
+    "conditions", "fetch_method", "api_used",
+)
+NUMERIC_FIELDS = (
+    "population", "area", "lat", "lon", "temperature_c", "windspeed", "timestamp",
+)
+
+# Keys older code used for the same values
+LEGACY_KEYS = {
+    "state_province": "subregion",
+    "temperature": "temperature_c",
+}
+
+
+# Computed on demand from the stored columns
+DERIVED_FIELDS = ("temperature_f", "density")
+
+
+def c_to_f(c):
+    """°C → °F for a single value or a whole NumPy column (NaN stays NaN)."""
+    if c is None:
+        return None
+    if isinstance(c, (int, float)):
+        return round((c * 9/5) + 32, 2)
+    import numpy as np
+    return np.round(np.asarray(c, dtype=np.float64) * 9/5 + 32, 2)
+
+
+@dataclass(slots=True)
+class CountryRecord:
+    name: str
+    official_name: str = None
+    region: str = None
+    subregion: str = None
+    capital: str = None
+    conditions: str = None
+    fetch_method: str = None
+    api_used: str = None
+    population: int = None
+    area: float = None
+    lat: float = None
+    lon: float = None
+    temperature_c: float = None
+    windspeed: float = None
+    timestamp: int = None  # epoch seconds
+
+    @property
+    def temperature_f(self):
+        return c_to_f(self.temperature_c)
+
+    @property
+    def density(self):
+        """People per km²."""
+        if not self.population or not self.area:
+            return None
+        return round(self.population / self.area, 2)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from any of the dict layouts used across the project."""
+        values = {}
+        for key, value in data.items():
+            key = LEGACY_KEYS.get(key, key)
+            if key in FIELD_NAMES and key not in values:
+                values[key] = value
+        values["timestamp"] = to_epoch(values.get("timestamp"))
+        return cls(**values)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in FIELD_NAMES}
+        data["temperature_f"] = self.temperature_f
+        data["density"] = self.density
+        return data
+
+
+FIELD_NAMES = tuple(f.name for f in fields(CountryRecord))
+
+
+def as_record(country):
+    return country if isinstance(country, CountryRecord) else CountryRecord.from_dict(country)
+
+
+def _num(value):
+    return math.nan if value is None else float(value)
+
+
+def _unnan(value, field):
+    if value != value:  # NaN
+        return None
+    if field in ("population", "timestamp"):
+        return int(value)
+    return value
+
+
+class CountryBatch:
+    """Column-oriented collection of country records."""
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns=None):
+        if columns is None:
+            columns = {f: [] for f in TEXT_FIELDS}
+            columns.update({f: array("d") for f in NUMERIC_FIELDS})
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, records):
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def append(self, record):
+        record = as_record(record)
+        for f in TEXT_FIELDS:
+            self.columns[f].append(getattr(record, f))
+        for f in NUMERIC_FIELDS:
+            self.columns[f].append(_num(getattr(record, f)))
+
+    def extend(self, other):
+        for f in FIELD_NAMES:
+            self.columns[f].extend(other.columns[f])
+
+    def __len__(self):
+        return len(self.columns["name"])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CountryBatch({f: col[i] for f, col in self.columns.items()})
+        values = {f: self.columns[f][i] for f in TEXT_FIELDS}
+        values.update({f: _unnan(self.columns[f][i], f) for f in NUMERIC_FIELDS})
+        return CountryRecord(**values)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def as_numpy(self, name):
+        """
+        Float64 NumPy array for a numeric column. Stored columns are
+        zero-copy views, so don't append to the batch while holding one.
+        """
+        import numpy as np
+
+        if name == "temperature_f":
+            return c_to_f(self.as_numpy("temperature_c"))
+        if name == "density":
+            population, area = self.as_numpy("population"), self.as_numpy("area")
+            density = np.full(len(self), np.nan)
+            np.divide(population, area, out=density, where=(area > 0) & (population > 0))
+            return np.round(density, 2)
+        return np.frombuffer(self.columns[name], dtype=np.float64)
+
+    def column(self, name):
+        """Return a column as stored (NaN for missing numbers)."""
+        if name in DERIVED_FIELDS:
+            return self.as_numpy(name)
+        return self.columns[name]
+
+    def values(self, name):
+        """Return a column as Python values with None for missing numbers."""
+        if name in DERIVED_FIELDS:
+            return [None if v != v else v for v in self.as_numpy(name).tolist()]
+        if name in NUMERIC_FIELDS:
+            return [_unnan(v, name) for v in self.columns[name]]
+        return list(self.columns[name])
+
+    def to_frame(self, names=None):
+        """pandas DataFrame built from the NumPy columns (nullable Int64 for counts)."""
+        import pandas as pd
+
+        data = {}
+        for name in names or FIELD_NAMES + DERIVED_FIELDS:
+            if name in NUMERIC_FIELDS or name in DERIVED_FIELDS:
+                data[name] = self.as_numpy(name)
+                if name in ("population", "timestamp"):
+                    data[name] = pd.array(data[name], dtype="Float64").astype("Int64")
+            else:
+                data[name] = self.columns[name]
+        return pd.DataFrame(data)
+
+    def rows(self, *names):
+        """Zip the given columns into row tuples, e.g. for executemany."""
+        return zip(*(self.column(n) for n in names))
+
+    def set_column(self, name, values):
+        if name in NUMERIC_FIELDS:
+            values = array("d", (_num(v) for v in values))
+        else:
+            values = list(values)
+        if len(values) != len(self):
+            raise ValueError(f"column {name} has {len(values)} values, batch has {len(self)}")
+        self.columns[name] = values
+
+    def filter(self, mask):
+        """Return a new batch with the rows where ``mask`` is true."""
+        keep = [i for i, flag in enumerate(mask) if flag]
+        columns = {}
+        for f, col in self.columns.items():
+            picked = [col[i] for i in keep]
+            columns[f] = array("d", picked) if f in NUMERIC_FIELDS else picked
+        return CountryBatch(columns)
@@ -1,34 +1,33 @@
-import csv
+import os
+
+from etl.records import CountryBatch
+
+SUMMARY_FIELDS = ["name", "region", "population", "area", "capital",
+                  "lat", "lon", "temperature", "temperature_F", "windspeed", "timestamp"]
+
+# Summary column -> CountryBatch column
+SUMMARY_COLUMNS = {"temperature": "temperature_c", "temperature_F": "temperature_f"}
+
+
+def _as_batch(countries):
+    return countries if isinstance(countries, CountryBatch) else CountryBatch.from_records(countries)
+
 
 def pretty_print_summary(countries):
     """Pretty-print country info with °C → °F conversion."""
-    for c in countries:
-        temp_c = c.get("temperature")
-        temp_f = (temp_c * 9/5 + 32) if temp_c is not None else None
-        c["temperature_F"] = temp_f
-
-        print({
-            "name": c.get("name"),
-            "region": c.get("region"),
-            "population": c.get("population"),
-            "area": c.get("area"),
-            "capital": c.get("capital"),
-            "lat": c.get("lat"),
-            "lon": c.get("lon"),
-            "temperature": temp_c,
-            "temperature_F": temp_f,
-            "windspeed": c.get("windspeed"),
-            "timestamp": c.get("timestamp")
-        })
+    batch = _as_batch(countries)
+    # Every column, including °F, is computed once for the whole batch
+    columns = [batch.values(SUMMARY_COLUMNS.get(f, f)) for f in SUMMARY_FIELDS]
+    for row in zip(*columns):
+        print(dict(zip(SUMMARY_FIELDS, row)))
 
 
 def save_summary_csv(countries, filepath="data/summary.csv"):
     """Save country data summary to CSV"""
-    fieldnames = ["name","region","population","area","capital",
-                  "lat","lon","temperature","temperature_F","windspeed","timestamp"]
-
-    with open(filepath, mode="w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for c in countries:
-            writer.writerow({k: c.get(k) for k in fieldnames})
\ No newline at end of file
+    batch = _as_batch(countries)
+    df = batch.to_frame([SUMMARY_COLUMNS.get(f, f) for f in SUMMARY_FIELDS])
+    df.columns = SUMMARY_FIELDS
+
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    df.to_csv(filepath, index=False, encoding="utf-8")
+    return filepath
@@ -0,0 +1,336 @@
+"""
+Storage schema for global_data.db.
+
+Countries live in a single ``country`` table keyed by an integer id.
+Region, subregion, data source and weather conditions are dictionary
+encoded into small ``dim_*`` tables and timestamps are stored as integer
+epoch seconds. A ``countries`` view exposes the historic column layout
+(region/state_province text, ISO timestamps, temperature_f) so readers
+such as the web UIs keep working unchanged.
+
+Older databases (the ``countries`` table written by etl/load.py,
+run_menu.py or the tests) are converted in place by ``migrate``:
+
+    python -m etl.schema global_data.db
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+from etl.aggregates import init_aggregates, rebuild_aggregates
+from etl.logger_config import get_logger
+
+SCHEMA_VERSION = 1
+
+DIMENSIONS = ("dim_region", "dim_subregion", "dim_conditions")
+
+
+# ---------------------------------------------------
+# DDL
+# ---------------------------------------------------
+def create_schema(cursor):
+    for table in DIMENSIONS:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS dim_source (
+        id INTEGER PRIMARY KEY,
+        fetch_method TEXT NOT NULL,
+        api_used TEXT NOT NULL,
+        UNIQUE (fetch_method, api_used)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS country (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        official_name TEXT,
+        capital TEXT,
+        region_id INTEGER NOT NULL REFERENCES dim_region (id),
+        subregion_id INTEGER NOT NULL REFERENCES dim_subregion (id),
+        source_id INTEGER REFERENCES dim_source (id),
+        conditions_id INTEGER REFERENCES dim_conditions (id),
+        population INTEGER,
+        area REAL,
+        lat REAL,
+        lon REAL,
+        temperature_c REAL,
+        windspeed REAL,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    )
+    """)
+
+    # Covers the per-group min/max recompute done by etl.aggregates
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_country_region
+    ON country (region_id, subregion_id, temperature_c)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_country_updated
+    ON country (updated_at)
+    """)
+
+    cursor.execute("""
+    CREATE VIEW IF NOT EXISTS countries AS
+    SELECT
+        c.name AS name,
+        r.name AS region,
+        s.name AS state_province,
+        c.temperature_c AS temperature_c,
+        ROUND(c.temperature_c * 9.0 / 5 + 32, 1) AS temperature_f,
+        w.name AS conditions,
+        strftime('%Y-%m-%dT%H:%M:%S', c.created_at, 'unixepoch') AS timestamp,
+        strftime('%Y-%m-%dT%H:%M:%S', c.updated_at, 'unixepoch') AS last_updated,
+        src.fetch_method AS fetch_method,
+        src.api_used AS api_used,
+        c.windspeed AS windspeed,
+        c.official_name AS official_name,
+        c.capital AS capital,
+        c.population AS population,
+        c.area AS area,
+        c.lat AS lat,
+        c.lon AS lon
+    FROM country c
+    JOIN dim_region r ON r.id = c.region_id
+    JOIN dim_subregion s ON s.id = c.subregion_id
+    LEFT JOIN dim_source src ON src.id = c.source_id
+    LEFT JOIN dim_conditions w ON w.id = c.conditions_id
+    """)
+
+    # A write: only when it changes, so readers don't queue behind a loader
+    if cursor.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+# ---------------------------------------------------
+# ENCODING HELPERS
+# ---------------------------------------------------
+def dim_id(cursor, table, name):
+    """Return the id for ``name`` in a dim_* table, adding it if new."""
+    if name is None:
+        if table == "dim_conditions":
+            return None
+        name = ""
+    cursor.execute(f"INSERT INTO {table} (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+    cursor.execute(f"SELECT id FROM {table} WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+
+def source_id(cursor, fetch_method, api_used):
+    if fetch_method is None and api_used is None:
+        return None
+    fetch_method, api_used = fetch_method or "", api_used or ""
+    cursor.execute("""
+        INSERT INTO dim_source (fetch_method, api_used) VALUES (?, ?)
+        ON CONFLICT (fetch_method, api_used) DO NOTHING
+    """, (fetch_method, api_used))
+    cursor.execute(
+        "SELECT id FROM dim_source WHERE fetch_method = ? AND api_used = ?",
+        (fetch_method, api_used)
+    )
+    return cursor.fetchone()[0]
+
+
+def chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def encode_column(cursor, table, values):
+    """Dictionary-encode a whole column: one id per value, one lookup per distinct value."""
+    blank = None if table == "dim_conditions" else ""
+    values = [blank if v is None else v for v in values]
+    distinct = sorted({v for v in values if v is not None})
+
+    cursor.executemany(
+        f"INSERT INTO {table} (name) VALUES (?) ON CONFLICT (name) DO NOTHING",
+        [(v,) for v in distinct]
+    )
+    ids = {}
+    for chunk in chunks(distinct):
+        marks = ", ".join("?" for _ in chunk)
+        cursor.execute(f"SELECT name, id FROM {table} WHERE name IN ({marks})", chunk)
+        ids.update(cursor.fetchall())
+    return [ids.get(v) for v in values]
+
+
+def encode_sources(cursor, fetch_methods, apis):
+    cache = {}
+    ids = []
+    for pair in zip(fetch_methods, apis):
+        if pair not in cache:
+            cache[pair] = source_id(cursor, *pair)
+        ids.append(cache[pair])
+    return ids
+
+
+def to_epoch(value):
+    """Convert an ISO string / datetime / number to integer epoch seconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def now_epoch():
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+# ---------------------------------------------------
+# MIGRATION
+# ---------------------------------------------------
+def is_legacy(cursor):
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'countries'")
+    row = cursor.fetchone()
+    return row is not None and row[0] == "table"
+
+
+def _has_table(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _legacy_epoch(row, field):
+    """``row[field]`` as epoch seconds; None (and a warning) when it won't parse."""
+    try:
+        return to_epoch(row.get(field))
+    except (TypeError, ValueError, OverflowError):
+        get_logger().warning("Unreadable legacy timestamp", extra={
+            "stage": "migrate", "country": row.get("name"), "field": field, "value": str(row.get(field))
+        })
+        return None
+
+
+def _legacy_rows(cursor):
+    cursor.execute("SELECT * FROM countries_legacy")
+    headers = [d[0] for d in cursor.description]
+    for values in cursor.fetchall():
+        row = dict(zip(headers, values))
+        # run_menu / test schemas used temperature instead of temperature_c
+        if "temperature_c" not in row:
+            row["temperature_c"] = row.get("temperature")
+        yield row
+
+
+def migrate_legacy(conn):
+    """
+    Convert a legacy ``countries`` table into the normalized schema,
+    inside the caller's connection. Duplicate names (run_menu had no
+    primary key) collapse to the most recently written row. The rename,
+    copy and drop commit together; a ``countries_legacy`` table left by
+    an interrupted migration is picked up again. Returns the number of
+    countries kept.
+    """
+    cursor = conn.cursor()
+    legacy = is_legacy(cursor)
+    if not legacy and not _has_table(cursor, "countries_legacy"):
+        return 0
+
+    # sqlite3 doesn't open a transaction before DDL on its own
+    began = not conn.in_transaction
+    if began:
+        cursor.execute("BEGIN")
+    try:
+        kept = _copy_legacy(cursor, legacy)
+    except BaseException:
+        if began:
+            conn.rollback()
+        raise
+    if began:
+        conn.commit()
+    return kept
+
+
+def _copy_legacy(cursor, rename):
+    if rename:
+        cursor.execute("ALTER TABLE countries RENAME TO countries_legacy")
+    # Text-keyed summaries from before the migration are rebuilt by the loader
+    for table in ("region_summary", "subregion_summary", "conditions_summary"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute("DROP INDEX IF EXISTS idx_countries_region")
+    create_schema(cursor)
+
+    now = now_epoch()
+    rows = []
+    for row in _legacy_rows(cursor):
+        if not row.get("name"):
+            continue
+        # One unreadable value must not block the whole migration
+        written = _legacy_epoch(row, "timestamp")
+        last = _legacy_epoch(row, "last_updated")
+        rows.append((last or written or 0, written or now, last or written or now, row))
+    # Oldest first, so duplicate names end on the most recent write
+    rows.sort(key=lambda r: r[0])
+
+    for _, created, updated, row in rows:
+        cursor.execute("""
+            INSERT INTO country (
+                name, region_id, subregion_id, source_id, conditions_id,
+                temperature_c, windspeed, created_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                region_id = excluded.region_id,
+                subregion_id = excluded.subregion_id,
+                source_id = excluded.source_id,
+                conditions_id = excluded.conditions_id,
+                temperature_c = excluded.temperature_c,
+                windspeed = excluded.windspeed,
+                updated_at = excluded.updated_at
+            -- A resumed copy doesn't overwrite rows loaded since
+            WHERE excluded.updated_at >= country.updated_at
+        """, (
+            row["name"],
+            dim_id(cursor, "dim_region", row.get("region")),
+            dim_id(cursor, "dim_subregion", row.get("state_province")),
+            source_id(cursor, row.get("fetch_method"), row.get("api_used")),
+            dim_id(cursor, "dim_conditions", row.get("conditions")),
+            row.get("temperature_c"),
+            row.get("windspeed"),
+            created,
+            updated
+        ))
+
+    cursor.execute("DROP TABLE countries_legacy")
+    cursor.execute("SELECT COUNT(*) FROM country")
+    return cursor.fetchone()[0]
+
+
+def migrate(db_path):
+    """Migrate ``db_path`` in place and compact it. Returns (rows, old_bytes, new_bytes)."""
+    old_size = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            migrate_legacy(conn)
+            create_schema(conn.cursor())
+            init_aggregates(conn.cursor())
+            rebuild_aggregates(conn)
+        rows = conn.execute("SELECT COUNT(*) FROM country").fetchone()[0]
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return rows, old_size, os.path.getsize(db_path)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("DB_PATH", "global_data.db")
+    if not os.path.exists(path):
+        print(f"No database found at {path}")
+        sys.exit(1)
+    rows, before, after = migrate(path)
+    print(f"Migrated {path}: {rows} countries, {before / 1024:.1f} KB -> {after / 1024:.1f} KB")
@@ -0,0 +1,103 @@
+"""
+Full-text search over stored countries (SQLite FTS5).
+
+``country_fts`` holds one document per country (rowid = country.id) with
+the name, official name, capital, region and subregion. The loader calls
+``index_countries`` after every upsert, so the index is always in step
+with ``country``. ``search`` serves autocomplete: every word typed is a
+prefix match and results are ranked with bm25, weighting name matches
+above official name, capital and region.
+"""
+import re
+
+from etl.schema import chunks
+
+# bm25 column weights, in country_fts column order
+RANK_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 1.0)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_DOCUMENT_SQL = """
+    SELECT c.id, c.name, c.official_name, c.capital, r.name, s.name
+    FROM country c
+    JOIN dim_region r ON r.id = c.region_id
+    JOIN dim_subregion s ON s.id = c.subregion_id
+"""
+
+
+# ---------------------------------------------------
+# SCHEMA / MAINTENANCE
+# ---------------------------------------------------
+def init_search(cursor):
+    # prefix='2 3' keeps short autocomplete prefixes off the full term scan
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS country_fts USING fts5(
+        name, official_name, capital, region, subregion,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+
+
+def index_countries(cursor, names):
+    """Re-index the countries called ``names`` from their stored rows."""
+    for chunk in chunks(set(names)):
+        marks = ", ".join("?" for _ in chunk)
+        cursor.execute(f"SELECT id FROM country WHERE name IN ({marks})", chunk)
+        ids = [r[0] for r in cursor.fetchall()]
+        if not ids:
+            continue
+        id_marks = ", ".join("?" for _ in ids)
+        cursor.execute(f"DELETE FROM country_fts WHERE rowid IN ({id_marks})", ids)
+        cursor.execute(f"""
+            INSERT INTO country_fts (rowid, name, official_name, capital, region, subregion)
+            {_DOCUMENT_SQL} WHERE c.id IN ({id_marks})
+        """, ids)
+
+
+def rebuild_search(conn):
+    """Recreate the whole index from ``country``."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM country_fts")
+    cursor.execute(f"""
+        INSERT INTO country_fts (rowid, name, official_name, capital, region, subregion)
+        {_DOCUMENT_SQL}
+    """)
+    conn.commit()
+
+
+# ---------------------------------------------------
+# QUERY
+# ---------------------------------------------------
+def match_expression(text):
+    """
+    Turn free text into an FTS5 query: each word becomes a quoted prefix
+    term, all of which must match. Returns None when there is nothing to
+    search for.
+    """
+    words = _WORD.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search(conn, text, limit=10):
+    """Best matches for ``text`` as dicts, most relevant first."""
+    expression = match_expression(text)
+    if expression is None:
+        return []
+
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    rows = conn.execute(f"""
+        SELECT name, official_name, capital, region, subregion
+        FROM country_fts
+        WHERE country_fts MATCH ?
+        ORDER BY bm25(country_fts, {weights})
+        LIMIT ?
+    """, (expression, limit)).fetchall()
+
+    return [
+        {"name": name, "official_name": official_name, "capital": capital,
+         "region": region, "subregion": subregion}
+        for name, official_name, capital, region, subregion in rows
+    ]
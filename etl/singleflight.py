@@ -0,0 +1,112 @@
+"""
+Request coalescing for the weather and geocoding fetchers.
+
+When the Flask /etl route, the Streamlit page and a scheduled run refresh
+the same countries at once, each would call the same upstream URL. With
+``lookup`` the first caller for a key does the request, concurrent
+callers for that key wait for it and share its result, and the result
+is reused for ``ETL_WEATHER_TTL`` seconds (default 300). Errors are
+shared with the callers that were waiting but never cached.
+
+Coordinates are keyed by ``grid_cell`` (0.1°, about 11 km, the
+resolution of the Open-Meteo models), so nearby points share one
+request for the cell's ``cell_centre``. Whichever caller wins, the same
+URL is fetched and archived, so every point in the cell replays. Each
+connector in etl.connectors caches for its own ``cache_ttl``; the
+etl.load and etl.pipeline paths share the Open-Meteo "forecast" entries.
+"""
+import os
+import threading
+import time
+
+from etl import archive
+
+WEATHER_TTL = float(os.environ.get("ETL_WEATHER_TTL", "300"))
+GRID_DEGREES = 0.1
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """At most one in-flight call per key; results kept for ``ttl`` seconds."""
+
+    def __init__(self, ttl=WEATHER_TTL, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}  # key -> (expires_at, value), oldest first
+
+    def do(self, key, fn, *args, ttl=None, **kwargs):
+        """``fn(*args, **kwargs)`` once per key; ``ttl`` overrides the instance default."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and ttl > 0:
+                    self._store(key, call.value, ttl)
+            call.done.set()
+        return call.value
+
+    def _store(self, key, value, ttl):
+        now = time.monotonic()
+        self._results.pop(key, None)
+        self._results[key] = (now + ttl, value)
+        if len(self._results) > self.max_entries:
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            while len(self._results) > self.max_entries:
+                del self._results[next(iter(self._results))]
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+flights = SingleFlight()
+
+
+def grid_cell(lat, lon, step=GRID_DEGREES):
+    """Snap a coordinate to the corner of its ``step``-degree grid cell."""
+    return round(lat // step * step, 6), round(lon // step * step, 6)
+
+
+def cell_centre(cell, step=GRID_DEGREES):
+    """Centre of a ``grid_cell``: the coordinates fetched for every point in it."""
+    return tuple(round(corner + step / 2, 6) for corner in cell)
+
+
+def lookup(kind, key, fn, *args, ttl=None):
+    """
+    Coalesced ``fn(*args)`` for one upstream lookup, cached for ``ttl``
+    seconds (default ``WEATHER_TTL``). Keys include the archive replay
+    state, so replaying a snapshot never reuses a live result or one
+    from another snapshot.
+    """
+    return flights.do((kind, key, archive.replay_state()), fn, *args, ttl=ttl)
@@ -0,0 +1,166 @@
+"""
+Location queries over stored countries (SQLite R*Tree).
+
+``country_rtree`` holds each country's coordinates as a zero-size box
+keyed by country.id. The loader calls ``index_locations`` after every
+upsert. ``within_bbox`` answers map-viewport queries and ``nearest``
+finds the k closest countries by great-circle distance; both only
+touch the rows the index returns.
+"""
+import math
+
+from etl.schema import chunks
+
+EARTH_RADIUS_KM = 6371.0088
+
+# First search radius for nearest(); grows 4x until k countries are found
+INITIAL_RADIUS_KM = 500.0
+
+_RESULT_SQL = """
+    SELECT c.name, r.name, c.capital, c.lat, c.lon, c.temperature_c
+    FROM country_rtree t
+    JOIN country c ON c.id = t.id
+    JOIN dim_region r ON r.id = c.region_id
+"""
+
+# Candidates come from the index; the exact recheck, order and limit run in SQL
+_BBOX_SQL = """
+    SELECT c.name, r.name, c.capital, c.lat, c.lon, c.temperature_c
+    FROM country c
+    JOIN dim_region r ON r.id = c.region_id
+    WHERE c.id IN ({candidates})
+      AND c.lat BETWEEN ? AND ? AND ({exact})
+    ORDER BY c.name
+    LIMIT ?
+"""
+
+
+# ---------------------------------------------------
+# SCHEMA / MAINTENANCE
+# ---------------------------------------------------
+def init_spatial(cursor):
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS country_rtree USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )
+    """)
+
+
+def index_locations(cursor, names):
+    """Re-index the coordinates of the countries called ``names``."""
+    for chunk in chunks(set(names)):
+        marks = ", ".join("?" for _ in chunk)
+        cursor.execute(f"""
+            DELETE FROM country_rtree
+            WHERE id IN (SELECT id FROM country WHERE name IN ({marks}))
+        """, chunk)
+        cursor.execute(f"""
+            INSERT INTO country_rtree (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT id, lat, lat, lon, lon FROM country
+            WHERE name IN ({marks}) AND lat IS NOT NULL AND lon IS NOT NULL
+        """, chunk)
+
+
+def rebuild_spatial(conn):
+    """Recreate the whole index from ``country``."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM country_rtree")
+    cursor.execute("""
+        INSERT INTO country_rtree (id, min_lat, max_lat, min_lon, max_lon)
+        SELECT id, lat, lat, lon, lon FROM country
+        WHERE lat IS NOT NULL AND lon IS NOT NULL
+    """)
+    conn.commit()
+
+
+# ---------------------------------------------------
+# GEOMETRY
+# ---------------------------------------------------
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lon_ranges(west, east):
+    """Split a longitude span that crosses the antimeridian into two."""
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def _cap_bounds(lat, lon, radius_km):
+    """
+    Bounding box (south, west, north, east) of all points within
+    ``radius_km`` of (lat, lon). West > east means the box wraps.
+    """
+    delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = lat - delta, lat + delta
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+
+    dlon = math.degrees(math.asin(min(1.0, math.sin(math.radians(delta)) / math.cos(math.radians(lat)))))
+    if dlon >= 180:
+        return south, -180.0, north, 180.0
+    west = (lon - dlon + 540) % 360 - 180
+    east = (lon + dlon + 540) % 360 - 180
+    return south, west, north, east
+
+
+def _rows_in(conn, south, west, north, east):
+    rows = []
+    for lo, hi in _lon_ranges(west, east):
+        rows.extend(conn.execute(f"""
+            {_RESULT_SQL}
+            WHERE t.max_lat >= ? AND t.min_lat <= ? AND t.max_lon >= ? AND t.min_lon <= ?
+        """, (south, north, lo, hi)).fetchall())
+    return rows
+
+
+def _as_dict(row, distance_km=None):
+    name, region, capital, lat, lon, temperature_c = row
+    result = {"name": name, "region": region, "capital": capital,
+              "lat": lat, "lon": lon, "temperature_c": temperature_c}
+    if distance_km is not None:
+        result["distance_km"] = round(distance_km, 1)
+    return result
+
+
+# ---------------------------------------------------
+# QUERIES
+# ---------------------------------------------------
+def within_bbox(conn, south, west, north, east, limit=None):
+    """
+    The first ``limit`` countries inside the box (all when None), ordered
+    by name. ``west > east`` is a box crossing the antimeridian (e.g.
+    west=170, east=-170).
+    """
+    lon_ranges = _lon_ranges(west, east)
+    candidates = " UNION ".join(
+        "SELECT id FROM country_rtree WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?"
+        for _ in lon_ranges
+    )
+    # The R*Tree stores 32-bit floats rounded outwards; recheck exact coordinates
+    exact = " OR ".join("c.lon BETWEEN ? AND ?" for _ in lon_ranges)
+    params = [v for lo, hi in lon_ranges for v in (south, north, lo, hi)]
+    params += [south, north] + [v for lo_hi in lon_ranges for v in lo_hi]
+    params.append(-1 if limit is None else limit)  # SQLite: negative LIMIT is no limit
+    rows = conn.execute(_BBOX_SQL.format(candidates=candidates, exact=exact), params).fetchall()
+    return [_as_dict(row) for row in rows]
+
+
+def nearest(conn, lat, lon, k=5):
+    """The ``k`` countries closest to (lat, lon), each with its distance_km."""
+    radius = INITIAL_RADIUS_KM
+    while True:
+        found = {}
+        for row in _rows_in(conn, *_cap_bounds(lat, lon, radius)):
+            found[row[0]] = (haversine_km(lat, lon, row[3], row[4]), row)
+
+        # Only hits within the searched radius are guaranteed to be the closest
+        hits = sorted(v for v in found.values() if v[0] <= radius)
+        if len(hits) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+            return [_as_dict(row, distance) for distance, row in hits[:k]]
+        radius = min(radius * 4, math.pi * EARTH_RADIUS_KM)
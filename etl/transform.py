@@ -1,24 +1,84 @@
+import math
+from array import array
+
+from etl.records import CountryRecord, CountryBatch, TEXT_FIELDS, NUMERIC_FIELDS, c_to_f
+
+
 def transform_country_data(country):
     # extract common fields safely
     name = country.get("name", {}).get("common") if isinstance(country.get("name"), dict) else country.get("name")
+    official_name = country.get("name", {}).get("official") if isinstance(country.get("name"), dict) else None
     capital = country.get("capital")[0] if country.get("capital") else None
     lat = country.get("latlng")[0] if country.get("latlng") else None
     lon = country.get("latlng")[1] if country.get("latlng") else None
 
-    return {
-        "name": name,
-        "region": country.get("region"),
-        "population": country.get("population"),
-        "area": country.get("area"),
-        "capital": capital,
-        "lat": lat,
-        "lon": lon,
-        "temperature": None,   # to be filled if weather API used
-        "windspeed": None,
-        "timestamp": None
+    return CountryRecord(
+        name=name,
+        official_name=official_name,
+        region=country.get("region"),
+        subregion=country.get("subregion"),
+        population=country.get("population"),
+        area=country.get("area"),
+        capital=capital,
+        lat=lat,
+        lon=lon,
+        temperature_c=None,   # to be filled if weather API used
+        windspeed=None,
+        timestamp=None
+    )
+
+
+def _first(values, i):
+    return values[i] if values and len(values) > i else None
+
+
+def transform_batch(raw_countries, **constants):
+    """
+    Normalize a whole RestCountries payload into a CountryBatch.
+
+    Each field is pulled out of the JSON in a single comprehension and all
+    numeric work (NaN handling, unit conversion, derived density) runs as
+    NumPy array operations over the batch. ``constants`` fills a text
+    column with one value, e.g. ``fetch_method="all"``.
+    """
+    import numpy as np
+
+    rows = [c for c in raw_countries if isinstance(c, dict)]
+    n = len(rows)
+    names = [c.get("name") for c in rows]
+    latlng = [c.get("latlng") for c in rows]
+    capitals = [c.get("capital") for c in rows]
+
+    def numeric(values):
+        return np.fromiter(
+            (math.nan if v is None else v for v in values), dtype=np.float64, count=n
+        )
+
+    text = {
+        "name": [v.get("common") if isinstance(v, dict) else v for v in names],
+        "official_name": [v.get("official") if isinstance(v, dict) else None for v in names],
+        "region": [c.get("region") for c in rows],
+        "subregion": [c.get("subregion") for c in rows],
+        "capital": [_first(v, 0) for v in capitals],
     }
+    numbers = {
+        "population": numeric(c.get("population") for c in rows),
+        "area": numeric(c.get("area") for c in rows),
+        "lat": numeric(_first(v, 0) for v in latlng),
+        "lon": numeric(_first(v, 1) for v in latlng),
+    }
+
+    columns = {}
+    for f in TEXT_FIELDS:
+        columns[f] = text.get(f) or [constants.get(f)] * n
+    for f in NUMERIC_FIELDS:
+        values = numbers.get(f)
+        if values is None:
+            values = np.full(n, np.nan)
+        columns[f] = array("d", values.tobytes())
+    return CountryBatch(columns)
+
 
-def c_to_f(c):
-    if c is None:
-        return None
-    return round((c * 9/5) + 32, 2)
\ No newline at end of file
+def transform_countries(raw_countries):
+    """Transform a RestCountries payload into a CountryBatch."""
+    return transform_batch(raw_countries)
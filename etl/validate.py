@@ -0,0 +1,132 @@
+"""
+Batch validation and the quarantine table.
+
+Rules are declared below and checked over whole CountryBatch columns:
+one NumPy mask per range rule, one pass per text column for required
+fields and types. A row that breaks any rule goes to ``quarantine``
+with its reasons and the record as JSON; the rest of the batch loads in
+bulk. ``load_batch`` validates every write, and ``run_checkpointed``
+also checks the extracted list (including duplicate names) so bad
+upstream rows never reach the weather lookups.
+
+    SELECT stage, name, reasons FROM quarantine ORDER BY id DESC;
+"""
+import json
+
+from etl.logger_config import get_logger
+from etl.records import TEXT_FIELDS
+from etl.schema import now_epoch
+
+# Columns that must hold a non-blank string
+REQUIRED = ("name",)
+
+# Column -> (low, high), inclusive; None leaves that side open. Missing
+# values pass, infinities don't
+RANGES = {
+    "population": (0, None),
+    "area": (0, None),
+    "lat": (-90, 90),
+    "lon": (-180, 180),
+    "temperature_c": (-90, 60),
+    "windspeed": (0, 500),
+}
+
+# Columns whose values may appear only once in an extracted batch
+UNIQUE = ("name",)
+
+
+def init_quarantine(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS quarantine (
+        id INTEGER PRIMARY KEY,
+        stage TEXT NOT NULL,
+        name TEXT,
+        reasons TEXT NOT NULL,
+        record TEXT NOT NULL,
+        quarantined_at INTEGER NOT NULL
+    )
+    """)
+
+
+# ---------------------------------------------------
+# RULES
+# ---------------------------------------------------
+def _flag(reasons, mask, reason):
+    for i in mask.nonzero()[0].tolist():
+        reasons[i].append(reason)
+
+
+def check(batch, unique=False):
+    """
+    Reasons per row, aligned with ``batch`` (an empty list for a valid
+    row). With ``unique``, later rows repeating a ``UNIQUE`` value are
+    rejected too.
+    """
+    import numpy as np
+
+    n = len(batch)
+    reasons = [[] for _ in range(n)]
+
+    for field in REQUIRED:
+        blank = np.fromiter(
+            (not (isinstance(v, str) and v.strip()) for v in batch.columns[field]), dtype=bool, count=n
+        )
+        _flag(reasons, blank, f"{field} is required")
+
+    for field in TEXT_FIELDS:
+        wrong = np.fromiter(
+            (v is not None and not isinstance(v, str) for v in batch.columns[field]), dtype=bool, count=n
+        )
+        _flag(reasons, wrong, f"{field} must be text")
+
+    for field, (low, high) in RANGES.items():
+        values = batch.as_numpy(field)
+        bad = np.isinf(values)
+        # NaN compares False, so missing values pass both bounds
+        if low is not None:
+            bad |= values < low
+        if high is not None:
+            bad |= values > high
+        bounds = f"{'' if low is None else low}..{'' if high is None else high}"
+        _flag(reasons, bad, f"{field} out of range {bounds}")
+
+    if unique:
+        for field in UNIQUE:
+            seen = set()
+            repeated = np.zeros(n, dtype=bool)
+            for i, value in enumerate(batch.columns[field]):
+                repeated[i] = value in seen
+                seen.add(value)
+            _flag(reasons, repeated, f"duplicate {field}")
+    return reasons
+
+
+def quarantine(cursor, batch, reasons, stage):
+    """Write the rows of ``batch`` that have reasons; returns how many."""
+    now = now_epoch()
+    rows = [
+        (stage, record.name, "; ".join(why), json.dumps(record.to_dict(), default=str), now)
+        for record, why in zip(batch, reasons) if why
+    ]
+    cursor.executemany("""
+        INSERT INTO quarantine (stage, name, reasons, record, quarantined_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
+
+
+def split(cursor, batch, stage, unique=False):
+    """
+    Quarantine the invalid rows of ``batch``. Returns (valid batch, mask)
+    where ``mask`` marks the rows kept.
+    """
+    reasons = check(batch, unique)
+    mask = [not why for why in reasons]
+    if all(mask):
+        return batch, mask
+    count = quarantine(cursor, batch, reasons, stage)
+    get_logger().warning("Quarantined invalid records", extra={
+        "stage": stage, "count": count,
+        "country": ", ".join(str(r.name) for r, keep in zip(batch, mask) if not keep)
+    })
+    return batch.filter(mask), mask
@@ -1,22 +1,16 @@
-import logging
-from etl.load import init_db
-from etl.pipeline import run
-from etl.report import export_summary_to_csv
-from etl.logger_config import setup_logger
+import sys
+from etl.cli import COMMANDS, main
 
+# Without a subcommand, keep the historic behaviour: refresh 10 countries
+DEFAULT_RUN = ["run", "--country", "all", "--limit", "10"]
 
-if __name__ == "__main__":
-
-    logger = setup_logger()
-
-    logger.info("Starting Global Data ETL Pipeline")
 
-    init_db()
-    run(limit=10)
+def with_default_run(argv):
+    """``argv`` plus DEFAULT_RUN when it names no subcommand (e.g. just ``--profile``)."""
+    if not any(arg in COMMANDS for arg in argv):
+        return argv + DEFAULT_RUN
+    return argv
 
-    logger.info("ETL processing complete")
 
-    file_path = export_summary_to_csv()
-    logger.info(f"Summary exported to {file_path}")
-
-    logger.info("Pipeline finished successfully")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main(with_default_run(sys.argv[1:])))
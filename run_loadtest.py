@@ -0,0 +1,274 @@
+"""
+Local load test for the Flask UI.
+
+Seeds a synthetic database, starts web_ui_flask in a subprocess on a
+free port and drives its routes with N concurrent clients for a fixed
+time. Reports per-route throughput and p50/p95/p99 latency, plus the
+server's RSS (start, peak, end) sampled with psutil:
+
+    python run_loadtest.py --countries 5000 --clients 32 --duration 30
+    python run_loadtest.py --routes /,/summary-data --json results.json
+
+/health answers from the background prober's cache (etl.health), so its
+numbers don't include an upstream round trip.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+DEFAULT_ROUTES = ("/", "/database", "/charts", "/chart-data", "/health")
+REGIONS = {
+    "Africa": ("Northern Africa", "Western Africa", "Eastern Africa"),
+    "Americas": ("South America", "Caribbean", "Central America"),
+    "Asia": ("Southern Asia", "Eastern Asia", "Western Asia"),
+    "Europe": ("Northern Europe", "Western Europe", "Southern Europe"),
+    "Oceania": ("Polynesia", "Melanesia"),
+}
+CONDITIONS = ("Clear sky", "Partly cloudy", "Overcast", "Fog", "Slight rain", "Heavy snow")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------------------------------------------
+# SYNTHETIC DATABASE
+# ---------------------------------------------------
+def synthetic_countries(n, seed=0):
+    """CountryBatch of ``n`` plausible, uniquely named countries."""
+    from etl.records import CountryBatch, CountryRecord
+    from etl.schema import now_epoch
+
+    rng = random.Random(seed)
+    now = now_epoch()
+    batch = CountryBatch()
+    for i in range(n):
+        region = rng.choice(list(REGIONS))
+        batch.append(CountryRecord(
+            name=f"Country {i:05d}",
+            official_name=f"Republic of Country {i:05d}",
+            region=region,
+            subregion=rng.choice(REGIONS[region]),
+            capital=f"Capital {i:05d}",
+            population=rng.randint(1_000, 300_000_000),
+            area=round(rng.uniform(10, 5_000_000), 1),
+            lat=round(rng.uniform(-60, 75), 4),
+            lon=round(rng.uniform(-180, 180), 4),
+            temperature_c=round(rng.uniform(-30, 45), 1),
+            windspeed=round(rng.uniform(0, 80), 1),
+            conditions=rng.choice(CONDITIONS),
+            timestamp=now - rng.randint(0, 30 * 86400),
+            fetch_method="synthetic",
+            api_used="run_loadtest",
+        ))
+    return batch
+
+
+def seed_database(db_path, n, seed=0):
+    """Create ``db_path`` holding ``n`` synthetic countries; returns their names."""
+    import sqlite3
+    from etl.load import init_db, load_batch
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    init_db(db_path)
+    batch = synthetic_countries(n, seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        load_batch(conn, batch)
+    finally:
+        conn.close()
+    return list(batch.columns["name"])
+
+
+# ---------------------------------------------------
+# SERVER
+# ---------------------------------------------------
+def free_port():
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, timeout=30):
+    """Run web_ui_flask against ``db_path`` in a subprocess; returns the Popen once it answers."""
+    import requests
+
+    env = dict(os.environ, DB_PATH=db_path)
+    code = f"import web_ui_flask; web_ui_flask.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    server = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Flask server exited with code {server.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/search?q=a", timeout=1)
+            return server
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Flask server did not start within {timeout}s")
+
+
+class RssSampler(threading.Thread):
+    """Samples a process's resident set size (bytes) until stopped."""
+
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        import psutil
+
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.samples.append(self.process.memory_info().rss)
+            except Exception:
+                break
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return {
+            "start_mb": round(self.samples[0] / 2**20, 1) if self.samples else None,
+            "peak_mb": round(max(self.samples) / 2**20, 1) if self.samples else None,
+            "end_mb": round(self.samples[-1] / 2**20, 1) if self.samples else None,
+        }
+
+
+# ---------------------------------------------------
+# CLIENTS
+# ---------------------------------------------------
+def client(base_url, routes, names, deadline, results, seed):
+    """One simulated user: cycle through ``routes`` until ``deadline``."""
+    import requests
+
+    rng = random.Random(seed)
+    session = requests.Session()
+    i = seed
+    while time.monotonic() < deadline:
+        route = routes[i % len(routes)]
+        i += 1
+        params = {"country": rng.choice(names)} if route == "/chart-data" else None
+        started = time.perf_counter()
+        try:
+            ok = session.get(base_url + route, params=params, timeout=30).status_code < 500
+        except requests.RequestException:
+            ok = False
+        results.append((route, time.perf_counter() - started, ok))
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(results, elapsed):
+    """Per-route stats (latencies in ms) from (route, seconds, ok) tuples."""
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, seconds, ok in results:
+        by_route[route].append(seconds * 1000)
+        errors[route] += not ok
+
+    summary = {}
+    for route, latencies in by_route.items():
+        latencies.sort()
+        summary[route] = {
+            "requests": len(latencies),
+            "errors": errors[route],
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1),
+        }
+    return summary
+
+
+def run_loadtest(countries=1000, clients=8, duration=10.0, routes=DEFAULT_ROUTES, db_path=None, seed=0):
+    """Seed, serve and load; returns {"routes": ..., "total_rps": ..., "rss": ...}."""
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="etl-loadtest-"), "loadtest.db")
+    names = seed_database(db_path, countries, seed)
+    port = free_port()
+    server = start_server(db_path, port)
+    sampler = RssSampler(server.pid)
+    sampler.start()
+
+    results = []
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    try:
+        threads = [
+            threading.Thread(target=client, args=(
+                f"http://127.0.0.1:{port}", list(routes), names, deadline, results, seed + i
+            ))
+            for i in range(clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        elapsed = time.perf_counter() - started
+        rss = sampler.stop()
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        "countries": countries,
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "total_rps": round(len(results) / elapsed, 1),
+        "routes": summarize(results, elapsed),
+        "rss": rss,
+    }
+
+
+def print_report(report):
+    from tabulate import tabulate
+
+    headers = ["route", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    rows = [[route] + [stats[h] for h in headers[1:]] for route, stats in sorted(report["routes"].items())]
+    print(f"{report['clients']} clients, {report['countries']} countries, {report['seconds']}s")
+    print(tabulate(rows, headers=headers, tablefmt="simple"))
+    rss = report["rss"]
+    print(f"Total: {report['total_rps']} req/s; "
+          f"server RSS {rss['start_mb']} MB -> peak {rss['peak_mb']} MB -> {rss['end_mb']} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Flask UI against a synthetic database")
+    parser.add_argument("--countries", type=int, default=1000, help="rows in the synthetic database")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--routes", default=",".join(DEFAULT_ROUTES), help="comma-separated routes")
+    parser.add_argument("--db", help="where to build the synthetic database (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for data and clients")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run_loadtest(
+        args.countries, args.clients, args.duration,
+        [r.strip() for r in args.routes.split(",") if r.strip()], args.db, args.seed
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
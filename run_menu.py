@@ -3,10 +3,13 @@ import sys
 import sqlite3
 import subprocess
 import time
-from datetime import datetime
-import requests
-import pandas as pd
-from tabulate import tabulate
+
+import etl.load as load
+from etl import connectors
+from etl.journal import RunJournal, unfinished_run
+from etl.logger_config import setup_logger
+from etl.records import CountryBatch, CountryRecord
+from etl.schema import now_epoch
 
 # -----------------------------
 # Database Configuration
@@ -14,80 +17,65 @@ from tabulate import tabulate
 DB_PATH = "global_data.db"
 
 def init_db():
-    """Initialize SQLite database and table if missing"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS countries (
-            name TEXT,
-            region TEXT,
-            state_province TEXT,
-            temperature REAL,
-            windspeed REAL,
-            timestamp TEXT,
-            fetch_method TEXT,
-            api_used TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    """Initialize SQLite database with the shared schema (migrating old files)"""
+    load.init_db(DB_PATH)
 
 # -----------------------------
 # ETL Functions
 # -----------------------------
 def fetch_country_data(name):
     """Fetch country data from free API with fallback"""
-    countries = []
+    source = connectors.get("restcountries")
     try:
         if name.lower() == "all":
-            response = requests.get("https://restcountries.com/v3.1/all")
-            response.raise_for_status()
-            data = response.json()
+            data, _ = source.fetch_all()
             method = "all"
             api_used = "restcountries.com v3.1"
         else:
-            response = requests.get(f"https://restcountries.com/v3.1/name/{name}")
-            response.raise_for_status()
-            data = response.json()
+            data, _ = source.fetch_name(name)
             method = "single"
             api_used = "restcountries.com v3.1"
     except Exception as e:
         print(f"Failed to fetch country data: {e}")
-        return []
+        return CountryBatch()
 
+    countries = CountryBatch()
+    now = now_epoch()
     for c in data:
-        country = {
-            "name": c.get("name", {}).get("common", ""),
-            "region": c.get("region", ""),
-            "state_province": c.get("subregion", ""),
-            "temperature": None,
-            "windspeed": None,
-            "timestamp": datetime.now().isoformat(),
-            "fetch_method": method,
-            "api_used": api_used
-        }
-        countries.append(country)
+        countries.append(CountryRecord(
+            name=c.get("name", {}).get("common", ""),
+            region=c.get("region", ""),
+            subregion=c.get("subregion", ""),
+            timestamp=now,
+            fetch_method=method,
+            api_used=api_used
+        ))
     return countries
 
 def insert_country(conn, country):
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO countries
-        (name, region, state_province, temperature, windspeed, timestamp, fetch_method, api_used)
-        VALUES (:name, :region, :state_province, :temperature, :windspeed, :timestamp, :fetch_method, :api_used)
-    """, country)
-    conn.commit()
+    load.store_country(conn, country)
 
 def run_etl():
+    from tabulate import tabulate
+
     print("\nRunning ETL pipeline...")
     init_db()
     conn = sqlite3.connect(DB_PATH)
     country_name = input("Enter a country name (or 'all' for all countries): ").strip()
-    countries = fetch_country_data(country_name)
+
+    resume = False
+    if unfinished_run(conn, country_name) is not None:
+        answer = input("An interrupted run for this query was found. Resume it? (y/n): ")
+        resume = answer.strip().lower() == "y"
+    journal = RunJournal.open(conn, country_name, resume)
+    # This menu loads country facts only, so there is nothing to enrich
+    countries, _ = load.run_checkpointed(
+        conn, journal, lambda: fetch_country_data(country_name), lambda batch: batch
+    )
     for country in countries:
-        insert_country(conn, country)
+        row = country.to_dict()
         print("\n--- Country Data ---")
-        print(tabulate([list(country.values())], headers=list(country.keys()), tablefmt="fancy_grid"))
+        print(tabulate([list(row.values())], headers=list(row.keys()), tablefmt="fancy_grid"))
     print(f"\nTotal countries processed: {len(countries)}")
     conn.close()
     input("\nPress Enter to return to menu...")
@@ -96,6 +84,8 @@ def run_etl():
 # Database Operations
 # -----------------------------
 def view_db():
+    from tabulate import tabulate
+
     init_db()
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -111,18 +101,19 @@ def view_db():
     input("\nPress Enter to return to menu...")
 
 def export_db():
+    from etl import analytics
+
     init_db()
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM countries", conn)
-    conn.close()
+    df = analytics.export_frame(DB_PATH)
 
     while True:
         print("\n--- Export Menu ---")
         print("1. CSV")
         print("2. JSON")
         print("3. Excel")
-        print("4. Back to Database Menu")
-        choice = input("Choose export format [1-4]: ").strip()
+        print("4. Changes since last export (JSON Lines)")
+        print("5. Back to Database Menu")
+        choice = input("Choose export format [1-5]: ").strip()
         if choice == "1":
             df.to_csv("countries_export.csv", index=False)
             print("Data exported to countries_export.csv")
@@ -136,6 +127,12 @@ def export_db():
             except Exception as e:
                 print(f"Failed to export Excel: {e}")
         elif choice == "4":
+            from etl.changes import export_changes
+            conn = sqlite3.connect(DB_PATH)
+            path, count = export_changes(conn, "run_menu", "jsonl")
+            conn.close()
+            print(f"Exported {count} changed rows to {path}" if path else "No changes since the last export")
+        elif choice == "5":
             break
         else:
             print("Invalid choice. Try again.")
@@ -281,4 +278,5 @@ def main_menu():
 # Entry Point
 # -----------------------------
 if __name__ == "__main__":
+    setup_logger()
     main_menu()
\ No newline at end of file
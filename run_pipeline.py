@@ -1,22 +1,59 @@
-from etl.extract import fetch_countries
-from etl.transform import transform_country_data
-from etl.load import insert_country, insert_weather, init_db
-from etl.report import pretty_print, save_summary
+import argparse
+import sqlite3
 
-def run_real_pipeline():
-    """Run the full ETL pipeline."""
+from etl import load, profiling
+from etl.extract import fetch_countries, fetch_country
+from etl.transform import transform_countries
+from etl.journal import RunJournal
+from etl.logger_config import setup_logger
+from etl.load import enrich_weather, init_db, run_checkpointed
+from etl.report import pretty_print_summary, save_summary_csv
+
+def run_real_pipeline(selected_country=None, resume=False):
+    """
+    Run the full ETL pipeline. Prompts for a country only when none is
+    given. With ``resume``, continue the last interrupted run instead of
+    starting over.
+    """
     init_db()
 
     # Ask user which country
-    selected_country = input("Enter a country name (or 'all' for all countries): ").strip()
+    if selected_country is None:
+        selected_country = input("Enter a country name (or 'all' for all countries): ")
+    selected_country = selected_country.strip()
     if selected_country.lower() == "all":
         selected_country = None
 
-    countries = fetch_countries(selected_country)
-    for c in countries:
-        transform_country_data(c)  # Fill temperature, wind, timestamp etc.
-        insert_country(c)
-        insert_weather(c)
+    def extract():
+        raw = fetch_country(selected_country) if selected_country else fetch_countries()
+        return transform_countries(raw)
+
+    conn = sqlite3.connect(load.DB_PATH)
+    try:
+        journal = RunJournal.open(conn, selected_country or "all", resume)
+        countries, _ = run_checkpointed(conn, journal, extract, enrich_weather)
+    finally:
+        conn.close()
+
+    with profiling.stage("report"):
+        pretty_print_summary(countries)
+        save_summary_csv(countries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full ETL pipeline")
+    parser.add_argument("country", nargs="?", help="country name or 'all' (prompts when omitted)")
+    parser.add_argument("--profile", action="store_true", help="profile each stage (cProfile/tracemalloc)")
+    parser.add_argument("--profile-dir", default="profiles", metavar="DIR",
+                        help="where --profile writes its reports (default: profiles)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted run instead of starting over")
+    args = parser.parse_args()
+    setup_logger()
 
-    pretty_print(countries)
-    save_summary(countries)
\ No newline at end of file
+    if args.profile:
+        profiling.enable(args.profile_dir)
+    try:
+        run_real_pipeline(args.country, args.resume)
+    finally:
+        profiling.disable()
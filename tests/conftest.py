@@ -0,0 +1,69 @@
+"""
+Shared fixtures: canned upstream responses, and isolation of the
+module-level state (archive directory, coalesced flights, host limits)
+that would otherwise leak from one test into the next.
+"""
+import json
+
+import pytest
+import requests
+
+from etl import archive, limiter, singleflight
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode("utf-8")
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+COUNTRIES = [
+    {"name": {"common": "Aland", "official": "Aland Islands"}, "cca2": "AX", "cca3": "ALA",
+     "region": "Europe", "subregion": "North", "latlng": [60.1, 19.9], "population": 30000, "area": 1580.0},
+]
+
+
+def _fake_get(url, params=None, timeout=None, **kwargs):
+    if "restcountries" in url:
+        return FakeResponse(COUNTRIES)
+    if "geocoding" in url:
+        return FakeResponse({"results": [{"latitude": 60.1, "longitude": 19.9}]})
+    if "open-meteo" in url:
+        return FakeResponse({"current_weather": {"temperature": 4.5, "weathercode": 45}})
+    return FakeResponse({}, 404)
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Archive under tmp_path; no cached flights or host limits in or out."""
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    singleflight.flights.clear()
+    limiter.reset()
+    yield
+    singleflight.flights.clear()
+    limiter.reset()
+
+
+@pytest.fixture
+def fake_response():
+    """``fake_response(payload, status_code=200)`` builds a requests-like response."""
+    return FakeResponse
+
+
+@pytest.fixture
+def fake_get():
+    """The canned responder (one country, its geocoding and forecast), not installed."""
+    return _fake_get
+
+
+@pytest.fixture
+def fake_api(monkeypatch, fake_get):
+    """Serve every ``requests.get`` from ``fake_get``."""
+    monkeypatch.setattr(requests, "get", fake_get)
+    return fake_get
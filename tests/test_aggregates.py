@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import datetime
+
+import etl.load as load
+from etl.aggregates import region_summary, subregion_summary, conditions_summary, rebuild_aggregates
+
+
+def make_country(name, region, subregion):
+    return {
+        "name": name,
+        "region": region,
+        "state_province": subregion,
+        "timestamp": datetime.utcnow().isoformat(),
+        "fetch_method": "latest",
+        "api_used": "mock"
+    }
+
+
+def fake_weather(readings):
+    def fetch(name):
+        temp_c, cond = readings[name]
+        return {"temperature_c": temp_c, "temperature_f": None, "conditions": cond}
+    return fetch
+
+
+def test_aggregates_follow_upserts(tmp_path, monkeypatch):
+    monkeypatch.setattr(load, "DB_PATH", str(tmp_path / "agg.db"))
+    readings = {
+        "Aland": (10.0, "Fog"),
+        "Borduria": (20.0, "Clear sky"),
+        "Carpania": (None, None),
+    }
+    monkeypatch.setattr(load, "fetch_weather", fake_weather(readings))
+
+    load.init_db()
+    conn = sqlite3.connect(load.DB_PATH)
+    load.insert_country(conn, make_country("Aland", "Europe", "North"))
+    load.insert_country(conn, make_country("Borduria", "Europe", "East"))
+    load.insert_country(conn, make_country("Carpania", "Asia", "West"))
+
+    europe = [r for r in region_summary(conn) if r["region"] == "Europe"][0]
+    assert europe["countries"] == 2
+    assert europe["avg_temperature_c"] == 15.0
+    assert europe["min_temperature_c"] == 10.0
+    assert europe["max_temperature_c"] == 20.0
+
+    # The max leaves Europe: min/max must be recomputed for that group only
+    readings["Borduria"] = (5.0, "Fog")
+    assert load.insert_country(conn, make_country("Borduria", "Asia", "West")) == "updated"
+
+    regions = {r["region"]: r for r in region_summary(conn)}
+    assert regions["Europe"]["countries"] == 1
+    assert regions["Europe"]["max_temperature_c"] == 10.0
+    assert regions["Asia"]["countries"] == 2
+    assert regions["Asia"]["avg_temperature_c"] == 5.0
+    assert [s["subregion"] for s in subregion_summary(conn, "Europe")] == ["North"]
+    assert conditions_summary(conn) == [{"conditions": "Fog", "countries": 2}]
+
+    incremental = (region_summary(conn), subregion_summary(conn), conditions_summary(conn))
+    rebuild_aggregates(conn)
+    assert (region_summary(conn), subregion_summary(conn), conditions_summary(conn)) == incremental
+    conn.close()
@@ -0,0 +1,125 @@
+import sqlite3
+
+import pytest
+
+from etl import analytics
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch
+
+
+def seeded_db(tmp_path):
+    db = str(tmp_path / "analytics.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load_batch(conn, CountryBatch.from_records([
+        {"name": "Aland", "region": "Europe", "subregion": "North", "population": 30000,
+         "temperature_c": 4.5, "conditions": "Fog", "fetch_method": "latest", "api_used": "mock"},
+        {"name": "Borduria", "region": "Europe", "subregion": "East", "population": 1000,
+         "temperature_c": -2.5},
+        {"name": "Carpania", "region": "Asia", "subregion": "West", "temperature_c": 31.0},
+        {"name": "Drusselstein", "region": "Asia", "subregion": "West"},
+    ]))
+    conn.close()
+    return db
+
+
+def rows(df):
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def test_sqlite_backend_matches_the_countries_view(tmp_path):
+    db = seeded_db(tmp_path)
+    with sqlite3.connect(db) as conn:
+        cursor = conn.execute("SELECT * FROM countries")
+        view_columns = [d[0] for d in cursor.description]
+        view_rows = [list(r) for r in cursor.fetchall()]
+
+    df = analytics.export_frame(db, engine="sqlite")
+    assert list(df.columns) == view_columns
+    assert rows(df) == view_rows
+
+
+def test_rollup_and_histogram_on_sqlite(tmp_path):
+    db = seeded_db(tmp_path)
+
+    rollup = analytics.region_rollup(db, engine="sqlite")
+    assert rollup[["region", "countries", "min_temperature_c", "max_temperature_c"]].values.tolist() == [
+        ["Asia", 2, 31.0, 31.0], ["Europe", 2, -2.5, 4.5]
+    ]
+    # Negative temperatures floor into the band below zero
+    histogram = analytics.temperature_histogram(db, 5, engine="sqlite")
+    assert histogram.values.tolist() == [[-5, 1], [0, 1], [30, 1]]
+
+
+def test_duckdb_backend_returns_the_same_results(tmp_path, monkeypatch):
+    pytest.importorskip("duckdb")
+    monkeypatch.setattr(analytics, "SNAPSHOT_REFRESH", 0)
+    db = seeded_db(tmp_path)
+
+    for query in (analytics.export_frame, analytics.region_rollup, analytics.temperature_histogram):
+        assert rows(query(db, engine="duckdb")) == rows(query(db, engine="sqlite"))
+
+    # New loads are visible on the next query
+    with sqlite3.connect(db) as conn:
+        load_batch(conn, CountryBatch.from_records([{"name": "Elbonia", "region": "Asia", "subregion": "S"}]))
+    assert len(analytics.export_frame(db, engine="duckdb")) == 5
+
+
+def test_duckdb_snapshot_refreshes_at_most_every_interval(tmp_path, monkeypatch):
+    pytest.importorskip("duckdb")
+
+    def no_extension(self):
+        self.conn.execute("CREATE SCHEMA IF NOT EXISTS store")
+        return False
+
+    monkeypatch.setattr(analytics.DuckDBBackend, "_attach", no_extension)
+    monkeypatch.setattr(analytics, "SNAPSHOT_REFRESH", 3600)
+    monkeypatch.setattr(analytics, "_backends", {})
+    db = seeded_db(tmp_path)
+
+    store = analytics.backend(db, "duckdb")
+    assert not store.attached
+    copies = []
+    refresh = analytics.DuckDBBackend._refresh_snapshot
+
+    def counting_refresh(self):
+        version = self.version
+        refresh(self)
+        if self.version != version:
+            copies.append(self.version)
+
+    monkeypatch.setattr(analytics.DuckDBBackend, "_refresh_snapshot", counting_refresh)
+    assert rows(analytics.export_frame(db, engine="duckdb")) == rows(analytics.export_frame(db, engine="sqlite"))
+    assert rows(analytics.region_rollup(db, engine="duckdb")) == rows(analytics.region_rollup(db, engine="sqlite"))
+    assert len(copies) == 1
+
+    # A load within the interval is served from the existing snapshot...
+    with sqlite3.connect(db) as conn:
+        load_batch(conn, CountryBatch.from_records([{"name": "Elbonia", "region": "Asia", "subregion": "S"}]))
+    assert len(analytics.export_frame(db, engine="duckdb")) == 4
+    assert len(copies) == 1
+
+    # ...and picked up once it has passed
+    store.refreshed_at -= 3600
+    assert len(analytics.export_frame(db, engine="duckdb")) == 5
+    assert len(copies) == 2
+
+    # Nothing changed: the interval check doesn't copy again
+    store.refreshed_at -= 3600
+    analytics.region_rollup(db, engine="duckdb")
+    assert len(copies) == 2
+
+
+def test_duckdb_attaches_when_the_extension_is_installed(tmp_path, monkeypatch):
+    duckdb = pytest.importorskip("duckdb")
+    try:
+        duckdb.connect(config={"autoinstall_known_extensions": False}).execute("LOAD sqlite")
+    except duckdb.Error:
+        pytest.skip("DuckDB sqlite extension not installed")
+    monkeypatch.setattr(analytics, "_backends", {})
+    db = seeded_db(tmp_path)
+
+    store = analytics.backend(db, "duckdb")
+    assert store.attached
+    assert rows(analytics.export_frame(db, engine="duckdb")) == rows(analytics.export_frame(db, engine="sqlite"))
+    assert store.version is None
@@ -0,0 +1,71 @@
+import json
+import sqlite3
+
+from etl import api
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch
+
+
+def seed(db, count=25):
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load_batch(conn, CountryBatch.from_records([
+        {"name": f"Country {i:02d}", "region": "Europe" if i % 2 else "Asia", "subregion": "Sub",
+         "temperature_c": float(i), "conditions": "Clear sky",
+         "fetch_method": "latest", "api_used": "mock"}
+        for i in range(count)
+    ]))
+    return conn
+
+
+def test_pages_follow_cursor_with_projection_and_filters(tmp_path):
+    conn = seed(str(tmp_path / "api.db"))
+    params = api.parse_params({"fields": "name,temperature_f", "region": "Europe",
+                               "min_temp": "3", "limit": "4"})
+
+    names = []
+    while True:
+        page = api.fetch_page(conn, params)
+        assert all(set(row) == {"name", "temperature_f"} for row in page["data"])
+        names.extend(row["name"] for row in page["data"])
+        if page["next_cursor"] is None:
+            break
+        params = dict(params, after=api.decode_cursor(page["next_cursor"]))
+
+    assert names == [f"Country {i:02d}" for i in range(3, 25, 2)]
+    conn.close()
+
+
+def test_stream_ndjson_returns_every_row(tmp_path, monkeypatch):
+    db = str(tmp_path / "api.db")
+    seed(db).close()
+    monkeypatch.setattr(api, "STREAM_BATCH", 7)
+    params = api.parse_params({"fields": "name,region", "max_temp": "19.5", "limit": "1"})
+
+    lines = b"".join(api.stream_ndjson(db, params)).splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == 20
+    assert rows[0] == {"name": "Country 00", "region": "Asia"}
+
+
+def test_invalid_params_are_rejected():
+    for args in ({"fields": "name,secret"}, {"limit": "0"}, {"min_temp": "warm"},
+                 {"cursor": "!!"}, {"updated_since": "yesterday"}):
+        try:
+            api.parse_params(args)
+        except api.QueryError:
+            continue
+        raise AssertionError(f"accepted {args}")
+    assert api.parse_params({"updated_since": "2024-01-01"})["updated_since"] == 1704067200
+
+
+def test_bbox_limit_is_validated():
+    box = {"south": "35", "west": "-10", "north": "60", "east": "30"}
+    assert api.parse_bbox(box) == (35.0, -10.0, 60.0, 30.0, api.MAX_LIMIT)
+    assert api.parse_bbox(dict(box, limit="2"))[4] == 2
+    for limit in ("-1", "0", str(api.MAX_LIMIT + 1), "many"):
+        try:
+            api.parse_bbox(dict(box, limit=limit))
+        except api.QueryError:
+            continue
+        raise AssertionError(f"accepted limit={limit}")
@@ -0,0 +1,32 @@
+import os
+import sqlite3
+
+import requests
+
+from etl import archive, load
+from etl.cli import main
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("replay must not touch the network")
+
+
+def test_replay_rebuilds_without_network(tmp_path, monkeypatch, fake_api):
+    live_db = str(tmp_path / "live.db")
+    load.refresh("all", db_path=live_db)
+
+    # Same body fetched twice is stored once; enrichment uses the country's
+    # coordinates, so only the country list and one forecast are archived
+    archive.store("restcountries", load.COUNTRIES_API, fake_api(load.COUNTRIES_API).content)
+    objects = [f for _, _, files in os.walk(tmp_path / "archive" / "objects") for f in files]
+    assert len(objects) == 2
+
+    monkeypatch.setattr(requests, "get", no_network)
+    replay_db = str(tmp_path / "replay.db")
+    log_file = str(tmp_path / "etl.log")
+    assert main(["--db", replay_db, "--log-file", log_file, "replay", "--all-snapshots"]) == 0
+
+    query = "SELECT name, region, temperature_c, conditions, population FROM countries"
+    with sqlite3.connect(live_db) as live, sqlite3.connect(replay_db) as replayed:
+        assert live.execute(query).fetchall() == replayed.execute(query).fetchall()
+        assert replayed.execute(query).fetchall() == [("Aland", "Europe", 4.5, "Fog", 30000)]
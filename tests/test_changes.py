@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+import sqlite3
+
+import pytest
+
+from etl.changes import export_changes, pending_changes, watermark
+from etl.cli import main
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch
+
+
+def load(conn, *names, temperature=None):
+    load_batch(conn, CountryBatch.from_records([
+        {"name": n, "region": "R", "subregion": "S", "temperature_c": temperature,
+         "fetch_method": "latest", "api_used": "mock"}
+        for n in names
+    ]))
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_each_consumer_gets_only_rows_changed_since_its_watermark(tmp_path):
+    db = str(tmp_path / "changes.db")
+    out = str(tmp_path / "exports")
+    init_db(db)
+    conn = sqlite3.connect(db)
+
+    load(conn, "Aland", "Borduria", "Carpania")
+    path, count = export_changes(conn, "warehouse", "jsonl", out)
+    assert count == 3 and os.path.basename(path) == "warehouse-1-3.jsonl"
+    assert [r["name"] for r in read_jsonl(path)] == ["Aland", "Borduria", "Carpania"]
+    assert export_changes(conn, "warehouse", "jsonl", out) == (None, 0)
+
+    load(conn, "Borduria", temperature=20.0)
+    load(conn, "Drusselstein")
+    assert pending_changes(conn, "warehouse") == 2
+    path, count = export_changes(conn, "warehouse", "jsonl", out)
+    rows = read_jsonl(path)
+    assert [(r["change_seq"], r["name"], r["temperature_c"]) for r in rows] == [
+        (4, "Borduria", 20.0), (5, "Drusselstein", None)
+    ]
+    assert watermark(conn, "warehouse") == 5
+
+    # A second consumer starts from the beginning, with its latest versions only
+    path, count = export_changes(conn, "audit", "csv", out)
+    with open(path, newline="", encoding="utf-8") as f:
+        names = [r["name"] for r in csv.DictReader(f)]
+    assert names == ["Aland", "Carpania", "Borduria", "Drusselstein"]
+    conn.close()
+
+
+def test_existing_rows_are_backfilled_and_cli_exports(tmp_path, capsys):
+    db = str(tmp_path / "old.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load(conn, "Aland", "Borduria")
+    conn.execute("DELETE FROM country_change")
+    conn.commit()
+    conn.close()
+
+    init_db(db)
+    out = str(tmp_path / "exports")
+    assert main(["--db", db, "--log-file", str(tmp_path / "etl.log"),
+                 "changes", "--format", "csv", "--output-dir", out]) == 0
+    assert "Exported 2 changed rows" in capsys.readouterr().out
+    assert main(["--db", db, "--log-file", str(tmp_path / "etl.log"),
+                 "changes", "--format", "csv", "--output-dir", out, "--pending"]) == 0
+    assert capsys.readouterr().out.startswith("0 countries changed")
+
+
+def test_parquet_round_trip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = str(tmp_path / "parquet.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load(conn, "Aland", temperature=4.5)
+
+    path, _ = export_changes(conn, "lake", "parquet", str(tmp_path))
+    table = pq.read_table(path)
+    assert table.column("name").to_pylist() == ["Aland"]
+    assert table.column("temperature_f").to_pylist() == [40.1]
+    conn.close()
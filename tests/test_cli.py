@@ -0,0 +1,63 @@
+import csv
+import sqlite3
+import subprocess
+import sys
+
+from etl.cli import COMMANDS, build_parser, main
+from etl.load import init_db, store_country
+
+
+def test_cli_startup_skips_heavy_imports():
+    code = (
+        "import sys; from etl.cli import build_parser; "
+        "build_parser().parse_args(['run', '--country', 'gb']); "
+        "print(sorted(m for m in ('pandas', 'requests', 'tabulate') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_cli_export_csv(tmp_path):
+    db = str(tmp_path / "cli.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    store_country(conn, {"name": "Testland", "region": "TestRegion", "state_province": "TestProvince",
+                         "temperature_c": 25.0, "conditions": "Clear sky",
+                         "fetch_method": "latest", "api_used": "mock"})
+    conn.close()
+
+    output = tmp_path / "out.csv"
+    log_file = str(tmp_path / "etl.log")
+    assert main(["--db", db, "--log-file", log_file, "export", "--format", "csv", "--output", str(output)]) == 0
+
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["name"] for r in rows] == ["Testland"]
+    assert rows[0]["temperature_f"] == "77.0"
+
+
+def test_profile_flag_does_not_take_the_next_argument():
+    args = build_parser().parse_args(["--profile", "run", "--country", "gb"])
+    assert args.profile is True
+    assert args.profile_dir == "profiles"
+    assert (args.command, args.country) == ("run", "gb")
+
+    args = build_parser().parse_args(["--profile", "--profile-dir", "out", "export"])
+    assert (args.profile, args.profile_dir, args.command) == (True, "out", "export")
+
+
+def test_main_py_bare_profile_runs_the_default_refresh():
+    from main import DEFAULT_RUN, with_default_run
+
+    argv = with_default_run(["--profile"])
+    assert argv == ["--profile"] + DEFAULT_RUN
+    args = build_parser().parse_args(argv)
+    assert args.profile and args.command == "run" and args.limit == 10
+
+    assert with_default_run(["--profile", "view"]) == ["--profile", "view"]
+
+
+def test_cli_commands_match_the_parser():
+    parser = build_parser()
+    sub = next(a for a in parser._actions if a.dest == "command")
+    assert tuple(sub.choices) == COMMANDS
@@ -0,0 +1,191 @@
+import threading
+import time
+
+import requests
+
+from etl import archive, connectors, singleflight
+from etl.connectors import Connector
+from etl.records import CountryBatch, CountryRecord
+
+
+def batch(*names, lat=None, lon=None):
+    return CountryBatch.from_records([CountryRecord(name=n, lat=lat, lon=lon) for n in names])
+
+
+def test_builtins_registered():
+    names = [c.name for c in connectors.registered()]
+    assert names[:3] == ["restcountries", "open-meteo", "wttr.in"]
+    assert connectors.get("wttr.in").fallback_for == "open-meteo"
+
+
+def test_enrich_uses_coordinates_and_dedupes_by_name(monkeypatch, fake_get):
+    urls = []
+
+    def counting_get(url, **kwargs):
+        urls.append(url)
+        return fake_get(url, **kwargs)
+
+    monkeypatch.setattr(requests, "get", counting_get)
+    result = connectors.enrich(batch("Aland", "Aland", lat=60.1, lon=19.9))
+
+    assert result.values("temperature_c") == [4.5, 4.5]
+    assert result.values("conditions") == ["Fog", "Fog"]
+    assert urls == ["https://api.open-meteo.com/v1/forecast"]
+
+
+def test_fallback_fills_only_missing_countries(monkeypatch, fake_response, fake_get):
+    urls = []
+
+    def get(url, params=None, **kwargs):
+        urls.append(url)
+        if "geocoding" in url:
+            found = params["name"] == "Aland"
+            return fake_response({"results": [{"latitude": 60.1, "longitude": 19.9}]} if found else {})
+        if "wttr.in" in url:
+            return fake_response({"current_condition": [
+                {"temp_C": "21", "weatherDesc": [{"value": "Sunny"}]}
+            ]})
+        return fake_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(requests, "get", get)
+    result = connectors.enrich(batch("Aland", "Atlantis"))
+
+    assert result.values("temperature_c") == [4.5, 21.0]
+    assert result.values("conditions") == ["Fog", "Sunny"]
+    assert urls.count("https://wttr.in/Atlantis") == 1
+    assert not any("Aland" in u for u in urls if "wttr.in" in u)
+
+
+def test_independent_connectors_run_in_parallel_with_declared_limits(monkeypatch):
+    active, peaks = {}, {}
+    lock = threading.Lock()
+
+    class Slow(Connector):
+        provides = ("windspeed",)
+
+        def fetch_one(self, record):
+            with lock:
+                active[self.name] = active.get(self.name, 0) + 1
+                peaks[self.name] = max(peaks.get(self.name, 0), active[self.name])
+            time.sleep(0.05)
+            with lock:
+                active[self.name] -= 1
+            return {"windspeed": float(len(record.name))}
+
+    class Air(Slow):
+        name = "test-air"
+        concurrency = 2
+
+    class Sea(Slow):
+        name = "test-sea"
+        provides = ("temperature_c",)
+        concurrency = 4
+
+        def fetch_batch(self, records):
+            assert len(records) <= self.batch_size
+            time.sleep(0.05)
+            return [{"temperature_c": 10.0} for _ in records]
+
+    Sea.batch_size = 3
+    monkeypatch.setattr(connectors, "_registry", dict(connectors._registry))
+    connectors.register(Air)
+    connectors.register(Sea)
+
+    names = [f"country{i:02d}" for i in range(8)]
+    started = time.perf_counter()
+    result = connectors.enrich(batch(*names), ("test-air", "test-sea"))
+    elapsed = time.perf_counter() - started
+
+    assert peaks["test-air"] == 2
+    assert result.values("windspeed") == [9.0] * 8
+    assert result.values("temperature_c") == [10.0] * 8
+    # 4 rounds of Air overlap Sea's 3 batches instead of following them
+    assert elapsed < 0.3
+
+
+def test_pipeline_enrich_uses_connectors_with_fallback(monkeypatch, fake_response, fake_get):
+    from etl import pipeline
+
+    def get(url, params=None, **kwargs):
+        if "open-meteo" in url and params["latitude"] < 1:
+            return fake_response({}, 404)
+        if "wttr.in" in url:
+            return fake_response({"current_condition": [
+                {"temp_C": "30", "weatherDesc": [{"value": "Sunny"}]}
+            ]})
+        if "open-meteo" in url:
+            return fake_response({"current_weather": {
+                "temperature": 4.5, "windspeed": 12.0, "weathercode": 45, "time": "2024-01-01T12:00"
+            }})
+        return fake_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(requests, "get", get)
+    records = [CountryRecord(name="Aland", lat=60.1, lon=19.9), CountryRecord(name="Null Island", lat=0, lon=0)]
+    result = pipeline.enrich_weather(CountryBatch.from_records(records))
+
+    assert result.values("temperature_c") == [4.5, 30.0]
+    assert result.values("windspeed") == [12.0, None]
+    assert result.values("timestamp") == [1704110400, None]
+
+
+def test_loader_keeps_its_own_timestamp(monkeypatch, fake_response):
+    from etl import load
+
+    monkeypatch.setattr(requests, "get", lambda url, **kw: fake_response({"current_weather": {
+        "temperature": 4.5, "weathercode": 45, "time": "2024-01-01T12:00"
+    }}))
+    records = [CountryRecord(name="Aland", lat=60.1, lon=19.9, timestamp=1000)]
+    result = load.enrich_weather(CountryBatch.from_records(records))
+
+    assert result.values("temperature_c") == [4.5]
+    assert result.values("timestamp") == [1000]
+
+
+def test_refresh_hands_connectors_multi_record_batches(tmp_path, monkeypatch, fake_response):
+    from etl import load
+
+    countries = [
+        {"name": {"common": f"Country {i:02d}"}, "region": "R", "subregion": "S", "latlng": [i, i]}
+        for i in range(30)
+    ]
+    monkeypatch.setattr(requests, "get", lambda url, **kw: fake_response(countries))
+    sizes = []
+
+    class Bulk(Connector):
+        name = "test-bulk"
+        provides = ("temperature_c",)
+        batch_size = 10
+
+        def fetch_batch(self, records):
+            sizes.append(len(records))
+            return [{"temperature_c": float(r.lat)} for r in records]
+
+    monkeypatch.setattr(connectors, "_registry", dict(connectors._registry))
+    connectors.register(Bulk)
+    monkeypatch.setattr(connectors, "WEATHER_SOURCES", ("test-bulk",))
+
+    batch, statuses = load.refresh("all", db_path=str(tmp_path / "bulk.db"))
+
+    # Checkpoint chunks of 25 and 5, each split into the connector's batches
+    assert sorted(sizes) == [5, 5, 10, 10]
+    assert statuses == ["inserted"] * 30
+    assert batch.values("temperature_c") == [float(i) for i in range(30)]
+
+
+def test_nearby_points_fetch_and_archive_the_cell_centre(monkeypatch, fake_get):
+    sent = []
+
+    def get(url, params=None, **kwargs):
+        sent.append((params["latitude"], params["longitude"]))
+        return fake_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(requests, "get", get)
+    openmeteo = connectors.get("open-meteo")
+    for points in [(60.12, 19.94), (60.18, 19.91)], [(60.18, 19.91), (60.12, 19.94)]:
+        singleflight.flights.clear()
+        for lat, lon in points:
+            assert openmeteo.current(lat, lon)["temperature"] == 4.5
+
+    assert sent == [(60.15, 19.95)] * 2
+    params = {"latitude": 60.15, "longitude": 19.95, "current_weather": True}
+    assert archive.snapshots(archive.request_key(connectors.WEATHER_API, params))
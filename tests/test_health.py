@@ -0,0 +1,61 @@
+import time
+
+import pytest
+import requests
+
+from etl.health import HealthProber
+
+
+@pytest.fixture
+def probe_get(fake_response):
+    def get(url, timeout=None, **kwargs):
+        if "restcountries" in url:
+            return fake_response({}, 200)
+        if "wttr.in" in url:
+            return fake_response({}, 429)
+        raise requests.ConnectionError("unreachable")
+    return get
+
+
+def test_prober_caches_status_and_history(tmp_path, monkeypatch, probe_get):
+    monkeypatch.setattr(requests, "get", probe_get)
+    prober = HealthProber(str(tmp_path / "missing.db"), history=3)
+    assert set(prober.targets) >= {"restcountries", "open-meteo", "wttr.in"}
+
+    pending = prober.report()
+    assert pending["API Availability"] == "PENDING"
+    assert pending["Database Size"] == "No database found"
+    assert pending["upstreams"]["open-meteo"] == {"status": "pending"}
+
+    for _ in range(4):
+        prober.probe_once()
+    report = prober.report()
+    upstreams = report["upstreams"]
+    assert report["API Availability"] == "PASS"
+    assert upstreams["restcountries"]["status"] == "up"
+    assert upstreams["wttr.in"]["status"] == "degraded" and upstreams["wttr.in"]["http_status"] == 429
+    assert upstreams["open-meteo"]["status"] == "down" and "unreachable" in upstreams["open-meteo"]["error"]
+    assert upstreams["open-meteo"]["uptime"] == 0.0
+    assert len(upstreams["restcountries"]["history"]) == 3
+
+
+def test_report_does_no_io_after_start(tmp_path, monkeypatch, fake_response):
+    calls = []
+
+    def counting_get(url, **kwargs):
+        calls.append(url)
+        return fake_response({}, 200)
+
+    monkeypatch.setattr(requests, "get", counting_get)
+    prober = HealthProber(str(tmp_path / "db"), interval=3600,
+                          targets={"restcountries": "https://restcountries.com/health"}).start()
+    try:
+        deadline = time.monotonic() + 5
+        while not calls:
+            assert time.monotonic() < deadline, "prober thread never probed"
+            time.sleep(0.01)
+        for _ in range(50):
+            prober.report()
+        assert calls == ["https://restcountries.com/health"]
+    finally:
+        prober.stop()
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from etl.journal import RunJournal, unfinished_run
+from etl.load import init_db, run_checkpointed
+from etl.records import CountryBatch
+
+NAMES = ["Aland", "Borduria", "Carpania", "Drusselstein", "Elbonia"]
+
+
+def extract():
+    return CountryBatch.from_records([
+        {"name": n, "region": "R", "subregion": "S", "fetch_method": "latest", "api_used": "mock"}
+        for n in NAMES
+    ])
+
+
+def enricher(calls, fail_on=None):
+    def enrich(batch):
+        names = batch.columns["name"]
+        calls.append(list(names))
+        if fail_on in names:
+            raise RuntimeError("container restarted")
+        batch.set_column("temperature_c", [float(len(name)) for name in names])
+        return batch
+    return enrich
+
+
+def test_interrupted_run_resumes_where_it_stopped(tmp_path):
+    db = str(tmp_path / "journal.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+
+    calls = []
+    with pytest.raises(RuntimeError):
+        run_checkpointed(conn, RunJournal.open(conn, "all"), extract,
+                         enricher(calls, fail_on="Drusselstein"), every=2)
+    # Enriched and loaded two at a time; the second batch failed as a whole
+    assert calls == [["Aland", "Borduria"], ["Carpania", "Drusselstein"]]
+    assert conn.execute("SELECT COUNT(*) FROM country").fetchone()[0] == 2
+    run_id = unfinished_run(conn, "all")
+    stages = [r[0] for r in conn.execute(
+        "SELECT stage FROM run_progress WHERE run_id = ? ORDER BY seq", (run_id,))]
+    assert stages == ["loaded", "loaded", "extracted", "extracted", "extracted"]
+
+    def no_extract():
+        raise AssertionError("resume must reuse the journaled country list")
+
+    calls = []
+    journal = RunJournal.open(conn, "all", resume=True)
+    assert journal.resumed and journal.run_id == run_id
+    batch, statuses = run_checkpointed(conn, journal, no_extract, enricher(calls), every=2)
+
+    assert calls == [["Carpania", "Drusselstein"], ["Elbonia"]]
+    assert statuses == ["skipped", "skipped", "inserted", "inserted", "inserted"]
+    assert batch.values("temperature_c") == [5.0, 8.0, 8.0, 12.0, 7.0]
+    rows = conn.execute("SELECT name, temperature_c FROM country ORDER BY name").fetchall()
+    assert rows == list(zip(NAMES, [5.0, 8.0, 8.0, 12.0, 7.0]))
+
+    assert unfinished_run(conn, "all") is None
+    assert conn.execute("SELECT COUNT(*) FROM run_progress").fetchone()[0] == 0
+    conn.close()
+
+
+def test_fresh_run_abandons_unfinished_one(tmp_path):
+    db = str(tmp_path / "journal.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    with pytest.raises(RuntimeError):
+        run_checkpointed(conn, RunJournal.open(conn, "all"), extract,
+                         enricher([], fail_on="Aland"))
+
+    journal = RunJournal.open(conn, "all")
+    assert not journal.resumed
+    statuses = [r[0] for r in conn.execute("SELECT status FROM run_journal ORDER BY id")]
+    assert statuses == ["abandoned", "running"]
+    assert conn.execute("SELECT COUNT(*) FROM run_progress").fetchone()[0] == 0
+
+    # Nothing to resume falls back to a normal run
+    _, statuses = run_checkpointed(conn, RunJournal.open(conn, "gb", resume=True), extract, enricher([]))
+    assert statuses == ["inserted"] * 5
+    conn.close()
+
+
+def test_resumed_run_keeps_its_log_run_id(tmp_path, monkeypatch):
+    from etl import logger_config
+
+    db = str(tmp_path / "journal.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    monkeypatch.setattr(logger_config, "RUN_ID", "first-run")
+    with pytest.raises(RuntimeError):
+        run_checkpointed(conn, RunJournal.open(conn, "all"), extract, enricher([], fail_on="Aland"))
+
+    monkeypatch.setattr(logger_config, "RUN_ID", "second-run")
+    RunJournal.open(conn, "all", resume=True)
+    assert logger_config.RUN_ID == "first-run"
+    conn.close()
+
+
+def test_old_journal_gains_the_log_run_id_column(tmp_path):
+    db = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE run_journal (id INTEGER PRIMARY KEY, query TEXT NOT NULL, "
+                 "started_at INTEGER NOT NULL, finished_at INTEGER, status TEXT NOT NULL)")
+    conn.execute("INSERT INTO run_journal (query, started_at, status) VALUES ('all', 0, 'running')")
+    conn.commit()
+    conn.close()
+
+    init_db(db)
+    conn = sqlite3.connect(db)
+    journal = RunJournal.open(conn, "all", resume=True)
+    assert journal.resumed
+    conn.close()
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+import requests
+
+from etl import archive, limiter
+from etl.limiter import AdaptiveLimiter
+
+
+class Response:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(payload or {}).encode("utf-8")
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+
+def test_additive_increase_multiplicative_decrease():
+    host = AdaptiveLimiter("api.example", initial=2, maximum=8, target_latency=1.0)
+    for _ in range(40):
+        host.release(host.acquire(), "ok")
+    assert host.snapshot()["limit"] == 8
+
+    # A burst of failures from one window halves the limit once
+    started = [host.acquire() for _ in range(4)]
+    for s in started:
+        host.release(s, "throttled")
+    assert host.snapshot()["limit"] == 4
+    assert host.snapshot()["throttled"] == 4
+
+    host.release(host.acquire(), "timeout")
+    assert host.snapshot()["limit"] == 2
+
+
+def test_retry_after_pauses_host():
+    host = AdaptiveLimiter("api.example")
+    host.release(host.acquire(), "throttled", retry_after=0.2)
+    start = time.monotonic()
+    host.release(host.acquire(), "ok")
+    assert time.monotonic() - start >= 0.19
+
+
+def test_in_flight_never_exceeds_limit():
+    host = AdaptiveLimiter("api.example", initial=3, maximum=3)
+    lock = threading.Lock()
+    current, peak = [0], [0]
+
+    def worker():
+        started = host.acquire()
+        with lock:
+            current[0] += 1
+            peak[0] = max(peak[0], current[0])
+        time.sleep(0.02)
+        with lock:
+            current[0] -= 1
+        host.release(started, "ok")
+
+    threads = [threading.Thread(target=worker) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 3
+
+
+def test_archive_get_retries_throttling_and_timeouts(monkeypatch):
+    monkeypatch.setattr(archive, "TIMEOUT_BACKOFF", 0.01)
+    replies = [
+        Response(429, headers={"Retry-After": "0.05"}),
+        requests.Timeout("read timed out"),
+        Response(200, {"current_weather": {"temperature": 3.0}}),
+    ]
+
+    def fake_get(url, **kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    url = "https://api.open-meteo.com/v1/forecast"
+    response = archive.get(url, "open-meteo", params={"latitude": 1, "longitude": 2})
+
+    assert response.json() == {"current_weather": {"temperature": 3.0}}
+    stats = limiter.snapshot()["api.open-meteo.com"]
+    assert (stats["requests"], stats["throttled"], stats["timeouts"]) == (3, 1, 1)
+    # Only the successful body is archived
+    key = archive.request_key(url, {"latitude": 1, "longitude": 2})
+    assert len(archive.snapshots(key)) == 1
+
+
+def test_persistent_throttling_is_returned_not_archived(monkeypatch):
+    monkeypatch.setattr(archive, "MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(requests, "get", lambda url, **kw: Response(429, headers={"Retry-After": "0"}))
+
+    response = archive.get("https://wttr.in/Paris?format=j1", "wttr.in")
+    assert response.status_code == 429
+    assert archive.snapshots("https://wttr.in/Paris?format=j1") == []
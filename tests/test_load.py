@@ -1,23 +1,14 @@
 import sqlite3
 import os
-from etl.load import fetch_country_data, insert_country
+import requests
+from etl.load import init_db, fetch_country_data, insert_country
 from datetime import datetime
 
 DB_PATH = "test_global_data.db"
 
 def setup_module(module):
-    # Create test database
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS countries (
-            name TEXT, region TEXT, state_province TEXT,
-            temperature REAL, windspeed REAL, timestamp TEXT,
-            fetch_method TEXT, api_used TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    # Create test database with the shared schema
+    init_db(DB_PATH)
 
 def teardown_module(module):
     # Clean up test database
@@ -27,7 +18,21 @@ def teardown_module(module):
 def test_fetch_country_data():
     result = fetch_country_data("gb")
     assert len(result) > 0
-    assert result[0]["name"].lower() in ["united kingdom", "gb"]
+    assert result[0].name.lower() in ["united kingdom", "gb"]
+
+def test_fetch_country_data_resolves_codes_offline(fake_api):
+    for query in ("ax", "ALA", "aland", "lan", "all"):
+        assert fetch_country_data(query).columns["name"] == ["Aland"]
+    assert len(fetch_country_data("gb")) == 0
+    assert len(fetch_country_data("atlantis")) == 0
+
+def test_exact_code_wins_over_name_substring(monkeypatch, fake_response):
+    countries = [{"name": {"common": "Argentina"}, "cca2": "AR", "cca3": "ARG"},
+                 {"name": {"common": "India"}, "cca2": "IN", "cca3": "IND"}]
+    monkeypatch.setattr(requests, "get", lambda url, **kw: fake_response(countries))
+
+    assert fetch_country_data("in").columns["name"] == ["India"]
+    assert fetch_country_data("ntin").columns["name"] == ["Argentina"]
 
 def test_insert_country():
     conn = sqlite3.connect(DB_PATH)
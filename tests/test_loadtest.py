@@ -0,0 +1,28 @@
+import sqlite3
+
+from run_loadtest import percentile, seed_database, summarize
+
+
+def test_seed_database_builds_indexed_synthetic_rows(tmp_path):
+    db = str(tmp_path / "load.db")
+    names = seed_database(db, 50, seed=1)
+
+    assert len(names) == len(set(names)) == 50
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM countries").fetchone()[0] == 50
+        assert conn.execute("SELECT SUM(country_count) FROM region_summary").fetchone()[0] == 50
+        assert conn.execute("SELECT COUNT(*) FROM quarantine").fetchone()[0] == 0
+    # Same seed, same data
+    assert seed_database(db, 50, seed=1) == names
+
+
+def test_percentiles_and_summary():
+    values = list(range(1, 101))
+    assert [percentile(values, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([], 50) is None
+
+    results = [("/", i / 1000, True) for i in range(1, 101)] + [("/health", 0.5, False)]
+    summary = summarize(results, elapsed=2.0)
+    assert summary["/"] == {"requests": 100, "errors": 0, "rps": 50.0, "p50_ms": 50.0,
+                            "p95_ms": 95.0, "p99_ms": 99.0, "max_ms": 100.0}
+    assert summary["/health"]["errors"] == 1
@@ -0,0 +1,28 @@
+import json
+import logging
+from logging.handlers import QueueHandler
+
+from etl.logger_config import get_logger, setup_logger, shutdown_logger, timed, RUN_ID
+
+
+def test_structured_queue_logging(tmp_path):
+    shutdown_logger()
+    log_file = tmp_path / "pipeline.log"
+    logger = setup_logger(str(log_file), level="DEBUG", sample_rate=0)
+
+    with timed("load", countries=3):
+        pass
+    logger.warning("Main API failed", extra={"stage": "extract", "country": "gb"})
+    logger.debug("sampled out", extra={"stage": "enrich"})
+    shutdown_logger()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [e["message"] for e in entries] == ["load finished", "Main API failed"]
+    assert entries[0]["stage"] == "load"
+    assert entries[0]["countries"] == 3
+    assert entries[0]["duration_ms"] >= 0
+    assert entries[1]["country"] == "gb"
+    assert {e["run_id"] for e in entries} == {RUN_ID}
+    assert not any(isinstance(h, QueueHandler) for h in get_logger().handlers)
+    get_logger().propagate = True
+    get_logger().setLevel(logging.NOTSET)
@@ -0,0 +1,87 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from etl import load, profiling
+from etl.cli import main
+from etl.journal import RunJournal
+from etl.records import CountryBatch
+
+
+def test_profile_run_writes_stage_reports(tmp_path, capsys, fake_api):
+    out_dir = tmp_path / "profiles"
+
+    argv = ["--db", str(tmp_path / "p.db"), "--log-file", str(tmp_path / "etl.log"),
+            "--profile", "--profile-dir", str(out_dir), "run", "-q"]
+    assert main(argv) == 0
+    assert profiling._active is None
+
+    for stage in ("extract", "enrich", "load"):
+        for suffix in (".prof", ".collapsed", ".alloc.txt"):
+            assert (out_dir / f"{stage}{suffix}").exists()
+
+    stacks = (out_dir / "all.collapsed").read_text().splitlines()
+    assert stacks and all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert {line.split(";", 1)[0] for line in stacks} <= {"extract", "enrich", "load"}
+    assert "hottest functions" in capsys.readouterr().out
+
+
+def test_stage_is_noop_when_disabled():
+    with profiling.stage("extract"):
+        pass
+    assert profiling._active is None
+
+
+def test_enrich_stage_excludes_load(tmp_path, monkeypatch):
+    def extract():
+        return CountryBatch.from_records([{"name": f"Country {i}", "region": "R", "subregion": "S"} for i in range(5)])
+
+    def enrich(batch):
+        batch.set_column("temperature_c", [20.0] * len(batch))
+        return batch
+
+    kept = []
+    load_batch = load.load_batch
+
+    def heavy_load(conn, batch):
+        kept.append(bytearray(4 * 2**20))
+        time.sleep(0.1)
+        return load_batch(conn, batch)
+
+    durations = {}
+    timed = load.timed
+
+    @contextmanager
+    def recording_timed(stage, **fields):
+        with timed(stage, **fields) as values:
+            yield values
+        durations.setdefault(stage, []).append(values["duration_ms"])
+
+    monkeypatch.setattr(load, "load_batch", heavy_load)
+    monkeypatch.setattr(load, "timed", recording_timed)
+
+    def run(name, every):
+        db = str(tmp_path / f"{name}.db")
+        load.init_db(db)
+        conn = sqlite3.connect(db)
+        try:
+            load.run_checkpointed(conn, RunJournal.open(conn, "all"), extract, enrich, every=every)
+        finally:
+            conn.close()
+
+    run("timed", every=2)
+    assert len(durations["load"]) == 3 and min(durations["load"]) >= 100
+    assert max(durations["enrich"]) < 50
+
+    profiler = profiling.enable(str(tmp_path / "profiles"))
+    try:
+        run("profiled", every=5)
+    finally:
+        profiling._active = None
+        profiling.tracemalloc.stop()
+
+    def allocated(stage):
+        return sum(size for (name, _, _), (size, _) in profiler.allocations.items() if name == stage)
+
+    assert allocated("load") >= 4 * 2**20
+    assert allocated("enrich") < 2**20
@@ -0,0 +1,48 @@
+import sqlite3
+
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch, CountryRecord
+from etl.report import save_summary_csv
+
+
+def test_batch_round_trip():
+    batch = CountryBatch.from_records([
+        CountryRecord(name="Aland", region="Europe", population=30000, temperature_c=10.0),
+        {"name": "Borduria", "state_province": "East", "temperature": None},
+    ])
+
+    assert len(batch) == 2
+    assert batch[0].temperature_f == 50.0
+    assert batch[1].subregion == "East"
+    assert batch[1].temperature_c is None
+    assert batch.values("population") == [30000, None]
+    assert [r.name for r in batch.filter([False, True])] == ["Borduria"]
+
+
+def test_load_batch_binds_columns(tmp_path):
+    db = str(tmp_path / "batch.db")
+    init_db(db)
+    batch = CountryBatch.from_records([
+        CountryRecord(name="Aland", region="Europe", subregion="North", temperature_c=10.0),
+        CountryRecord(name="Borduria", region="Europe", subregion="East"),
+        CountryRecord(name="Aland", region="Europe", subregion="North", temperature_c=12.0),
+    ])
+
+    conn = sqlite3.connect(db)
+    assert load_batch(conn, batch) == ["inserted", "inserted", "updated"]
+    rows = conn.execute("SELECT name, temperature_c FROM countries ORDER BY name").fetchall()
+    summary = conn.execute("SELECT country_count, temp_count, temp_sum FROM region_summary").fetchone()
+    conn.close()
+
+    assert rows == [("Aland", 12.0), ("Borduria", None)]
+    assert summary == (2, 1, 12.0)
+
+
+def test_save_summary_csv_does_not_mutate(tmp_path):
+    record = CountryRecord(name="Aland", temperature_c=100.0)
+    path = save_summary_csv([record], str(tmp_path / "summary.csv"))
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[1].split(",")[7:9] == ["100.0", "212.0"]
+    assert not hasattr(record, "temperature_F")
@@ -0,0 +1,168 @@
+import sqlite3
+
+import pytest
+
+from etl.schema import is_legacy, migrate
+from etl.aggregates import region_summary
+
+
+def test_migrate_legacy_load_schema(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE countries (
+            name TEXT PRIMARY KEY, region TEXT, state_province TEXT,
+            temperature_c REAL, temperature_f REAL, conditions TEXT,
+            timestamp TEXT, last_updated TEXT, fetch_method TEXT, api_used TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO countries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        ("Aland", "Europe", "North", 10.0, 50.0, "Fog",
+         "2024-01-01T00:00:00", "2024-01-02T00:00:00", "latest", "restcountries.com v3.1"),
+        ("Borduria", "Europe", "East", None, None, None,
+         "2024-01-01T00:00:00", "2024-01-01T00:00:00", "latest", "restcountries.com v3.1"),
+    ])
+    conn.commit()
+    conn.close()
+
+    rows, _, _ = migrate(path)
+    assert rows == 2
+
+    conn = sqlite3.connect(path)
+    row = conn.execute("""
+        SELECT region, state_province, temperature_f, conditions, timestamp, last_updated
+        FROM countries WHERE name = 'Aland'
+    """).fetchone()
+    assert row == ("Europe", "North", 50.0, "Fog", "2024-01-01T00:00:00", "2024-01-02T00:00:00")
+    assert conn.execute("SELECT COUNT(*) FROM dim_region").fetchone()[0] == 1
+    assert region_summary(conn)[0]["countries"] == 2
+    conn.close()
+
+
+def test_migrate_collapses_run_menu_duplicates(tmp_path):
+    path = str(tmp_path / "menu.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE countries (
+            name TEXT, region TEXT, state_province TEXT,
+            temperature REAL, windspeed REAL, timestamp TEXT,
+            fetch_method TEXT, api_used TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO countries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+        ("Aland", "Europe", "North", 1.0, 3.0, "2024-01-01T00:00:00", "single", "restcountries.com v3.1"),
+        ("Aland", "Europe", "North", 2.0, 4.0, "2024-02-01T00:00:00", "single", "restcountries.com v3.1"),
+        ("", "", "", None, None, "2024-02-01T00:00:00", "single", "restcountries.com v3.1"),
+    ])
+    conn.commit()
+    conn.close()
+
+    rows, _, _ = migrate(path)
+    assert rows == 1
+
+    conn = sqlite3.connect(path)
+    assert conn.execute(
+        "SELECT temperature_c, windspeed, timestamp FROM countries"
+    ).fetchall() == [(2.0, 4.0, "2024-01-01T00:00:00")]
+    conn.close()
+
+
+def legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE countries (name TEXT PRIMARY KEY, region TEXT, state_province TEXT, "
+                 "temperature_c REAL, timestamp TEXT, last_updated TEXT)")
+    conn.executemany("INSERT INTO countries VALUES (?, ?, ?, ?, ?, ?)", [
+        ("Aland", "Europe", "North", 10.0, "2024-01-01T00:00:00", "2024-01-02T00:00:00"),
+        ("Borduria", "Europe", "East", 5.0, "2024-01-01T00:00:00", "2024-01-01T00:00:00"),
+    ])
+    conn.commit()
+    return conn
+
+
+def test_interrupted_migration_leaves_the_legacy_table(tmp_path, monkeypatch):
+    from etl import schema
+
+    conn = legacy_db(str(tmp_path / "crash.db"))
+    calls = []
+
+    def failing_dim_id(cursor, table, name):
+        calls.append(name)
+        if len(calls) > 3:
+            raise RuntimeError("killed mid-copy")
+        return dim_id(cursor, table, name)
+
+    dim_id = schema.dim_id
+    monkeypatch.setattr(schema, "dim_id", failing_dim_id)
+    with pytest.raises(RuntimeError):
+        schema.migrate_legacy(conn)
+    monkeypatch.undo()
+
+    assert schema.is_legacy(conn.cursor())
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+    assert "countries_legacy" not in names and "country" not in names
+    assert schema.migrate_legacy(conn) == 2
+    conn.close()
+
+
+def test_leftover_legacy_table_is_migrated(tmp_path):
+    from etl.load import init_db
+    from etl.search import search
+
+    path = str(tmp_path / "leftover.db")
+    conn = legacy_db(path)
+    # What a crash after the rename left behind before the migration was atomic
+    conn.execute("ALTER TABLE countries RENAME TO countries_legacy")
+    conn.commit()
+    conn.close()
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT name FROM countries ORDER BY name").fetchall() == [("Aland",), ("Borduria",)]
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'countries_legacy'").fetchone()[0] == 0
+    assert [r["name"] for r in search(conn, "Bor")] == ["Borduria"]
+    conn.close()
+
+
+def test_init_db_on_a_current_database_does_not_write(tmp_path):
+    from etl.load import init_db
+
+    path = str(tmp_path / "busy.db")
+    init_db(path)
+    writer = sqlite3.connect(path)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        init_db(path)
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_ensure_db_initializes_once(tmp_path, monkeypatch):
+    from etl import load
+
+    calls = []
+    monkeypatch.setattr(load, "_initialized", set())
+    monkeypatch.setattr(load, "init_db", calls.append)
+    path = str(tmp_path / "once.db")
+    for _ in range(3):
+        load.ensure_db(path)
+    assert calls == [str(tmp_path / "once.db")]
+
+
+def test_unreadable_legacy_timestamp_does_not_block_migration(tmp_path):
+    from etl.load import init_db
+
+    path = str(tmp_path / "bad.db")
+    conn = legacy_db(path)
+    conn.execute("INSERT INTO countries VALUES ('Carpania', 'Asia', 'West', 20.0, 'yesterday', 'soon')")
+    conn.commit()
+    conn.close()
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT name, timestamp FROM countries ORDER BY name").fetchall()
+    assert [r[0] for r in rows] == ["Aland", "Borduria", "Carpania"]
+    assert rows[0][1] == "2024-01-01T00:00:00"
+    assert rows[2][1] is not None
+    assert not is_legacy(conn.cursor())
+    conn.close()
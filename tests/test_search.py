@@ -0,0 +1,56 @@
+import sqlite3
+
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch
+from etl.search import search, match_expression
+
+
+def country(name, official, capital, region, subregion):
+    return {"name": name, "official_name": official, "capital": capital,
+            "region": region, "subregion": subregion,
+            "fetch_method": "latest", "api_used": "mock"}
+
+
+def test_search_prefix_ranking_and_reindex(tmp_path):
+    db = str(tmp_path / "search.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load_batch(conn, CountryBatch.from_records([
+        country("France", "French Republic", "Paris", "Europe", "Western Europe"),
+        country("French Guiana", "Guiana", "Cayenne", "Americas", "South America"),
+        country("Saint Martin", "Saint Martin", "Marigot", "Americas", "Caribbean"),
+        country("Côte d'Ivoire", "Republic of Côte d'Ivoire", "Yamoussoukro", "Africa", "Western Africa"),
+    ]))
+
+    assert [r["name"] for r in search(conn, "fr")] == ["France", "French Guiana"]
+    assert [r["name"] for r in search(conn, "par")] == ["France"]
+    assert [r["name"] for r in search(conn, "cote")] == ["Côte d'Ivoire"]
+    assert [r["name"] for r in search(conn, "western fr")] == ["France"]
+    assert search(conn, "  ") == []
+
+    # Upserts re-index: the old capital no longer matches
+    load_batch(conn, CountryBatch.from_records([
+        country("France", "French Republic", "Lyon", "Europe", "Western Europe"),
+    ]))
+    assert search(conn, "paris") == []
+    assert search(conn, "lyon")[0]["capital"] == "Lyon"
+    assert conn.execute("SELECT COUNT(*) FROM country_fts").fetchone()[0] == 4
+    conn.close()
+
+
+def test_init_db_backfills_index(tmp_path):
+    db = str(tmp_path / "backfill.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load_batch(conn, CountryBatch.from_records([country("Aland", None, None, "Europe", "North")]))
+    conn.execute("DELETE FROM country_fts")
+    conn.commit()
+
+    init_db(db)
+    assert [r["name"] for r in search(conn, "al")] == ["Aland"]
+    conn.close()
+
+
+def test_match_expression_quotes_words():
+    assert match_expression('st. "martin') == '"st"* "martin"*'
+    assert match_expression("") is None
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import requests
+
+from etl import load
+from etl.singleflight import SingleFlight, cell_centre, grid_cell
+
+
+def run_concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(ttl=60)
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"temperature": 12.0}
+
+    run_concurrently(8, lambda: results.append(flight.do("gb", slow)))
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+
+    # Served from the TTL cache afterwards
+    assert flight.do("gb", slow) is results[0]
+    assert len(calls) == 1
+
+
+def test_errors_reach_waiters_but_are_not_cached():
+    flight = SingleFlight(ttl=60)
+    calls, errors = [], []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise requests.Timeout("upstream timeout")
+
+    def call():
+        try:
+            flight.do("fr", failing)
+        except requests.Timeout as e:
+            errors.append(e)
+
+    run_concurrently(4, call)
+    assert len(calls) == 1 and len(errors) == 4
+    assert flight.do("fr", lambda: "ok") == "ok"
+
+
+def test_zero_ttl_and_grid_cells():
+    flight = SingleFlight(ttl=0)
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+
+    assert grid_cell(48.8566, 2.3522) == grid_cell(48.81, 2.39) == (48.8, 2.3)
+    assert grid_cell(-0.05, -0.05) == (-0.1, -0.1)
+    assert cell_centre((48.8, 2.3)) == (48.85, 2.35)
+    assert cell_centre((-0.1, -0.1)) == (-0.05, -0.05)
+
+
+def test_fetch_weather_coalesces_by_name_and_cell(monkeypatch, fake_get):
+    urls = []
+
+    def counting_get(url, **kwargs):
+        urls.append(url)
+        return fake_get(url, **kwargs)
+
+    monkeypatch.setattr(requests, "get", counting_get)
+    results = []
+    run_concurrently(5, lambda: results.append(load.fetch_weather("Aland")))
+    # "Mariehamn" geocodes into the same grid cell: only its geocoding is new
+    results.append(load.fetch_weather("Mariehamn"))
+
+    assert all(r == {"temperature_c": 4.5, "temperature_f": 40.1, "conditions": "Fog"} for r in results)
+    assert sum("geocoding" in u for u in urls) == 2
+    assert sum("forecast" in u for u in urls) == 1
@@ -0,0 +1,58 @@
+import random
+import sqlite3
+
+from etl.load import init_db, load_batch
+from etl.records import CountryBatch
+from etl.spatial import within_bbox, nearest, haversine_km
+
+PLACES = {
+    "France": (46.0, 2.0),
+    "Spain": (40.0, -4.0),
+    "Iceland": (65.0, -18.0),
+    "Fiji": (-18.0, 178.0),
+    "Samoa": (-13.6, -172.3),
+    "Chile": (-30.0, -71.0),
+    "Nowhere": (None, None),
+}
+
+
+def seed(db, places):
+    init_db(db)
+    conn = sqlite3.connect(db)
+    load_batch(conn, CountryBatch.from_records([
+        {"name": name, "region": "R", "subregion": "S", "lat": lat, "lon": lon,
+         "fetch_method": "latest", "api_used": "mock"}
+        for name, (lat, lon) in places.items()
+    ]))
+    return conn
+
+
+def test_bbox_and_antimeridian(tmp_path):
+    conn = seed(str(tmp_path / "geo.db"), PLACES)
+    assert [r["name"] for r in within_bbox(conn, 35, -10, 60, 30)] == ["France", "Spain"]
+    assert [r["name"] for r in within_bbox(conn, -25, 170, -10, -170)] == ["Fiji", "Samoa"]
+    assert within_bbox(conn, 0, 0, 1, 1) == []
+    assert [r["name"] for r in within_bbox(conn, -90, -180, 90, 180, limit=2)] == ["Chile", "Fiji"]
+
+    # Moving a country moves it in the index
+    load_batch(conn, CountryBatch.from_records([
+        {"name": "Spain", "region": "R", "subregion": "S", "lat": 0.5, "lon": 0.5,
+         "fetch_method": "latest", "api_used": "mock"}
+    ]))
+    assert [r["name"] for r in within_bbox(conn, 0, 0, 1, 1)] == ["Spain"]
+    conn.close()
+
+
+def test_nearest_matches_brute_force(tmp_path):
+    rnd = random.Random(7)
+    places = {f"P{i}": (rnd.uniform(-89, 89), rnd.uniform(-180, 180)) for i in range(300)}
+    conn = seed(str(tmp_path / "knn.db"), places)
+
+    for lat, lon in [(48.85, 2.35), (-89.5, 10.0), (0.0, 179.9), (10.0, -60.0)]:
+        expected = sorted(places, key=lambda n: haversine_km(lat, lon, *places[n]))[:5]
+        result = nearest(conn, lat, lon, k=5)
+        assert [r["name"] for r in result] == expected
+        assert result == sorted(result, key=lambda r: r["distance_km"])
+
+    assert len(nearest(conn, 0, 0, k=500)) == 300
+    conn.close()
@@ -2,4 +2,38 @@ def test_sample_transform():
     data = {"value": 10}
     # Example: multiply value by 2
     transformed = {"value": data["value"] * 2}
-    assert transformed["value"] == 20
\ No newline at end of file
+    assert transformed["value"] == 20
+
+def make_raw(n):
+    return [{
+        "name": {"common": f"Country {i}", "official": f"Republic of {i}"},
+        "region": "Europe" if i % 2 else "Asia",
+        "subregion": None,
+        "capital": [f"City {i}"] if i % 3 else [],
+        "latlng": [float(i % 90), float(i % 180)] if i % 5 else [],
+        "population": 1000 * i if i % 7 else None,
+        "area": 10.0 * (i % 4),
+    } for i in range(n)]
+
+
+def test_transform_batch_matches_per_record():
+    from etl.transform import transform_batch, transform_country_data
+    raw = make_raw(50)
+    batch = transform_batch(raw, fetch_method="all")
+    expected = [transform_country_data(c) for c in raw]
+    for record in expected:
+        record.fetch_method = "all"
+    assert list(batch) == expected
+
+
+def test_transform_batch_derived_columns():
+    from etl.transform import transform_batch
+    batch = transform_batch(make_raw(50000))
+    assert len(batch) == 50000
+
+    density = batch.values("density")
+    assert density[1] == 100.0        # 1000 people / 10 km²
+    assert density[4] is None         # zero area
+    assert density[7] is None         # unknown population
+    batch.set_column("temperature_c", [-40.0] * len(batch))
+    assert set(batch.values("temperature_f")) == {-40.0}
@@ -0,0 +1,72 @@
+import math
+import sqlite3
+
+from etl.journal import RunJournal
+from etl.load import init_db, load_batch, run_checkpointed
+from etl.records import CountryBatch
+from etl.validate import check
+
+
+def country(name, **fields):
+    return {"name": name, "region": "R", "subregion": "S", "fetch_method": "latest",
+            "api_used": "mock", **fields}
+
+
+def test_check_flags_every_broken_rule():
+    batch = CountryBatch.from_records([
+        country("Aland", lat=60.1, lon=19.9, temperature_c=4.5),
+        country("", population=-5),
+        country("Borduria", lat=91.0, area=math.inf),
+        country("Aland"),
+        country(None, temperature_c=80.0),
+    ])
+    batch.set_column("capital", [None, None, None, 7, None])
+
+    reasons = check(batch, unique=True)
+    assert reasons[0] == []
+    assert reasons[1] == ["name is required", "population out of range 0.."]
+    assert reasons[2] == ["area out of range 0..", "lat out of range -90..90"]
+    assert reasons[3] == ["capital must be text", "duplicate name"]
+    assert reasons[4] == ["name is required", "temperature_c out of range -90..60"]
+    # Duplicates are only a rule for extracted lists; the loader upserts them
+    assert check(batch)[3] == ["capital must be text"]
+
+
+def test_rejects_are_quarantined_and_the_rest_load(tmp_path):
+    db = str(tmp_path / "validate.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+
+    statuses = load_batch(conn, CountryBatch.from_records([
+        country("Aland", temperature_c=4.5),
+        country("   "),
+        country("Borduria", windspeed=900.0),
+    ]))
+    assert statuses == ["inserted", "quarantined", "quarantined"]
+    assert conn.execute("SELECT name FROM countries").fetchall() == [("Aland",)]
+    assert conn.execute("SELECT stage, name, reasons FROM quarantine ORDER BY id").fetchall() == [
+        ("load", "   ", "name is required"),
+        ("load", "Borduria", "windspeed out of range 0..500"),
+    ]
+    conn.close()
+
+
+def test_extract_rejects_never_reach_enrichment(tmp_path):
+    db = str(tmp_path / "extract.db")
+    init_db(db)
+    conn = sqlite3.connect(db)
+    enriched = []
+
+    def extract():
+        return CountryBatch.from_records([country("Aland"), country(""), country("Aland")])
+
+    def enrich(batch):
+        enriched.extend(batch.columns["name"])
+        return batch
+
+    batch, statuses = run_checkpointed(conn, RunJournal.open(conn, "all"), extract, enrich)
+    assert enriched == ["Aland"] and statuses == ["inserted"]
+    assert [r[0] for r in conn.execute("SELECT reasons FROM quarantine WHERE stage = 'extract'")] == [
+        "name is required", "duplicate name"
+    ]
+    conn.close()
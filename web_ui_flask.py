@@ -1,9 +1,14 @@
 import sqlite3
 import threading
 import webbrowser
-from flask import Flask, render_template, request, jsonify
-from etl.load import init_db, fetch_country_data, insert_country, DB_PATH
-import pandas as pd
+from flask import Flask, Response, render_template, request, jsonify
+from etl import analytics, api
+from etl.load import ensure_db, fetch_country_data, enrich_weather, load_batch, DB_PATH
+from etl.aggregates import region_summary, subregion_summary, conditions_summary
+from etl.health import report as health_report
+from etl.logger_config import setup_logger
+from etl.search import search as search_countries
+from etl.spatial import within_bbox, nearest
 import socket
 
 
@@ -25,11 +30,8 @@ def find_free_port():
 # Load database into DataFrame
 # ---------------------------------------------------
 def load_db():
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM countries", conn)
-    conn.close()
-    return df
+    ensure_db()
+    return analytics.export_frame(DB_PATH)
 
 
 # ---------------------------------------------------
@@ -37,8 +39,10 @@ def load_db():
 # ---------------------------------------------------
 @app.route("/")
 def home():
-    df = load_db()
-    count = len(df)
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    count = conn.execute("SELECT COALESCE(SUM(country_count), 0) FROM region_summary").fetchone()[0]
+    conn.close()
     return render_template("home.html", count=count)
 
 
@@ -54,13 +58,13 @@ def etl():
         query = request.form.get("country", "").strip()
 
         if query:
-            init_db()
+            ensure_db()
             conn = sqlite3.connect(DB_PATH)
-            countries = fetch_country_data(query)
+            countries = enrich_weather(fetch_country_data(query))
+            statuses = load_batch(conn, countries)
 
-            for country in countries:
-                status = insert_country(conn, country)
-                results.append({"name": country["name"], "status": status})
+            for name, status in zip(countries.columns["name"], statuses):
+                results.append({"name": name, "status": status})
 
             conn.close()
             message = f"Processed {len(results)} countries."
@@ -79,6 +83,128 @@ def database():
     return render_template("database.html", rows=rows, headers=headers)
 
 
+# ---------------------------------------------------
+# SUMMARY (served from the aggregate tables)
+# ---------------------------------------------------
+@app.route("/summary")
+def summary():
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    regions = region_summary(conn)
+    subregions = subregion_summary(conn)
+    conditions = conditions_summary(conn)
+    conn.close()
+    return render_template(
+        "summary.html",
+        regions=regions,
+        subregions=subregions,
+        conditions=conditions
+    )
+
+
+@app.route("/summary-data")
+def summary_data():
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    data = {
+        "regions": region_summary(conn),
+        "subregions": subregion_summary(conn, request.args.get("region")),
+        "conditions": conditions_summary(conn)
+    }
+    conn.close()
+    return jsonify(data)
+
+
+@app.route("/analytics/regions")
+def analytics_regions():
+    """Region rollup computed by the analytics backend (DuckDB when installed)."""
+    ensure_db()
+    df = analytics.region_rollup(DB_PATH)
+    return Response(df.to_json(orient="records"), mimetype="application/json")
+
+
+@app.route("/analytics/temperatures")
+def analytics_temperatures():
+    """/analytics/temperatures?bucket=5: countries per temperature band."""
+    bucket = request.args.get("bucket", 5, type=float)
+    if not 0 < bucket <= 100:
+        return jsonify({"error": "bucket must be between 0 and 100"}), 400
+    ensure_db()
+    df = analytics.temperature_histogram(DB_PATH, bucket)
+    return Response(df.to_json(orient="records"), mimetype="application/json")
+
+
+# ---------------------------------------------------
+# SEARCH / AUTOCOMPLETE (local FTS index, no remote fetch)
+# ---------------------------------------------------
+@app.route("/search")
+def search():
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    results = search_countries(conn, request.args.get("q", ""), limit)
+    conn.close()
+    return jsonify(results)
+
+
+# ---------------------------------------------------
+# JSON API
+# ---------------------------------------------------
+@app.route("/api/countries")
+def api_countries():
+    """
+    /api/countries?fields=name,region&region=Europe&updated_since=2024-01-01
+                  &min_temp=0&max_temp=30&limit=100&cursor=<next_cursor>
+    Add format=ndjson (or Accept: application/x-ndjson) to stream every
+    match as newline-delimited JSON instead of one page.
+    """
+    try:
+        params = api.parse_params(request.args)
+    except api.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ensure_db()
+    ndjson = request.args.get("format") == "ndjson" or \
+        request.accept_mimetypes.best == "application/x-ndjson"
+    if ndjson:
+        return Response(api.stream_ndjson(DB_PATH, params), mimetype="application/x-ndjson")
+
+    conn = sqlite3.connect(DB_PATH)
+    page = api.fetch_page(conn, params)
+    conn.close()
+    return Response(api.dumps(page), mimetype="application/json")
+
+
+@app.route("/api/countries/bbox")
+def api_countries_bbox():
+    """/api/countries/bbox?south=35&west=-10&north=60&east=30 (map viewport)"""
+    try:
+        south, west, north, east, limit = api.parse_bbox(request.args)
+    except api.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    results = within_bbox(conn, south, west, north, east, limit)
+    conn.close()
+    return Response(api.dumps(results), mimetype="application/json")
+
+
+@app.route("/api/countries/nearest")
+def api_countries_nearest():
+    """/api/countries/nearest?lat=48.85&lon=2.35&k=5"""
+    try:
+        lat, lon, k = api.parse_point(request.args)
+    except api.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    results = nearest(conn, lat, lon, k)
+    conn.close()
+    return Response(api.dumps(results), mimetype="application/json")
+
+
 # ---------------------------------------------------
 # CHARTS (Temperature Trends)
 # ---------------------------------------------------
@@ -124,36 +250,17 @@ def chart_data():
 # ---------------------------------------------------
 @app.route("/health")
 def health():
-    import os
-    import shutil
-    import requests
-
-    results = {}
-
-    try:
-        r = requests.get("https://restcountries.com/v3.1/all", timeout=5)
-        results["API Availability"] = "PASS" if r.status_code == 200 else "FAIL"
-    except Exception:
-        results["API Availability"] = "FAIL"
-
-    if os.path.exists(DB_PATH):
-        size_mb = round(os.path.getsize(DB_PATH) / (1024 * 1024), 3)
-        results["Database Size"] = f"{size_mb} MB"
-    else:
-        results["Database Size"] = "No database found"
-
-    total, used, free = shutil.disk_usage(os.getcwd())
-    results["Disk Total"] = f"{round(total / (1024**3), 2)} GB"
-    results["Disk Used"] = f"{round(used / (1024**3), 2)} GB"
-    results["Disk Free"] = f"{round(free / (1024**3), 2)} GB"
-
-    return jsonify(results)
+    """Cached results from the background prober (etl.health); no upstream call per request."""
+    return jsonify(health_report(DB_PATH))
 
 
 # ---------------------------------------------------
 # Run Flask with auto-selected port
 # ---------------------------------------------------
 def run_flask():
+    setup_logger()
+    # May download DuckDB's sqlite extension; done here, not in a request
+    analytics.prepare()
     port = find_free_port()
     url = f"http://localhost:{port}"
 
@@ -3,7 +3,11 @@ import pandas as pd
 import streamlit as st
 from datetime import datetime
 
-from etl.load import init_db, fetch_country_data, insert_country, DB_PATH
+from etl.load import ensure_db, fetch_country_data, enrich_weather, load_batch, DB_PATH
+from etl import analytics
+from etl.logger_config import setup_logger
+from etl.aggregates import region_summary, subregion_summary, conditions_summary
+from etl.search import search
 
 
 # ---------------------------------------------------
@@ -18,12 +22,19 @@ st.set_page_config(
 # ---------------------------------------------------
 # DATABASE LOADER
 # ---------------------------------------------------
+@st.cache_resource
+def prepare_analytics():
+    # Once per server process: may download DuckDB's sqlite extension
+    return analytics.prepare()
+
+
+setup_logger()  # no-op after the first script run
+prepare_analytics()
+
+
 def load_db():
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM countries", conn)
-    conn.close()
-    return df
+    ensure_db()
+    return analytics.export_frame(DB_PATH)
 
 
 # ---------------------------------------------------
@@ -32,7 +43,7 @@ def load_db():
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
     "Go to:",
-    ["Home", "Run ETL", "View Database", "Charts", "Health Check", "System Info"]
+    ["Home", "Run ETL", "View Database", "Summary", "Charts", "Health Check", "System Info"]
 )
 
 
@@ -65,15 +76,15 @@ elif page == "Run ETL":
         if not query.strip():
             st.error("Please enter a valid country name.")
         else:
-            init_db()
+            ensure_db()
             conn = sqlite3.connect(DB_PATH)
-            countries = fetch_country_data(query)
+            countries = enrich_weather(fetch_country_data(query))
+            statuses = load_batch(conn, countries)
 
             results = []
-            for country in countries:
-                status = insert_country(conn, country)
+            for name, status in zip(countries.columns["name"], statuses):
                 results.append({
-                    "name": country["name"],
+                    "name": name,
                     "status": status
                 })
 
@@ -94,6 +105,14 @@ elif page == "View Database":
     if df.empty:
         st.warning("Database is empty.")
     else:
+        term = st.text_input("Search by name, capital or region:")
+        if term.strip():
+            conn = sqlite3.connect(DB_PATH)
+            matches = search(conn, term, limit=50)
+            conn.close()
+            st.caption(f"{len(matches)} matches")
+            df = df[df["name"].isin([m["name"] for m in matches])]
+
         st.dataframe(df, use_container_width=True)
 
         csv = df.to_csv(index=False)
@@ -105,6 +124,37 @@ elif page == "View Database":
         )
 
 
+# ---------------------------------------------------
+# SUMMARY (served from the aggregate tables)
+# ---------------------------------------------------
+elif page == "Summary":
+    st.title("Summary")
+
+    ensure_db()
+    conn = sqlite3.connect(DB_PATH)
+    regions = region_summary(conn)
+    subregions = subregion_summary(conn)
+    conditions = conditions_summary(conn)
+    conn.close()
+
+    if not regions:
+        st.warning("Database is empty.")
+    else:
+        st.subheader("By Region")
+        st.dataframe(pd.DataFrame(regions), use_container_width=True)
+
+        st.subheader("By Subregion")
+        st.dataframe(pd.DataFrame(subregions), use_container_width=True)
+
+        st.subheader("Conditions")
+        st.dataframe(pd.DataFrame(conditions), use_container_width=True)
+
+        st.subheader("Temperature Distribution")
+        bucket = st.select_slider("Band width (°C)", options=[1, 2, 5, 10], value=5)
+        histogram = analytics.temperature_histogram(DB_PATH, bucket)
+        st.bar_chart(histogram.set_index("bucket_c"))
+
+
 # ---------------------------------------------------
 # CHARTS (Temperature Trends)
 # ---------------------------------------------------
@@ -137,32 +187,19 @@ elif page == "Charts":
 # HEALTH CHECK
 # ---------------------------------------------------
 elif page == "Health Check":
-    import os
-    import shutil
-    import requests
+    from etl.health import report as health_report
 
     st.title("Health Check")
 
-    results = {}
-
-    try:
-        r = requests.get("https://restcountries.com/v3.1/all", timeout=5)
-        results["API Availability"] = "PASS" if r.status_code == 200 else "FAIL"
-    except Exception:
-        results["API Availability"] = "FAIL"
-
-    if os.path.exists(DB_PATH):
-        size_mb = round(os.path.getsize(DB_PATH) / (1024 * 1024), 3)
-        results["Database Size"] = f"{size_mb} MB"
-    else:
-        results["Database Size"] = "No database found"
-
-    total, used, free = shutil.disk_usage(os.getcwd())
-    results["Disk Total"] = f"{round(total / (1024**3), 2)} GB"
-    results["Disk Used"] = f"{round(used / (1024**3), 2)} GB"
-    results["Disk Free"] = f"{round(free / (1024**3), 2)} GB"
-
+    # Served from the background prober's cache; refreshed every ETL_HEALTH_INTERVAL seconds
+    results = health_report(DB_PATH)
+    upstreams = results.pop("upstreams")
     st.json(results)
+    st.subheader("Upstream APIs")
+    st.dataframe(pd.DataFrame([
+        {"upstream": name, **{k: v for k, v in status.items() if k != "history"}}
+        for name, status in upstreams.items()
+    ]), use_container_width=True)
 
 
 # ---------------------------------------------------